@@ -0,0 +1,266 @@
+from collections import OrderedDict, deque
+from typing import Deque, Hashable, NamedTuple, Optional, Tuple
+import asyncio
+import math
+import time
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from . import config
+from .data_store import users_db
+from .metrics import metrics, COUNTER
+
+# ==================================
+#   ADMISSION CONTROL & LOAD SHEDDING
+# ==================================
+# Endpoint sinkron berbagi thread pool FastAPI yang terbatas, jadi satu klien yang
+# membanjiri jalur transaksi bisa membuat request lain menunggu lama. Middleware ini
+# berjalan di event loop sebelum request masuk thread pool:
+# 1. Token bucket per user (X-User-ID) -> 429, lalu token bucket global -> 503.
+# 2. Batas request yang diproses bersamaan; sisanya menunggu di antrean terbatas
+#    (user prioritas lebih dulu). Antrean penuh, menunggu terlalu lama, atau rata-rata
+#    waktu tunggu di atas batas -> 503.
+# Semua state hanya disentuh dari thread event loop, jadi tidak perlu lock.
+ADMISSION_REJECTED = "library_admission_rejected_total"
+metrics.describe(ADMISSION_REJECTED, COUNTER, "Request yang ditolak admission control.", ("reason",))
+
+REASON_USER_RATE = "user_rate"
+REASON_GLOBAL_RATE = "global_rate"
+REASON_QUEUE_FULL = "queue_full"
+REASON_QUEUE_TIMEOUT = "queue_timeout"
+REASON_OVERLOADED = "overloaded"
+
+
+class Rejection(NamedTuple):
+    status_code: int
+    reason: str
+    retry_after: float  # Detik
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+    def take(self, now: float, rate: float, burst: float) -> float:
+        """
+        Mengambil satu token. Mengembalikan 0 jika berhasil, atau lama menunggu (detik)
+        sampai token berikutnya tersedia.
+        """
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class KeyedTokenBuckets:
+    """
+    Token bucket per key dalam OrderedDict yang diurutkan dari yang paling lama tidak
+    dipakai. Bucket idle dibuang dari depan saat ada request, jadi biaya per request O(1)
+    (amortized). Bucket yang idle cukup lama sudah penuh lagi, jadi membuangnya aman.
+    """
+
+    def __init__(self, rate: float, burst: float, idle_seconds: float, max_buckets: int):
+        self.rate = rate
+        self.burst = burst
+        self.idle_seconds = max(idle_seconds, burst / rate)
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: Hashable, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.burst, now)
+        else:
+            self._buckets.move_to_end(key)
+        wait = bucket.take(now, self.rate, self.burst)
+        self._evict(now)
+        return wait
+
+    def _evict(self, now: float):
+        buckets = self._buckets
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if len(buckets) <= self.max_buckets and now - oldest.updated < self.idle_seconds:
+                return
+            buckets.popitem(last=False)
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class AdmissionController:
+    """
+    Batas laju per user dan global serta antrean terbatas dengan dua prioritas.
+    """
+
+    def __init__(self, user_rate: float = config.ADMISSION_USER_RATE,
+                 user_burst: float = config.ADMISSION_USER_BURST,
+                 global_rate: float = config.ADMISSION_GLOBAL_RATE,
+                 global_burst: float = config.ADMISSION_GLOBAL_BURST,
+                 max_concurrency: int = config.ADMISSION_MAX_CONCURRENCY,
+                 queue_size: int = config.ADMISSION_QUEUE_SIZE,
+                 queue_timeout_ms: float = config.ADMISSION_QUEUE_TIMEOUT_MS,
+                 max_queue_wait_ms: float = config.ADMISSION_MAX_QUEUE_WAIT_MS,
+                 idle_seconds: float = config.ADMISSION_IDLE_SECONDS,
+                 max_buckets: int = config.ADMISSION_MAX_BUCKETS,
+                 clock=time.monotonic):
+        self.users = KeyedTokenBuckets(user_rate, user_burst, idle_seconds, max_buckets) if user_rate > 0 else None
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.max_queue_wait = max_queue_wait_ms / 1000
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        if self.users is not None:
+            self.users.clear()
+        self._global = TokenBucket(self.global_burst, self.clock())
+        self.active = 0
+        self.queued = 0
+        # Rata-rata bergerak (EWMA) waktu tunggu di antrean, dalam detik
+        self.wait_average = 0.0
+        # Antrean menunggu slot: [prioritas, biasa]
+        self._waiters: Tuple[Deque[asyncio.Future], Deque[asyncio.Future]] = (deque(), deque())
+
+    # --- Batas laju ---
+    def check_rate(self, user_key: Hashable, priority: bool) -> Optional[Rejection]:
+        now = self.clock()
+        if self.users is not None and not priority:
+            wait = self.users.take(user_key, now)
+            if wait:
+                return Rejection(status.HTTP_429_TOO_MANY_REQUESTS, REASON_USER_RATE, wait)
+        if self.global_rate > 0:
+            wait = self._global.take(now, self.global_rate, self.global_burst)
+            if wait:
+                return Rejection(status.HTTP_503_SERVICE_UNAVAILABLE, REASON_GLOBAL_RATE, wait)
+        return None
+
+    # --- Slot pemrosesan ---
+    async def acquire(self, priority: bool) -> Optional[Rejection]:
+        """
+        Menunggu slot pemrosesan. Mengembalikan None jika mendapat slot (harus diikuti
+        `release`), atau Rejection jika request harus ditolak.
+        """
+        if self.active < self.max_concurrency and not self.queued:
+            self.active += 1
+            self._record_wait(0.0)
+            return None
+        if self.queued >= self.queue_size:
+            return Rejection(status.HTTP_503_SERVICE_UNAVAILABLE, REASON_QUEUE_FULL, self._retry_after())
+        if not priority and self.wait_average > self.max_queue_wait:
+            return Rejection(status.HTTP_503_SERVICE_UNAVAILABLE, REASON_OVERLOADED, self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[0 if priority else 1].append(waiter)
+        self.queued += 1
+        start = self.clock()
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except BaseException:
+            # Task dibatalkan (misalnya server berhenti); slot yang sudah diterima dikembalikan
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            waiter.cancel()
+            raise
+        finally:
+            self.queued -= 1
+        if not waiter.done():
+            # Timeout; entrinya di antrean dilewati oleh `release`
+            waiter.cancel()
+        if waiter.cancelled():
+            self._record_wait(self.queue_timeout)
+            return Rejection(status.HTTP_503_SERVICE_UNAVAILABLE, REASON_QUEUE_TIMEOUT, self._retry_after())
+        self._record_wait(self.clock() - start)
+        return None
+
+    def release(self):
+        # Slot langsung diberikan ke penunggu berikutnya (prioritas lebih dulu)
+        for waiters in self._waiters:
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self.active -= 1
+
+    def _record_wait(self, seconds: float):
+        self.wait_average = 0.8 * self.wait_average + 0.2 * seconds
+
+    def _retry_after(self) -> float:
+        return max(self.wait_average, self.queue_timeout / 2)
+
+
+admission_controller = AdmissionController()
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI yang menerapkan AdmissionController pada path berawalan `paths`.
+    Admin dan user di ADMISSION_PRIORITY_USERS tidak dibatasi token bucket per user dan
+    didahulukan di antrean.
+    """
+
+    def __init__(self, app, controller: AdmissionController = None, paths: Tuple[str, ...] = config.ADMISSION_PATHS,
+                 priority_users=config.ADMISSION_PRIORITY_USERS):
+        self.app = app
+        self.controller = controller or admission_controller
+        self.paths = tuple(paths)
+        self.priority_users = set(priority_users)
+
+    def _identify(self, scope) -> Tuple[bytes, bool]:
+        raw = b""
+        for name, value in scope.get("headers") or ():
+            if name == b"x-user-id":
+                raw = value
+                break
+        try:
+            user_id = int(raw)
+        except ValueError:
+            return raw, False
+        if user_id in self.priority_users:
+            return raw, True
+        user = users_db.get(user_id)
+        return raw, user is not None and user.role == "admin"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        user_key, priority = self._identify(scope)
+        controller = self.controller
+        rejection = controller.check_rate(user_key, priority)
+        if rejection is None:
+            rejection = await controller.acquire(priority)
+        if rejection is not None:
+            await self._reject(rejection, scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release()
+
+    async def _reject(self, rejection: Rejection, scope, receive, send):
+        metrics.inc(ADMISSION_REJECTED, (rejection.reason,))
+        if rejection.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+            detail = "Terlalu banyak request. Coba lagi nanti."
+        else:
+            detail = "Server sedang sibuk. Coba lagi nanti."
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=rejection.status_code,
+            headers={"Retry-After": str(max(1, math.ceil(rejection.retry_after)))},
+        )
+        await response(scope, receive, send)
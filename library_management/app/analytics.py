@@ -0,0 +1,299 @@
+from datetime import date, timedelta
+from typing import Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+from collections import Counter
+import threading
+import uuid
+
+from . import config
+from .clock import SystemClock
+from .storage.base import (
+    LibraryStore, StoreEvent, LOAN_BORROWED, LOAN_RETURNED, LOAN_REVERTED, LOAN_REMOVED,
+)
+
+# ==================================
+#     STATISTIK SIRKULASI (INKREMENTAL)
+# ==================================
+# Statistik diperbarui langsung dari event storage (pinjam, kembali, rollback), jadi
+# endpoint /stats tidak perlu memindai riwayat pinjaman. Hitungan dimulai sejak
+# statistik dihubungkan ke storage (biasanya saat startup). Event hanya berasal dari
+# proses sendiri, jadi /stats dimatikan jika LIBRARY_WORKERS > 1.
+
+K = TypeVar("K", bound=Hashable)
+
+
+class _Bucket:
+    """
+    Semua key dengan hitungan yang sama. Bucket membentuk linked list terurut
+    dari hitungan terbesar (`lower` menunjuk ke hitungan yang lebih kecil).
+    """
+    __slots__ = ("count", "keys", "higher", "lower")
+
+    def __init__(self, count: int):
+        self.count = count
+        self.keys: Dict[Hashable, None] = {}  # dict sebagai set yang menjaga urutan masuk
+        self.higher: Optional["_Bucket"] = None
+        self.lower: Optional["_Bucket"] = None
+
+
+class CountRanking(Generic[K]):
+    """
+    Hitungan per key yang selalu terurut. Menaikkan/menurunkan hitungan sebesar 1 adalah
+    O(1), dan `top(k)` adalah O(k) karena hanya membaca bucket dari atas.
+    Key dengan hitungan sama diurutkan berdasarkan siapa yang lebih dulu mencapai hitungan itu.
+    Class ini tidak thread-safe; pemanggil yang memegang lock.
+    """
+
+    def __init__(self):
+        self._bucket_of: Dict[K, _Bucket] = {}
+        self._top: Optional[_Bucket] = None
+        self._bottom: Optional[_Bucket] = None
+
+    def __len__(self) -> int:
+        return len(self._bucket_of)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._bucket_of
+
+    def count(self, key: K) -> int:
+        bucket = self._bucket_of.get(key)
+        return bucket.count if bucket else 0
+
+    def clear(self):
+        self._bucket_of.clear()
+        self._top = self._bottom = None
+
+    def _link(self, bucket: _Bucket, higher: Optional[_Bucket], lower: Optional[_Bucket]):
+        bucket.higher, bucket.lower = higher, lower
+        if higher:
+            higher.lower = bucket
+        else:
+            self._top = bucket
+        if lower:
+            lower.higher = bucket
+        else:
+            self._bottom = bucket
+
+    def _unlink(self, bucket: _Bucket):
+        if bucket.higher:
+            bucket.higher.lower = bucket.lower
+        else:
+            self._top = bucket.lower
+        if bucket.lower:
+            bucket.lower.higher = bucket.higher
+        else:
+            self._bottom = bucket.higher
+
+    def add(self, key: K, delta: int = 1):
+        """
+        Menambah (atau mengurangi, jika `delta` negatif) hitungan `key`. Key yang
+        hitungannya menjadi 0 atau kurang dihapus dari ranking.
+        """
+        if not delta:
+            return
+        current = self._bucket_of.get(key)
+        target = (current.count if current else 0) + delta
+        # Posisi bucket tujuan dicari dengan berjalan dari bucket sekarang (key baru:
+        # dari bucket terbawah), jadi perubahan sebesar 1 hanya melewati satu bucket.
+        # Hasilnya: `higher` = bucket terdekat dengan hitungan >= target, `lower` = sebaliknya.
+        if current is None:
+            higher, lower = self._bottom, None
+        elif delta > 0:
+            higher, lower = current, current.lower
+        else:
+            higher, lower = current.higher, current
+        while higher is not None and higher.count < target:
+            higher, lower = higher.higher, higher
+        while lower is not None and lower.count > target:
+            higher, lower = lower, lower.lower
+
+        if current is not None:
+            del current.keys[key]
+            del self._bucket_of[key]
+            if not current.keys:
+                if higher is current:
+                    higher = current.higher
+                if lower is current:
+                    lower = current.lower
+                self._unlink(current)
+        if target <= 0:
+            return
+        if higher is not None and higher.count == target:
+            bucket = higher
+        elif lower is not None and lower.count == target:
+            bucket = lower
+        else:
+            bucket = _Bucket(target)
+            self._link(bucket, higher, lower)
+        bucket.keys[key] = None
+        self._bucket_of[key] = bucket
+
+    def top(self, k: int) -> List[Tuple[K, int]]:
+        result = []
+        bucket = self._top
+        while bucket is not None and len(result) < k:
+            for key in bucket.keys:
+                result.append((key, bucket.count))
+                if len(result) == k:
+                    break
+            bucket = bucket.lower
+        return result
+
+
+class CirculationStats:
+    """
+    Statistik sirkulasi yang diperbarui setiap ada peminjaman/pengembalian:
+    - jumlah pinjam dan kembali per hari selama `retention_days` hari terakhir,
+    - buku dan penulis terpopuler dalam `window_days` hari terakhir (jendela geser),
+    - buku dan penulis terpopuler sejak statistik dimulai.
+
+    Jendela digeser secara lazy: hitungan hari yang keluar dari jendela dikurangi dari
+    ranking saat statistik berikutnya dibaca atau diperbarui.
+    Penulis dicatat saat peminjaman terjadi (dibaca dari storage); jika penulis buku diubah
+    kemudian, hitungan lama tidak dipindahkan. Judul dan penulis untuk ranking buku dibaca
+    dari storage hanya untuk buku top-K saat ranking diminta.
+    """
+
+    def __init__(self, clock=None, window_days: int = config.STATS_WINDOW_DAYS,
+                 retention_days: int = config.STATS_RETENTION_DAYS):
+        self.clock = clock or SystemClock()
+        self.window_days = window_days
+        self.retention_days = max(retention_days, window_days)
+        self._lock = threading.Lock()
+        self._store: Optional[LibraryStore] = None
+        self._reset_locked()
+
+    def _reset_locked(self):
+        self._daily: Dict[int, List[int]] = {}  # ordinal hari -> [pinjam, kembali]
+        # Rincian per hari hanya disimpan untuk hari di dalam jendela
+        self._day_books: Dict[int, Counter] = {}
+        self._day_authors: Dict[int, Counter] = {}
+        self.window_books: CountRanking[uuid.UUID] = CountRanking()
+        self.window_authors: CountRanking[str] = CountRanking()
+        self.all_books: CountRanking[uuid.UUID] = CountRanking()
+        self.all_authors: CountRanking[str] = CountRanking()
+        self._window_start = self.clock.today().toordinal() - self.window_days + 1
+
+    # --- Sumber data ---
+    def bind(self, store: LibraryStore):
+        """
+        Menghubungkan statistik dengan storage yang aktif. Jika storage berganti,
+        statistik dimulai dari nol.
+        """
+        if store is self._store:
+            return
+        with self._lock:
+            if store is self._store:
+                return
+            if self._store is not None:
+                self._store.remove_listener(self.on_store_event)
+            self._store = store
+            store.add_listener(self.on_store_event)
+            self._reset_locked()
+
+    def detach(self):
+        with self._lock:
+            if self._store is not None:
+                self._store.remove_listener(self.on_store_event)
+                self._store = None
+
+    def clear(self):
+        with self._lock:
+            self._reset_locked()
+
+    def on_store_event(self, event: StoreEvent):
+        kind = event.kind
+        if kind in (LOAN_BORROWED, LOAN_REMOVED):
+            # Penulis dibaca di luar lock statistik; LOAN_REMOVED = peminjaman dibatalkan (rollback batch)
+            store = self._store
+            book = store.get_book(event.book_id) if store is not None else None
+            author = book.author if book is not None else None
+            with self._lock:
+                self._record_borrow(event.book_id, author, event.loan.borrow_date, 1 if kind == LOAN_BORROWED else -1)
+            return
+        with self._lock:
+            if kind == LOAN_RETURNED:
+                self._record_return(event.loan.return_date, 1)
+            elif kind == LOAN_REVERTED and event.previous is not None:
+                if event.previous.return_date is not None and event.loan.return_date is None:
+                    self._record_return(event.previous.return_date, -1)
+
+    # --- Pembaruan (lock sudah dipegang) ---
+    def _advance(self, today: date):
+        start = today.toordinal() - self.window_days + 1
+        if start <= self._window_start:
+            return
+        for day in [d for d in self._day_books if d < start]:
+            for book_id, count in self._day_books.pop(day).items():
+                self.window_books.add(book_id, -count)
+            for author, count in self._day_authors.pop(day).items():
+                self.window_authors.add(author, -count)
+        oldest = today.toordinal() - self.retention_days + 1
+        for day in [d for d in self._daily if d < oldest]:
+            del self._daily[day]
+        self._window_start = start
+
+    def _day(self, day: int) -> Optional[List[int]]:
+        counts = self._daily.get(day)
+        if counts is None and day > self.clock.today().toordinal() - self.retention_days:
+            counts = self._daily[day] = [0, 0]
+        return counts
+
+    def _record_borrow(self, book_id: uuid.UUID, author: Optional[str], borrow_date: date, delta: int):
+        self._advance(self.clock.today())
+        day = borrow_date.toordinal()
+        counts = self._day(day)
+        if counts is not None:
+            counts[0] += delta
+        self.all_books.add(book_id, delta)
+        if author is not None:
+            self.all_authors.add(author, delta)
+        if day >= self._window_start:
+            self._day_books.setdefault(day, Counter())[book_id] += delta
+            self.window_books.add(book_id, delta)
+            if author is not None:
+                self._day_authors.setdefault(day, Counter())[author] += delta
+                self.window_authors.add(author, delta)
+
+    def _record_return(self, return_date: date, delta: int):
+        self._advance(self.clock.today())
+        counts = self._day(return_date.toordinal())
+        if counts is not None:
+            counts[1] += delta
+
+    # --- Baca ---
+    def top_books(self, limit: int, window: bool = True) -> List[Tuple[uuid.UUID, Optional[str], Optional[str], int]]:
+        """
+        Buku paling sering dipinjam: (book_id, judul, penulis, jumlah pinjam).
+        """
+        with self._lock:
+            self._advance(self.clock.today())
+            top = (self.window_books if window else self.all_books).top(limit)
+            store = self._store
+        result = []
+        for book_id, count in top:
+            book = store.get_book(book_id) if store is not None else None
+            result.append((book_id, book.title if book else None, book.author if book else None, count))
+        return result
+
+    def top_authors(self, limit: int, window: bool = True) -> List[Tuple[str, int]]:
+        with self._lock:
+            self._advance(self.clock.today())
+            return (self.window_authors if window else self.all_authors).top(limit)
+
+    def daily(self, days: int) -> List[Tuple[date, int, int]]:
+        """
+        Jumlah pinjam dan kembali per hari untuk `days` hari terakhir (termasuk hari ini),
+        dari yang terlama.
+        """
+        with self._lock:
+            today = self.clock.today()
+            self._advance(today)
+            result = []
+            for offset in range(min(days, self.retention_days) - 1, -1, -1):
+                day = today - timedelta(days=offset)
+                borrows, returns = self._daily.get(day.toordinal(), (0, 0))
+                result.append((day, borrows, returns))
+            return result
+
+
+circulation_stats = CirculationStats()
@@ -0,0 +1,131 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import csv
+import json
+
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from .schemas import BookCreate, BulkImportError, BulkImportResult
+from .storage import LibraryStore
+
+# ==================================
+#        IMPOR BUKU MASSAL
+# ==================================
+# Body request dibaca per potongan (stream) dan diproses per batch, sehingga memori
+# yang dipakai tergantung ukuran batch, bukan ukuran file. Setiap baris berisi satu
+# buku: CSV dengan header `title,author,stock`, atau NDJSON (satu objek JSON per baris).
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+
+
+def detect_format(content_type: str) -> Optional[str]:
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return FORMAT_CSV
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines"):
+        return FORMAT_NDJSON
+    return None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """
+    Memecah body yang di-stream menjadi baris mentah (nomor baris dimulai dari 1).
+    Baris belum di-decode agar byte yang bukan UTF-8 bisa dilaporkan sebagai error per baris.
+    """
+    pending = b""
+    line_no = 0
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for raw in lines:
+            line_no += 1
+            yield line_no, raw.rstrip(b"\r")
+    if pending:
+        line_no += 1
+        yield line_no, pending.rstrip(b"\r")
+
+
+class BookImporter:
+    """
+    Memvalidasi dan menyimpan buku per batch. Baris yang tidak valid dicatat sebagai
+    error tanpa menghentikan proses impor.
+    """
+
+    def __init__(self, store: LibraryStore, fmt: str, dry_run: bool = False, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.store = store
+        self.fmt = fmt
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        # Penghitung disimpan sebagai atribut biasa; model hasil baru dibuat di akhir
+        self.total_rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[BulkImportError] = []
+        self._csv_header: Optional[List[str]] = None
+        self._batch: List[BookCreate] = []
+
+    async def run(self, chunks: AsyncIterator[bytes]) -> BulkImportResult:
+        async for line_no, raw in iter_lines(chunks):
+            try:
+                line = raw.decode("utf-8-sig" if line_no == 1 else "utf-8")
+            except UnicodeDecodeError as e:
+                self.total_rows += 1
+                self._add_error(line_no, e)
+                continue
+            if not line.strip():
+                continue
+            if self.fmt == FORMAT_CSV and self._csv_header is None:
+                self._csv_header = [name.strip() for name in next(csv.reader([line]))]
+                continue
+
+            self.total_rows += 1
+            try:
+                self._batch.append(BookCreate.model_validate(self._parse(line)))
+            except (ValidationError, ValueError) as e:
+                self._add_error(line_no, e)
+                continue
+
+            if len(self._batch) >= self.batch_size:
+                await self._flush()
+        await self._flush()
+        return BulkImportResult(
+            total_rows=self.total_rows,
+            imported=self.imported,
+            failed=self.failed,
+            dry_run=self.dry_run,
+            errors=self.errors,
+            errors_truncated=self.failed > len(self.errors),
+        )
+
+    def _parse(self, line: str) -> Dict:
+        if self.fmt == FORMAT_NDJSON:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("Setiap baris NDJSON harus berupa objek JSON.")
+            return row
+        values = next(csv.reader([line]))
+        if len(values) != len(self._csv_header):
+            raise ValueError(f"Jumlah kolom {len(values)}, seharusnya {len(self._csv_header)}.")
+        return dict(zip(self._csv_header, values))
+
+    def _add_error(self, line_no: int, error: Exception):
+        self.failed += 1
+        if len(self.errors) >= MAX_REPORTED_ERRORS:
+            return
+        if isinstance(error, ValidationError):
+            detail = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+        else:
+            detail = str(error)
+        self.errors.append(BulkImportError(line=line_no, detail=detail))
+
+    async def _flush(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        if not self.dry_run:
+            # Storage bersifat sinkron; jalankan di threadpool agar event loop tidak terblokir
+            await run_in_threadpool(self.store.add_books, batch)
+        self.imported += len(batch)
@@ -0,0 +1,164 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple, Optional
+import threading
+import uuid
+
+from fastapi import Request, Response, status
+
+from . import config
+from .storage.base import LibraryStore, StoreEvent, LOAN_EXTENDED, EXTERNAL_CHANGE
+
+# ==================================
+#     CACHE RESPONS KATALOG (ETAG)
+# ==================================
+# Menyimpan body JSON yang sudah diserialisasi untuk endpoint katalog yang sering dibaca.
+# Setiap perubahan data menaikkan `version` dan menghapus key yang terdampak. ETag sebuah
+# entri adalah versi katalog saat entri dibuat, jadi ETag lama tidak pernah cocok lagi
+# dengan data yang sudah berubah.
+
+# Key yang dipakai router
+def list_key(available_only: bool) -> tuple:
+    return ("list", available_only)
+
+def book_key(book_id) -> tuple:
+    return ("book", book_id)
+
+
+class CacheEntry(NamedTuple):
+    etag: str
+    body: bytes
+
+
+class ResponseCache:
+    """
+    Cache LRU untuk body respons dengan batas jumlah entri dan total byte.
+    """
+
+    def __init__(self, max_bytes: int = config.RESPONSE_CACHE_MAX_BYTES,
+                 max_entries: int = config.RESPONSE_CACHE_MAX_ENTRIES,
+                 enabled: bool = config.RESPONSE_CACHE_ENABLED):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.version = 0
+        # Penanda proses agar ETag dari proses sebelum restart tidak cocok dengan versi yang sama
+        self._epoch = uuid.uuid4().hex[:8]
+        self.size_bytes = 0
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._store: Optional[LibraryStore] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def bind(self, store: LibraryStore):
+        """
+        Menghubungkan cache dengan storage yang aktif. Jika storage berganti, isi cache
+        dibuang dan cache mulai mendengarkan event dari storage yang baru.
+        """
+        if store is self._store:
+            return
+        with self._lock:
+            if store is self._store:
+                return
+            if self._store is not None:
+                self._store.remove_listener(self._on_change)
+            self._store = store
+            store.add_listener(self._on_change)
+            self._clear_locked()
+
+    def clear(self):
+        with self._lock:
+            self._clear_locked()
+
+    def _clear_locked(self):
+        # Versi tetap naik agar ETag dari isi cache sebelumnya tidak cocok lagi
+        self.version += 1
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def _on_change(self, event: StoreEvent):
+        if event.kind == LOAN_EXTENDED:
+            # Perpanjangan tidak mengubah data buku
+            return
+        if event.kind == EXTERNAL_CHANGE:
+            # Worker lain menulis data; buku mana yang berubah tidak diketahui
+            self.clear()
+            return
+        with self._lock:
+            self.version += 1
+            # Perubahan satu buku memengaruhi detail buku itu dan kedua daftar buku
+            for key in (book_key(event.book_id), list_key(False), list_key(True)):
+                self._discard_locked(key)
+
+    def _discard_locked(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(entry.body)
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, version: int, body: bytes) -> CacheEntry:
+        """
+        Menyimpan body yang dibuat saat katalog berada di `version`. Jika data berubah
+        selama body dibuat, body tetap dikembalikan tetapi tidak disimpan.
+        """
+        entry = CacheEntry(f'"{self._epoch}-{version}"', body)
+        if not self.enabled or len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            if version != self.version:
+                return entry
+            self._discard_locked(key)
+            self._entries[key] = entry
+            self.size_bytes += len(body)
+            while self._entries and (len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted.body)
+        return entry
+
+
+response_cache = ResponseCache()
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cached_json_response(request: Request, store: LibraryStore, key: Hashable,
+                         build: Callable[[], Optional[bytes]]) -> Optional[Response]:
+    """
+    Mengembalikan respons JSON dari cache, atau membuat body baru lewat `build()`.
+    Jika `If-None-Match` cocok dengan ETag, dikirim 304 tanpa body.
+    Mengembalikan None jika `build()` mengembalikan None (misalnya data tidak ditemukan).
+    """
+    response_cache.bind(store)
+    # Mode multi-worker: buang cache jika worker lain sudah mengubah data
+    store.poll_changes()
+    entry = response_cache.get(key)
+    if entry is None:
+        # Versi dibaca sebelum data dibaca, jadi ETag tidak pernah lebih baru dari isi body
+        version = response_cache.version
+        body = build()
+        if body is None:
+            return None
+        entry = response_cache.put(key, version, body)
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
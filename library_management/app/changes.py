@@ -0,0 +1,147 @@
+from typing import List, NamedTuple, Optional, Tuple, Union
+import threading
+import uuid
+
+from . import config
+from .schemas import Book, LoanRecord
+from .storage.base import (
+    LibraryStore, StoreEvent, BOOK_DELETED, LOAN_EXTENDED, LOAN_REMOVED, EXTERNAL_CHANGE,
+    ENTITY_BOOK, ENTITY_LOAN, OP_UPSERT, OP_DELETE,
+)
+
+# ==================================
+#        CHANGE LOG (FEED)
+# ==================================
+# Setiap perubahan data di storage mendapat nomor urut yang terus naik dan disimpan di
+# ring buffer berukuran tetap. Klien (kiosk, job laporan) cukup meminta perubahan setelah
+# nomor terakhir yang sudah diterimanya, bukan mengunduh ulang seluruh katalog.
+#
+# Jika nomor klien sudah keluar dari buffer (atau change log dimulai ulang), klien
+# diminta melakukan resync: memuat ulang data lengkap lalu melanjutkan dari `next`.
+# Perubahan yang terjadi selama pemuatan ulang akan dikirim lagi, jadi klien harus
+# menerapkan perubahan sebagai upsert/delete yang idempoten.
+#
+# Dalam mode multi-worker setiap worker punya memori sendiri, jadi feed dibaca dari storage
+# (`LibraryStore.change_feed`, tabel `changes` di SQLite) agar nomor urut dan epoch sama di
+# semua worker. Data pada feed tersebut adalah state terbaru baris, bukan salinan saat
+# perubahan terjadi.
+
+
+class Change(NamedTuple):
+    seq: int
+    entity: str
+    op: str
+    id: uuid.UUID
+    data: Optional[Union[Book, LoanRecord]]
+
+
+class ChangePage(NamedTuple):
+    epoch: str
+    resync_required: bool
+    changes: List[Change]
+    next: int
+    has_more: bool
+
+
+class ChangeLog:
+    """
+    Ring buffer berisi `size` perubahan terakhir. Perubahan ke-`seq` disimpan di slot
+    `seq % size`, jadi membaca k perubahan setelah cursor cukup O(k).
+    """
+
+    def __init__(self, size: int = config.CHANGE_LOG_SIZE):
+        self.size = size
+        # Penanda proses: nomor urut dimulai dari 0 lagi setelah restart
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        # Cursor di bawah ini tidak bisa dilayani lagi meskipun masih dalam jangkauan buffer
+        self._floor = 0
+        self._entries: List[Optional[Change]] = [None] * size
+        self._lock = threading.Lock()
+        self._store: Optional[LibraryStore] = None
+        # True jika storage mencatat feed sendiri (mode multi-worker)
+        self._shared = False
+
+    def bind(self, store: LibraryStore):
+        """
+        Menghubungkan change log dengan storage yang aktif. Jika storage berganti,
+        semua cursor lama dianggap perlu resync.
+        """
+        if store is self._store:
+            return
+        with self._lock:
+            if store is self._store:
+                return
+            if self._store is not None:
+                self._store.remove_listener(self.on_store_event)
+            self._store = store
+            self._shared = store.change_feed(0, 0) is not None
+            if not self._shared:
+                store.add_listener(self.on_store_event)
+            self._invalidate_locked()
+
+    def clear(self):
+        with self._lock:
+            self._invalidate_locked()
+
+    def _invalidate_locked(self):
+        # Nomor urut tetap naik agar cursor lama tidak dianggap masih valid
+        self.seq += 1
+        self._floor = self.seq
+        self._entries = [None] * self.size
+
+    def on_store_event(self, event: StoreEvent):
+        if event.kind == EXTERNAL_CHANGE:
+            # Worker lain mengubah data; rinciannya tidak diketahui proses ini
+            with self._lock:
+                self._invalidate_locked()
+            return
+        # Data disalin karena objek dari storage bisa berubah lagi setelah event ini
+        entries = []
+        if event.loan is not None:
+            op = OP_DELETE if event.kind == LOAN_REMOVED else OP_UPSERT
+            entries.append((ENTITY_LOAN, op, event.loan.id, None if op == OP_DELETE else event.loan.model_copy()))
+            if event.kind != LOAN_EXTENDED:
+                # Pinjam/kembali juga mengubah stok buku, yang dipakai kiosk
+                book = self._store.get_book(event.book_id) if self._store is not None else None
+                if book is not None:
+                    entries.append((ENTITY_BOOK, OP_UPSERT, book.id, book.model_copy()))
+        elif event.kind == BOOK_DELETED:
+            entries.append((ENTITY_BOOK, OP_DELETE, event.book_id, None))
+        else:
+            entries.append((ENTITY_BOOK, OP_UPSERT, event.book_id, event.book.model_copy()))
+        with self._lock:
+            for entry in entries:
+                self.seq += 1
+                self._entries[self.seq % self.size] = Change(self.seq, *entry)
+
+    def since(self, cursor: int, limit: int) -> Tuple[bool, List[Change], int]:
+        """
+        Perubahan setelah `cursor`, paling banyak `limit`. Mengembalikan
+        (perlu resync, perubahan, cursor berikutnya).
+        """
+        with self._lock:
+            if cursor < self._floor or cursor < self.seq - self.size or cursor > self.seq:
+                return True, [], self.seq
+            end = min(self.seq, cursor + limit)
+            return False, [self._entries[seq % self.size] for seq in range(cursor + 1, end + 1)], end
+
+
+    def read(self, cursor: int, epoch: Optional[str], limit: int) -> ChangePage:
+        """
+        Satu halaman feed untuk klien yang mengirim `cursor` dan `epoch` dari respons sebelumnya.
+        """
+        store = self._store
+        if self._shared and store is not None:
+            feed = store.change_feed(cursor, limit)
+            if (epoch is not None and epoch != feed.epoch) or cursor < feed.first - 1 or cursor > feed.last:
+                return ChangePage(feed.epoch, True, [], feed.last, False)
+            return ChangePage(feed.epoch, False, [Change(*change) for change in feed.changes],
+                              feed.next, feed.next < feed.last)
+        if epoch is not None and epoch != self.epoch:
+            return ChangePage(self.epoch, True, [], self.seq, False)
+        resync, changes, next_seq = self.since(cursor, limit)
+        return ChangePage(self.epoch, resync, changes, next_seq, next_seq < self.seq)
+
+
+change_log = ChangeLog()
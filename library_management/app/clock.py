@@ -0,0 +1,35 @@
+from datetime import date, datetime, time, timedelta
+
+# ==================================
+#               JAM
+# ==================================
+# Komponen yang bergantung pada tanggal (penjadwal, statistik) menerima objek jam
+# dengan method `today()` (dan `now()` jika butuh jam), sehingga test bisa memajukan
+# waktu tanpa `date.today()`.
+class SystemClock:
+    def today(self) -> date:
+        return date.today()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+
+class ManualClock:
+    """
+    Jam yang hanya maju jika diminta; dipakai saat testing.
+    """
+
+    def __init__(self, start: date):
+        self.current = start
+        self.seconds = 0.0  # Detik sejak tengah malam
+
+    def today(self) -> date:
+        return self.current
+
+    def now(self) -> datetime:
+        return datetime.combine(self.current, time()) + timedelta(seconds=self.seconds)
+
+    def advance(self, days: int = 1, hours: float = 0):
+        total = self.seconds + hours * 3600
+        self.current += timedelta(days=days + int(total // 86400))
+        self.seconds = total % 86400
@@ -0,0 +1,124 @@
+import os
+
+# ==================================
+#       KONFIGURASI APLIKASI
+# ==================================
+# Semua konfigurasi dibaca dari environment variable agar mudah diubah saat deployment.
+
+# Path file CSV/JSON berisi daftar pengguna. Jika kosong, dipakai data pengguna statis.
+USERS_FILE = os.getenv("LIBRARY_USERS_FILE", "")
+
+# Backend penyimpanan data: "memory" (default) atau "sqlite"
+STORAGE_BACKEND = os.getenv("LIBRARY_STORAGE_BACKEND", "memory")
+
+# Lokasi file database jika memakai backend SQLite
+SQLITE_PATH = os.getenv("LIBRARY_SQLITE_PATH", "library.db")
+
+# Jumlah proses worker (lihat `python -m app.serve`). Lebih dari 1 hanya didukung backend
+# SQLite: semua worker memakai database yang sama dan saling memberi tahu perubahan data
+# lewat penghitung generasi bersama, agar cache per worker ikut dibuang.
+WORKERS = int(os.getenv("LIBRARY_WORKERS", "1"))
+
+# Direktori journal + snapshot untuk backend memory. Jika kosong, data tidak disimpan ke disk.
+JOURNAL_DIR = os.getenv("LIBRARY_JOURNAL_DIR", "")
+
+# Lama waktu (ms) menunggu record lain sebelum fsync bersama (group commit)
+JOURNAL_GROUP_COMMIT_MS = float(os.getenv("LIBRARY_JOURNAL_GROUP_COMMIT_MS", "2"))
+
+# Interval snapshot otomatis dalam detik (0 = nonaktif)
+SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("LIBRARY_SNAPSHOT_INTERVAL_SECONDS", "300"))
+
+# Jumlah lock bergaris untuk stok buku pada backend memory
+INVENTORY_LOCK_STRIPES = int(os.getenv("LIBRARY_INVENTORY_LOCK_STRIPES", "64"))
+
+# Cache respons untuk endpoint katalog (GET /books/ dan GET /books/{id})
+RESPONSE_CACHE_ENABLED = os.getenv("LIBRARY_RESPONSE_CACHE_ENABLED", "1") not in ("0", "false", "False")
+
+# Batas ukuran cache respons (total byte body dan jumlah entri)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("LIBRARY_RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("LIBRARY_RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+
+# Direktori file arsip pinjaman yang sudah dikembalikan (file sementara yang di-mmap).
+# Jika kosong, dipakai direktori sementara bawaan sistem.
+LOAN_ARCHIVE_DIR = os.getenv("LIBRARY_LOAN_ARCHIVE_DIR", "")
+
+# Penjadwal jatuh tempo: aktif/tidak, interval pengecekan (detik), dan jumlah hari
+# sebelum jatuh tempo untuk mengirim pengingat (0 = tanpa pengingat)
+SCHEDULER_ENABLED = os.getenv("LIBRARY_SCHEDULER_ENABLED", "1") not in ("0", "false", "False")
+SCHEDULER_INTERVAL_SECONDS = float(os.getenv("LIBRARY_SCHEDULER_INTERVAL_SECONDS", "60"))
+REMINDER_DAYS_BEFORE_DUE = int(os.getenv("LIBRARY_REMINDER_DAYS_BEFORE_DUE", "2"))
+
+# Tujuan event penjadwal, dipisah koma: "log", "file", "queue"
+SCHEDULER_SINKS = os.getenv("LIBRARY_SCHEDULER_SINKS", "log").split(",")
+# File NDJSON untuk sink "file"
+SCHEDULER_EVENTS_FILE = os.getenv("LIBRARY_SCHEDULER_EVENTS_FILE", "")
+
+# Statistik sirkulasi: panjang jendela "terpopuler" (hari) dan lama penyimpanan
+# jumlah pinjam/kembali harian (hari)
+STATS_WINDOW_DAYS = int(os.getenv("LIBRARY_STATS_WINDOW_DAYS", "7"))
+STATS_RETENTION_DAYS = int(os.getenv("LIBRARY_STATS_RETENTION_DAYS", "90"))
+
+# Endpoint /metrics (format Prometheus) dan middleware pencatat latensi per route
+METRICS_ENABLED = os.getenv("LIBRARY_METRICS_ENABLED", "1") not in ("0", "false", "False")
+
+# Profiling request: sampling acak (fraksi 0-1) dengan cProfile, dan stack sampler yang
+# menyimpan profil request yang lebih lambat dari PROFILE_SLOW_MS. Jika aktif, admin juga
+# bisa memaksa profil satu request dengan header `X-Profile: 1`.
+PROFILING_ENABLED = os.getenv("LIBRARY_PROFILING_ENABLED", "0") not in ("0", "false", "False")
+PROFILE_SAMPLE_RATE = float(os.getenv("LIBRARY_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.getenv("LIBRARY_PROFILE_SLOW_MS", "500"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("LIBRARY_PROFILE_SAMPLE_INTERVAL_MS", "5"))
+# Direktori file profil (.pstats / .collapsed); jika kosong dipakai direktori sementara
+PROFILE_DIR = os.getenv("LIBRARY_PROFILE_DIR", "")
+# Jumlah trace terakhir yang disimpan; file trace yang lebih lama dihapus
+PROFILE_KEEP = int(os.getenv("LIBRARY_PROFILE_KEEP", "100"))
+
+# Antrean reservasi buku yang stoknya habis: lama salinan yang dikembalikan disimpan
+# untuk peminjam berikutnya di antrean (jam), dan interval pengecekan hold kedaluwarsa (detik)
+HOLD_WINDOW_HOURS = float(os.getenv("LIBRARY_HOLD_WINDOW_HOURS", "24"))
+HOLD_EXPIRY_CHECK_SECONDS = float(os.getenv("LIBRARY_HOLD_EXPIRY_CHECK_SECONDS", "60"))
+
+# Jumlah perubahan terakhir yang disimpan change log (GET /changes). Klien yang
+# tertinggal lebih jauh dari ini harus memuat ulang seluruh data.
+CHANGE_LOG_SIZE = int(os.getenv("LIBRARY_CHANGE_LOG_SIZE", "10000"))
+
+# Admission control untuk jalur transaksi: token bucket per user dan global, antrean
+# terbatas (admin dan user prioritas dilayani lebih dulu), serta penolakan cepat 429/503
+# dengan Retry-After saat antrean penuh atau waktu tunggu melewati batas.
+ADMISSION_ENABLED = os.getenv("LIBRARY_ADMISSION_ENABLED", "1") not in ("0", "false", "False")
+# Prefix path yang dibatasi, dipisah koma
+ADMISSION_PATHS = tuple(p for p in os.getenv("LIBRARY_ADMISSION_PATHS", "/borrow,/return,/extend,/transactions,/loans").split(",") if p)
+# Request per detik dan ukuran burst per user; rate global 0 = tanpa batas global
+ADMISSION_USER_RATE = float(os.getenv("LIBRARY_ADMISSION_USER_RATE", "20"))
+ADMISSION_USER_BURST = float(os.getenv("LIBRARY_ADMISSION_USER_BURST", "40"))
+ADMISSION_GLOBAL_RATE = float(os.getenv("LIBRARY_ADMISSION_GLOBAL_RATE", "0"))
+ADMISSION_GLOBAL_BURST = float(os.getenv("LIBRARY_ADMISSION_GLOBAL_BURST", "200"))
+# Jumlah request jalur transaksi yang diproses bersamaan (di bawah ukuran thread pool)
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("LIBRARY_ADMISSION_MAX_CONCURRENCY", "32"))
+# Antrean tunggu: jumlah maksimal, lama maksimal menunggu (ms), dan batas rata-rata waktu
+# tunggu (ms) sebelum request baru non-prioritas langsung ditolak
+ADMISSION_QUEUE_SIZE = int(os.getenv("LIBRARY_ADMISSION_QUEUE_SIZE", "256"))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("LIBRARY_ADMISSION_QUEUE_TIMEOUT_MS", "2000"))
+ADMISSION_MAX_QUEUE_WAIT_MS = float(os.getenv("LIBRARY_ADMISSION_MAX_QUEUE_WAIT_MS", "500"))
+# ID user prioritas selain admin (misalnya komputer meja sirkulasi), dipisah koma
+ADMISSION_PRIORITY_USERS = {int(i) for i in os.getenv("LIBRARY_ADMISSION_PRIORITY_USERS", "").split(",") if i.strip()}
+# Bucket user yang tidak dipakai selama ini (detik) dibuang; juga batas jumlah bucket
+ADMISSION_IDLE_SECONDS = float(os.getenv("LIBRARY_ADMISSION_IDLE_SECONDS", "300"))
+ADMISSION_MAX_BUCKETS = int(os.getenv("LIBRARY_ADMISSION_MAX_BUCKETS", "100000"))
+
+# Header Idempotency-Key pada endpoint yang mengubah data: respons pertama disimpan
+# selama IDEMPOTENCY_TTL_SECONDS dan dikirim ulang untuk request ulang dengan key yang sama.
+IDEMPOTENCY_ENABLED = os.getenv("LIBRARY_IDEMPOTENCY_ENABLED", "1") not in ("0", "false", "False")
+IDEMPOTENCY_PATHS = tuple(p for p in os.getenv("LIBRARY_IDEMPOTENCY_PATHS", "/books,/borrow,/return,/extend,/transactions").split(",") if p)
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("LIBRARY_IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("LIBRARY_IDEMPOTENCY_MAX_ENTRIES", "10000"))
+IDEMPOTENCY_MAX_BYTES = int(os.getenv("LIBRARY_IDEMPOTENCY_MAX_BYTES", str(16 * 1024 * 1024)))
+# Path yang body-nya di-stream (impor massal) tidak dibaca utuh ke memori, jadi header diabaikan
+IDEMPOTENCY_EXCLUDED_PATHS = tuple(p for p in os.getenv("LIBRARY_IDEMPOTENCY_EXCLUDED_PATHS", "/books/bulk").split(",") if p)
+# Mode multi-worker: respons disimpan di SQLite bersama; klaim request yang sedang berjalan
+# dianggap batal setelah sekian detik (misalnya jika worker pemiliknya mati)
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("LIBRARY_IDEMPOTENCY_LEASE_SECONDS", "60"))
+
+# Mode respons cepat (opt-in): endpoint buku dan transaksi mengirim byte JSON dari
+# TypeAdapter.dump_json tanpa validasi ulang lewat response_model. Schema OpenAPI tetap sama.
+FAST_RESPONSES = os.getenv("LIBRARY_FAST_RESPONSES", "0") not in ("0", "false", "False")
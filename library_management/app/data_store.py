@@ -1,38 +1,688 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple, Iterator, Optional, Iterable
+from array import array
+from functools import lru_cache
+import csv
+import json
+import os
+import threading
 import uuid
 from datetime import date, timedelta
+import numpy as np
+from . import config
 from .schemas import Book, User, LoanRecord
+from .search import BookSearchIndex
+from .sorted_index import SortedIndex, UUIDSortedIndex
+from .loan_archive import LoanArchive, ArchiveRow, FLAG_EXTENDED, FLAG_DEAD
+from .loan_history import LoanDateIndex, LoanHistoryQuery, HistoryCursor, date_key, RETURN_DATE, STATUS_ACTIVE, STATUS_RETURNED
+from .fines import LoanColumns
 
 # ==================================
 #         "DATABASE" PENGGUNA
 # ==================================
+class UserRegistry:
+    """
+    Registri pengguna yang diindeks berdasarkan ID.
+    Pencarian dilakukan lewat satu Dictionary sehingga waktunya konstan. Saat reload,
+    Dictionary baru dibangun terpisah lalu ditukar sekaligus, jadi request yang sedang
+    berjalan tidak pernah melihat data setengah jadi dan tidak perlu menunggu lock.
+    """
+
+    def __init__(self, users: Iterable[User] = ()):
+        self._by_id: Dict[int, User] = {user.id: user for user in users}
+        self.source_path: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[User]:
+        return iter(list(self._by_id.values()))
+
+    def get(self, user_id: int) -> Optional[User]:
+        return self._by_id.get(user_id)
+
+    def replace_all(self, users: Iterable[User]):
+        """
+        Mengganti seluruh isi registri secara atomik.
+        """
+        self._by_id = {user.id: user for user in users}
+
+    def load_file(self, path: str) -> int:
+        """
+        Memuat pengguna dari file CSV (kolom `id,role`) atau JSON (list objek `{"id", "role"}`).
+        Mengembalikan jumlah pengguna yang dimuat. Jika ada baris yang tidak valid, ValueError
+        dilempar dan isi registri tidak berubah.
+        """
+        _, ext = os.path.splitext(path)
+        with open(path, newline="", encoding="utf-8") as f:
+            if ext.lower() == ".json":
+                rows = json.load(f)
+            else:
+                rows = csv.DictReader(f)
+            try:
+                users = [User(id=int(row["id"]), role=row["role"].strip()) for row in rows]
+            except (KeyError, TypeError, AttributeError) as e:
+                # Misalnya kolom yang hilang, `"role": null`, atau JSON yang bukan list objek
+                raise ValueError(f"Baris pengguna tidak valid: {e!r}") from e
+        self.replace_all(users)
+        self.source_path = path
+        return len(users)
+
+    def reload(self) -> int:
+        """
+        Memuat ulang registri dari file yang terakhir dipakai.
+        """
+        if not self.source_path:
+            raise ValueError("Registri pengguna tidak dimuat dari file.")
+        return self.load_file(self.source_path)
+
+
 # Di dunia nyata, ini akan ada di tabel database.
-# Untuk proyek ini, kita definisikan secara statis.
-users_db: List[User] = [
+# Data statis ini dipakai jika tidak ada file pengguna yang dikonfigurasi.
+users_db: UserRegistry = UserRegistry([
     User(id=1, role="admin"),
     User(id=101, role="mahasiswa"),
     User(id=102, role="mahasiswa"),
-]
+])
 
 
 # ==================================
 #         "DATABASE" BUKU
 # ==================================
+class BookCatalog(dict):
+    """
+    Dictionary buku yang juga menjaga indeks terurut berdasarkan ID, indeks buku
+    yang stoknya tersedia, dan indeks pencarian judul/penulis. Perubahan stok sebaiknya
+    lewat `adjust_stock`, dan perubahan data lain disimpan ulang (`books_db[id] = book`)
+    agar semua indeks ikut diperbarui.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._sorted_ids = UUIDSortedIndex()
+        self._in_stock_ids = UUIDSortedIndex()
+        self.search_index = BookSearchIndex()
+
+    def __setitem__(self, book_id: uuid.UUID, book: Book):
+        super().__setitem__(book_id, book)
+        self._sorted_ids.add(book_id)
+        self.refresh_stock(book_id)
+        self.search_index.add(book)
+
+    def __delitem__(self, book_id: uuid.UUID):
+        super().__delitem__(book_id)
+        self._sorted_ids.discard(book_id)
+        self._in_stock_ids.discard(book_id)
+        self.search_index.remove(book_id)
+
+    def pop(self, book_id: uuid.UUID, *default):
+        if book_id in self:
+            book = self[book_id]
+            del self[book_id]
+            return book
+        return super().pop(book_id, *default)
+
+    def update(self, *args, **kwargs):
+        for book_id, book in dict(*args, **kwargs).items():
+            self[book_id] = book
+
+    def add_new(self, books: List[Book]):
+        """
+        Menambahkan banyak buku baru sekaligus (ID belum ada di katalog).
+        Indeks terurut diperbarui sekali per batch, bukan per buku.
+        """
+        for book in books:
+            super().__setitem__(book.id, book)
+        self._sorted_ids.add_many(book.id for book in books)
+        self._in_stock_ids.add_many(book.id for book in books if book.stock > 0)
+        self.search_index.add_many(books)
+
+    def clear(self):
+        super().clear()
+        self._sorted_ids.clear()
+        self._in_stock_ids.clear()
+        self.search_index.clear()
+
+    def refresh_stock(self, book_id: uuid.UUID):
+        """
+        Menyelaraskan indeks stok dengan nilai `stock` buku saat ini.
+        """
+        book = self.get(book_id)
+        if book is not None and book.stock > 0:
+            self._in_stock_ids.add(book_id)
+        else:
+            self._in_stock_ids.discard(book_id)
+
+    def adjust_stock(self, book_id: uuid.UUID, delta: int) -> Book:
+        """
+        Menambah/mengurangi stok buku dan memperbarui indeks stok.
+        """
+        book = self[book_id]
+        book.stock += delta
+        self.refresh_stock(book_id)
+        return book
+
+    def page(self, after: Optional[uuid.UUID] = None, limit: Optional[int] = None,
+             available_only: bool = False) -> List[Book]:
+        """
+        Mengambil satu halaman buku, diurutkan berdasarkan ID, setelah cursor `after`.
+        """
+        index = self._in_stock_ids if available_only else self._sorted_ids
+        books = [self[book_id] for book_id in index.page(after, limit) if book_id in self]
+        if available_only:
+            # Jaga-jaga jika stok diubah langsung tanpa refresh_stock
+            books = [book for book in books if book.stock > 0]
+        return books
+
+
 # Menggunakan Dictionary untuk pencarian cepat berdasarkan ID.
 # Format: { book_id: Book_Object }
-books_db: Dict[uuid.UUID, Book] = {}
+books_db: BookCatalog = BookCatalog()
 
 
 # ==================================
 #      "DATABASE" PEMINJAMAN
 # ==================================
-# Menggunakan List karena kita seringkali akan mengiterasi semua pinjaman.
-loans_db: List[LoanRecord] = []
+class LoanRef:
+    """
+    Akses langsung ke satu pinjaman di repository, dipakai untuk inspeksi dan testing.
+    Setiap atribut dibaca dari kolom penyimpanan, dan perubahan atribut pinjaman aktif
+    langsung ditulis ke kolomnya. Kode aplikasi memakai method LoanRepository yang
+    mengembalikan LoanRecord.
+    """
+    __slots__ = ("_repo", "id")
+
+    def __init__(self, repo: "LoanRepository", loan_id: uuid.UUID):
+        object.__setattr__(self, "_repo", repo)
+        object.__setattr__(self, "id", loan_id)
+
+    def __getattr__(self, name: str):
+        return getattr(self._repo.get(self.id), name)
+
+    def __setattr__(self, name: str, value):
+        self._repo.update_active(self.id, **{name: value})
+
+
+# Field pinjaman dalam urutan yang sama dengan LoanRecord (tanggal sebagai ordinal hari,
+# 0 berarti belum dikembalikan): (id.int, user_id, book_id, pinjam, jatuh tempo, kembali,
+# diperpanjang, pinjam awal, denda). Dipakai untuk memuat/menyimpan snapshot tanpa
+# membuat objek LoanRecord.
+LoanFields = Tuple[int, int, uuid.UUID, int, int, int, bool, int, int]
+
+# Field pinjaman aktif yang boleh diubah lewat `update_active`
+_EDITABLE_DATES = {"borrow_date": "_borrow", "due_date": "_due", "initial_borrow_date": "_initial"}
+
+_from_ordinal = lru_cache(maxsize=65536)(date.fromordinal)
+# Jumlah baris per potongan saat membangun indeks tanggal di `load_fields`
+_LOAD_CHUNK_SIZE = 1 << 18
+_MASK_64 = (1 << 64) - 1
+
+
+class LoanRepository:
+    """
+    Penyimpanan riwayat peminjaman beserta indeks pencariannya.
+
+    Data pinjaman tidak disimpan sebagai objek LoanRecord, melainkan sebagai kolom
+    lebar tetap (`array`): user ID, kode buku (UUID buku disimpan sekali), tanggal
+    sebagai ordinal hari, dan flag dalam satu byte. Pinjaman aktif ada di kolom RAM;
+    begitu dikembalikan, pinjaman langsung dipindahkan ke arsip (`LoanArchive`) yang
+    di-memory-map. LoanRecord hanya dibuat saat data dibaca oleh storage/router.
+    Riwayat pinjaman diindeks berdasarkan tanggal pinjam/kembali di `date_index`.
+
+    Semua perubahan harus lewat method di sini agar indeks tetap sinkron. Kolom
+    dijaga satu lock internal yang hanya dipegang sebentar; lock per buku di
+    MemoryStore tetap dipakai untuk aturan bisnis (stok, pinjaman ganda).
+    """
+
+    def __init__(self, archive_dir: Optional[str] = None):
+        self._lock = threading.RLock()
+        self._book_codes: Dict[uuid.UUID, int] = {}
+        self._book_ids: List[uuid.UUID] = []
+        # Kolom pinjaman aktif; satu slot = satu pinjaman, slot kosong dipakai ulang
+        # (slot kosong ditandai FLAG_DEAD)
+        self._id_hi = array("Q")
+        self._id_lo = array("Q")
+        self._user = array("q")
+        self._book = array("I")
+        self._borrow = array("i")
+        self._due = array("i")
+        self._initial = array("i")
+        self._seq = array("Q")
+        self._flags = array("B")
+        self._free_slots: List[int] = []
+        self._next_seq = 0
+        # Indeks pinjaman aktif (key: id.int)
+        self._slot_by_id: Dict[int, int] = {}
+        self._active_by_user: Dict[int, Dict[int, None]] = {}
+        self._active_by_pair: Dict[Tuple[int, int], int] = {}
+        self._active_sorted_ids = SortedIndex()
+        self.archive = LoanArchive(archive_dir)
+        self.date_index = LoanDateIndex()
+
+    # --- Konversi baris <-> LoanRecord ---
+    def _book_code(self, book_id: uuid.UUID) -> int:
+        code = self._book_codes.get(book_id)
+        if code is None:
+            code = self._book_codes[book_id] = len(self._book_ids)
+            self._book_ids.append(book_id)
+        return code
+
+    def _record(self, row: ArchiveRow) -> LoanRecord:
+        loan_id, user_id, book_code, borrow, due, initial, returned, fine, _, flags = row
+        return LoanRecord.model_construct(
+            id=uuid.UUID(int=loan_id),
+            user_id=user_id,
+            book_id=self._book_ids[book_code],
+            borrow_date=_from_ordinal(borrow),
+            due_date=_from_ordinal(due),
+            return_date=_from_ordinal(returned) if returned else None,
+            extended=bool(flags & FLAG_EXTENDED),
+            initial_borrow_date=_from_ordinal(initial),
+            fine=fine,
+        )
+
+    def _row(self, fields: LoanFields, seq: int) -> ArchiveRow:
+        loan_id, user_id, book_id, borrow, due, returned, extended, initial, fine = fields
+        return (loan_id, user_id, self._book_code(book_id), borrow, due, initial,
+                returned, fine, seq, FLAG_EXTENDED if extended else 0)
+
+    def _fields(self, row: ArchiveRow) -> LoanFields:
+        loan_id, user_id, book_code, borrow, due, initial, returned, fine, _, flags = row
+        return (loan_id, user_id, self._book_ids[book_code], borrow, due, returned,
+                bool(flags & FLAG_EXTENDED), initial, fine)
+
+    @staticmethod
+    def record_fields(loan: LoanRecord) -> LoanFields:
+        return (loan.id.int, loan.user_id, loan.book_id, loan.borrow_date.toordinal(),
+                loan.due_date.toordinal(), loan.return_date.toordinal() if loan.return_date else 0,
+                loan.extended, loan.initial_borrow_date.toordinal(), loan.fine)
+
+    # --- Kolom pinjaman aktif ---
+    def _hot_row(self, loan_id: int, slot: int) -> ArchiveRow:
+        return (loan_id, self._user[slot], self._book[slot], self._borrow[slot], self._due[slot],
+                self._initial[slot], 0, 0, self._seq[slot], self._flags[slot])
+
+    def _hot_insert(self, row: ArchiveRow, index_sorted: bool = True):
+        loan_id, user_id, book_code, borrow, due, initial, _, _, seq, flags = row
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._id_hi[slot] = loan_id >> 64
+            self._id_lo[slot] = loan_id & _MASK_64
+            self._user[slot] = user_id
+            self._book[slot] = book_code
+            self._borrow[slot] = borrow
+            self._due[slot] = due
+            self._initial[slot] = initial
+            self._seq[slot] = seq
+            self._flags[slot] = flags
+        else:
+            slot = len(self._user)
+            self._id_hi.append(loan_id >> 64)
+            self._id_lo.append(loan_id & _MASK_64)
+            self._user.append(user_id)
+            self._book.append(book_code)
+            self._borrow.append(borrow)
+            self._due.append(due)
+            self._initial.append(initial)
+            self._seq.append(seq)
+            self._flags.append(flags)
+        self._slot_by_id[loan_id] = slot
+        self._active_by_user.setdefault(user_id, {})[loan_id] = None
+        self._active_by_pair[(user_id, book_code)] = loan_id
+        if index_sorted:
+            self._active_sorted_ids.add(loan_id)
+
+    def _hot_remove(self, loan_id: int) -> ArchiveRow:
+        slot = self._slot_by_id.pop(loan_id)
+        row = self._hot_row(loan_id, slot)
+        user_id, book_code = row[1], row[2]
+        user_loans = self._active_by_user[user_id]
+        del user_loans[loan_id]
+        if not user_loans:
+            del self._active_by_user[user_id]
+        if self._active_by_pair.get((user_id, book_code)) == loan_id:
+            del self._active_by_pair[(user_id, book_code)]
+        self._active_sorted_ids.discard(loan_id)
+        self._flags[slot] = FLAG_DEAD
+        self._free_slots.append(slot)
+        return row
+
+    def _get_row(self, loan_id: int) -> Optional[ArchiveRow]:
+        slot = self._slot_by_id.get(loan_id)
+        if slot is not None:
+            return self._hot_row(loan_id, slot)
+        return self.archive.get(loan_id)
+
+    def _insert(self, row: ArchiveRow, index_sorted: bool = True):
+        if index_sorted:
+            self.date_index.add(row)
+        if row[6]:
+            self.archive.append(row)
+        else:
+            self._hot_insert(row, index_sorted)
+
+    def _next(self) -> int:
+        self._next_seq += 1
+        return self._next_seq
+
+    # --- Kompatibilitas dengan List ---
+    def __len__(self) -> int:
+        return len(self._slot_by_id) + len(self.archive)
+
+    def active_count(self) -> int:
+        return len(self._slot_by_id)
+
+    def rows(self) -> List[ArchiveRow]:
+        """
+        Semua pinjaman sebagai baris kolom: pinjaman di arsip, lalu pinjaman aktif
+        (masing-masing urut sesuai waktu masuk).
+        """
+        with self._lock:
+            hot = sorted((self._hot_row(loan_id, slot) for loan_id, slot in self._slot_by_id.items()),
+                         key=lambda row: row[8])
+            return list(self.archive) + hot
+
+    def __iter__(self) -> Iterator[LoanRecord]:
+        return (self._record(row) for row in self.rows())
+
+    def __getitem__(self, index: int) -> LoanRef:
+        return LoanRef(self, uuid.UUID(int=self.rows()[index][0]))
+
+    def append(self, loan: LoanRecord):
+        """
+        Menambahkan pinjaman baru dan mendaftarkannya ke semua indeks.
+        """
+        with self._lock:
+            self._insert(self._row(self.record_fields(loan), self._next()))
+
+    def extend(self, loans: Iterable[LoanRecord]):
+        self.load_fields(self.record_fields(loan) for loan in loans)
+
+    def load_fields(self, items: Iterable[LoanFields]):
+        """
+        Menambahkan banyak pinjaman sekaligus, misalnya saat memuat snapshot.
+        Indeks terurut pinjaman aktif dan indeks tanggal dibangun per potongan besar.
+        """
+        with self._lock:
+            active_ids = []
+            rows = []
+            for fields in items:
+                row = self._row(fields, self._next())
+                self._insert(row, index_sorted=False)
+                if not row[6]:
+                    active_ids.append(row[0])
+                rows.append(row)
+                if len(rows) == _LOAD_CHUNK_SIZE:
+                    self.date_index.add_many(rows)
+                    rows = []
+            self.date_index.add_many(rows)
+            self._active_sorted_ids.add_many(active_ids)
+
+    def dump_fields(self) -> List[LoanFields]:
+        """
+        Semua pinjaman dalam bentuk `LoanFields`, misalnya untuk ditulis ke snapshot.
+        """
+        return [self._fields(row) for row in self.rows()]
+
+    def clear(self):
+        with self._lock:
+            for column in (self._id_hi, self._id_lo, self._user, self._book, self._borrow, self._due, self._initial, self._seq, self._flags):
+                del column[:]
+            self._free_slots.clear()
+            self._book_codes.clear()
+            self._book_ids.clear()
+            self._slot_by_id.clear()
+            self._active_by_user.clear()
+            self._active_by_pair.clear()
+            self._active_sorted_ids.clear()
+            self.archive.clear()
+            self.date_index.clear()
+
+    # --- Pencarian ---
+    def get(self, loan_id: uuid.UUID) -> Optional[LoanRecord]:
+        with self._lock:
+            row = self._get_row(loan_id.int)
+            return self._record(row) if row is not None else None
+
+    def find_active(self, user_id: int, book_id: uuid.UUID) -> Optional[LoanRecord]:
+        """
+        Mencari pinjaman aktif milik user untuk buku tertentu.
+        """
+        with self._lock:
+            book_code = self._book_codes.get(book_id)
+            loan_id = self._active_by_pair.get((user_id, book_code))
+            if loan_id is None:
+                return None
+            return self._record(self._hot_row(loan_id, self._slot_by_id[loan_id]))
+
+    def loans_for_user(self, user_id: int) -> List[LoanRecord]:
+        with self._lock:
+            rows = self.archive.rows_for_user(user_id)
+            rows.extend(self._hot_row(loan_id, self._slot_by_id[loan_id])
+                        for loan_id in self._active_by_user.get(user_id, ()))
+            rows.sort(key=lambda row: row[8])
+            return [self._record(row) for row in rows]
+
+    def _active_records(self, loan_ids: Iterable[int]) -> List[LoanRecord]:
+        # Harus dipanggil saat memegang lock
+        slots = self._slot_by_id
+        return [self._record(self._hot_row(loan_id, slots[loan_id])) for loan_id in loan_ids if loan_id in slots]
+
+    def active_for_user(self, user_id: int) -> List[LoanRecord]:
+        with self._lock:
+            return self._active_records(self._active_by_user.get(user_id, ()))
+
+    def active_loans(self) -> List[LoanRecord]:
+        with self._lock:
+            return self._active_records(self._slot_by_id)
+
+    def active_page(self, after: Optional[uuid.UUID] = None, limit: Optional[int] = None) -> List[LoanRecord]:
+        """
+        Mengambil satu halaman pinjaman aktif, diurutkan berdasarkan ID pinjaman.
+        """
+        with self._lock:
+            loan_ids = self._active_sorted_ids.page(None if after is None else after.int, limit)
+            return self._active_records(loan_ids)
+
+    def active_columns(self) -> LoanColumns:
+        """
+        Salinan kolom semua pinjaman aktif sebagai array NumPy (untuk perhitungan massal).
+        """
+        with self._lock:
+            # View NumPy langsung ke buffer `array`; harus dilepas sebelum lock dilepas
+            # karena `array` yang sedang diekspor tidak bisa bertambah panjang.
+            flags = np.frombuffer(self._flags, dtype=np.uint8) if len(self._flags) else np.zeros(0, np.uint8)
+            live = (flags & FLAG_DEAD) == 0
+            extended = (flags[live] & FLAG_EXTENDED) != 0
+            del flags
+
+            def take(column, dtype):
+                if not len(column):
+                    return np.zeros(0, dtype)
+                return np.frombuffer(column, dtype=dtype)[live]
+
+            return LoanColumns(
+                id_hi=take(self._id_hi, np.uint64),
+                id_lo=take(self._id_lo, np.uint64),
+                user_id=take(self._user, np.int64),
+                book_code=take(self._book, np.uint32),
+                book_ids=list(self._book_ids),
+                due=take(self._due, np.int32),
+                initial=take(self._initial, np.int32),
+                extended=extended,
+            )
+
+    def history(self, query: LoanHistoryQuery, after: Optional[HistoryCursor] = None,
+                limit: Optional[int] = None) -> List[LoanRecord]:
+        """
+        Riwayat pinjaman sesuai filter, terurut berdasarkan (tanggal `query.sort_by`,
+        nomor urut pinjaman), setelah cursor `after`. Biayanya satu bisect ditambah
+        jumlah key yang dibaca dari indeks paling sempit yang cocok dengan filter.
+        """
+        by_return = query.sort_by == RETURN_DATE
+        if by_return and query.status == STATUS_ACTIVE:
+            return []
+        with self._lock:
+            book_code = None
+            if query.book_id is not None:
+                book_code = self._book_codes.get(query.book_id)
+                if book_code is None:
+                    return []
+            index = self.date_index
+            keys = index.keys_for(by_return, query.user_id, book_code, query.status == STATUS_ACTIVE)
+            if keys is None:
+                return []
+            start = keys.position(date_key(query.start.toordinal())) if query.start else 0
+            if after is not None:
+                ordinal = after.date.toordinal()
+                row = self._get_row(after.loan_id.int)
+                if row is not None and row[6 if by_return else 3] == ordinal:
+                    start = max(start, keys.position(date_key(ordinal, row[8]) + 1))
+                else:
+                    # Pinjaman cursor sudah tidak ada: mulai dari awal tanggalnya (bisa ada
+                    # pinjaman yang terkirim ulang, tetapi tidak ada yang terlewat)
+                    start = max(start, keys.position(date_key(ordinal)))
+            end_key = date_key(query.end.toordinal() + 1) if query.end else None
+
+            records: List[LoanRecord] = []
+            sorted_keys = keys.ordered()
+            for i in range(start, len(sorted_keys)):
+                if limit is not None and len(records) >= limit:
+                    break
+                key = sorted_keys[i]
+                if end_key is not None and key >= end_key:
+                    break
+                row = self._get_row(index.loan_id(key))
+                if query.user_id is not None and row[1] != query.user_id:
+                    continue
+                if book_code is not None and row[2] != book_code:
+                    continue
+                if query.status is not None and bool(row[6]) != (query.status == STATUS_RETURNED):
+                    continue
+                records.append(self._record(row))
+            return records
+
+    # --- Perubahan status ---
+    def _active_slot(self, loan_id: uuid.UUID) -> int:
+        slot = self._slot_by_id.get(loan_id.int)
+        if slot is None:
+            raise KeyError(f"Pinjaman aktif tidak ditemukan: {loan_id}")
+        return slot
+
+    def mark_returned(self, loan_id: uuid.UUID, return_date: date, fine: int = 0) -> LoanRecord:
+        """
+        Menandai pinjaman sebagai sudah dikembalikan dan memindahkannya ke arsip.
+        """
+        with self._lock:
+            self._active_slot(loan_id)
+            active = self._hot_remove(loan_id.int)
+            row = active[:6] + (return_date.toordinal(), fine) + active[8:]
+            self.archive.append(row)
+            self.date_index.discard(active)
+            self.date_index.add(row)
+            return self._record(row)
+
+    def mark_extended(self, loan_id: uuid.UUID, new_due_date: date) -> LoanRecord:
+        """
+        Menyimpan perpanjangan masa pinjam.
+        """
+        with self._lock:
+            slot = self._active_slot(loan_id)
+            self._due[slot] = new_due_date.toordinal()
+            self._flags[slot] |= FLAG_EXTENDED
+            return self._record(self._hot_row(loan_id.int, slot))
+
+    def unmark_extended(self, loan_id: uuid.UUID, previous_due_date: date) -> LoanRecord:
+        """
+        Membatalkan perpanjangan (dipakai saat rollback transaksi batch).
+        """
+        with self._lock:
+            slot = self._active_slot(loan_id)
+            self._due[slot] = previous_due_date.toordinal()
+            self._flags[slot] &= ~FLAG_EXTENDED
+            return self._record(self._hot_row(loan_id.int, slot))
+
+    def update_active(self, loan_id: uuid.UUID, **changes) -> LoanRecord:
+        """
+        Mengubah tanggal atau status perpanjangan pinjaman aktif secara langsung.
+        """
+        with self._lock:
+            slot = self._active_slot(loan_id)
+            before = self._hot_row(loan_id.int, slot)
+            for name, value in changes.items():
+                if name == "extended":
+                    self._flags[slot] = (self._flags[slot] | FLAG_EXTENDED) if value else (self._flags[slot] & ~FLAG_EXTENDED)
+                elif name in _EDITABLE_DATES:
+                    getattr(self, _EDITABLE_DATES[name])[slot] = value.toordinal()
+                else:
+                    raise AttributeError(f"Field pinjaman tidak bisa diubah: {name}")
+            row = self._hot_row(loan_id.int, slot)
+            if row[3] != before[3]:
+                self.date_index.discard(before)
+                self.date_index.add(row)
+            return self._record(row)
+
+    def unmark_returned(self, loan_id: uuid.UUID) -> LoanRecord:
+        """
+        Membatalkan pengembalian (dipakai saat rollback transaksi batch): pinjaman
+        dikeluarkan dari arsip dan kembali menjadi pinjaman aktif.
+        """
+        with self._lock:
+            row = self.archive.get(loan_id.int)
+            if row is None:
+                raise KeyError(f"Pinjaman tidak ada di arsip: {loan_id}")
+            self.archive.discard(loan_id.int)
+            self.date_index.discard(row)
+            row = row[:6] + (0, 0) + row[8:]
+            self._hot_insert(row)
+            self.date_index.add(row)
+            return self._record(row)
+
+    def remove(self, loan_id: uuid.UUID):
+        """
+        Menghapus pinjaman dari riwayat (dipakai saat rollback peminjaman).
+        """
+        with self._lock:
+            row = self._get_row(loan_id.int)
+            if row is None:
+                return
+            self.date_index.discard(row)
+            if loan_id.int in self._slot_by_id:
+                self._hot_remove(loan_id.int)
+            else:
+                self.archive.discard(loan_id.int)
+
+    def restore(self, loan: LoanRecord):
+        """
+        Menyimpan state pinjaman hasil pemulihan (snapshot/journal). Jika ID sudah ada,
+        datanya diganti dan pinjaman dipindahkan antara kolom aktif dan arsip sesuai statusnya.
+        """
+        with self._lock:
+            existing = self._get_row(loan.id.int)
+            if existing is None:
+                seq = self._next()
+            else:
+                seq = existing[8]
+                self.remove(loan.id)
+            self._insert(self._row(self.record_fields(loan), seq))
+
+    def close(self):
+        self.archive.close()
+
+
+# Riwayat disimpan di repository yang tetap bisa diiterasi seperti List.
+loans_db: LoanRepository = LoanRepository(config.LOAN_ARCHIVE_DIR or None)
 
 
 # ==================================
 #       FUNGSI DATA SEEDER
 # ==================================
+# Data buku awal: (judul, penulis, stok)
+SEED_BOOKS = [
+    ("Cloud Cuckoo Land", "Anthony Doerr", 5),
+    ("Project Hail Mary", "Andy Weir", 3),
+    ("Klara and the Sun", "Kazuo Ishiguro", 0),  # Contoh buku habis
+]
+
 def seed_initial_data():
     """
     Fungsi untuk mengisi data awal agar aplikasi tidak kosong saat dijalankan.
@@ -40,26 +690,7 @@ def seed_initial_data():
     """
     # Hanya seed jika database buku kosong
     if not books_db:
-        book1_id = uuid.uuid4()
-        book2_id = uuid.uuid4()
-        book3_id = uuid.uuid4()
-
-        books_db[book1_id] = Book(
-            id=book1_id,
-            title="Cloud Cuckoo Land",
-            author="Anthony Doerr",
-            stock=5
-        )
-        books_db[book2_id] = Book(
-            id=book2_id,
-            title="Project Hail Mary",
-            author="Andy Weir",
-            stock=3
-        )
-        books_db[book3_id] = Book(
-            id=book3_id,
-            title="Klara and the Sun",
-            author="Kazuo Ishiguro",
-            stock=0 # Contoh buku habis
-        )
+        for title, author, stock in SEED_BOOKS:
+            book_id = uuid.uuid4()
+            books_db[book_id] = Book(id=book_id, title=title, author=author, stock=stock)
         print("Initial book data has been seeded.")
@@ -1,4 +1,5 @@
 from fastapi import Header, HTTPException, status, Depends
+from . import config
 from .data_store import users_db
 from .schemas import User
 
@@ -7,7 +8,7 @@ def get_current_user(x_user_id: int = Header(..., description="ID unik pengguna
     Dependensi untuk mendapatkan data user dari header X-User-ID.
     Ini adalah cara otentikasi sederhana tanpa JWT.
     """
-    user = next((u for u in users_db if u.id == x_user_id), None)
+    user = users_db.get(x_user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -26,3 +27,15 @@ def require_admin_role(current_user: User = Depends(get_current_user)):
             detail="Akses ditolak. Endpoint ini hanya untuk admin."
         )
     return current_user
+
+def require_single_worker():
+    """
+    Dependensi untuk fitur yang state-nya hanya ada di memori satu proses. Jika aplikasi
+    berjalan dengan beberapa worker (LIBRARY_WORKERS > 1), request bisa mendarat di worker
+    yang tidak punya state tersebut, jadi fitur dimatikan dengan 501 Not Implemented.
+    """
+    if config.WORKERS > 1:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Fitur ini tidak tersedia saat aplikasi berjalan dengan beberapa worker (LIBRARY_WORKERS > 1)."
+        )
@@ -0,0 +1,220 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+import uuid
+
+import numpy as np
+
+from .schemas import LoanRecord, OverdueLoan, UserFineSummary, FineTotals
+
+# === KONFIGURASI ATURAN PEMINJAMAN ===
+LOAN_DURATION_DAYS = 14
+MAX_LOAN_DAYS_TOTAL = 30
+FINE_PER_DAY = 1000  # dalam Rupiah
+
+
+def calculate_fine(loan: LoanRecord, return_date: date) -> int:
+    """
+    Menghitung denda keterlambatan jika buku dikembalikan pada `return_date`.
+    """
+    if return_date > loan.due_date:
+        days_late = (return_date - loan.due_date).days
+        return days_late * FINE_PER_DAY
+    return 0
+
+
+# ==================================
+#     KOLOM PINJAMAN AKTIF (NUMPY)
+# ==================================
+@dataclass
+class LoanColumns:
+    """
+    Pinjaman aktif sebagai array sejajar (satu indeks = satu pinjaman).
+    Tanggal disimpan sebagai ordinal hari; buku disimpan sebagai kode ke `book_ids`.
+    """
+    id_hi: np.ndarray       # uint64, 64 bit atas ID pinjaman
+    id_lo: np.ndarray       # uint64, 64 bit bawah ID pinjaman
+    user_id: np.ndarray     # int64
+    book_code: np.ndarray   # uint32, indeks ke `book_ids`
+    book_ids: List[uuid.UUID]
+    due: np.ndarray         # int32
+    initial: np.ndarray     # int32, tanggal pinjam awal
+    extended: np.ndarray    # bool
+
+    def __len__(self) -> int:
+        return len(self.user_id)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, int, uuid.UUID, int, int, bool]]) -> "LoanColumns":
+        """
+        Membuat kolom dari tuple (id.int, user_id, book_id, ordinal jatuh tempo,
+        ordinal pinjam awal, diperpanjang).
+        """
+        book_codes = {}
+        ids, users, books, due, initial, extended = [], [], [], [], [], []
+        for loan_id, user_id, book_id, due_day, initial_day, is_extended in rows:
+            ids.append(loan_id)
+            users.append(user_id)
+            books.append(book_codes.setdefault(book_id, len(book_codes)))
+            due.append(due_day)
+            initial.append(initial_day)
+            extended.append(is_extended)
+        return cls(
+            id_hi=np.array([loan_id >> 64 for loan_id in ids], dtype=np.uint64),
+            id_lo=np.array([loan_id & 0xFFFFFFFFFFFFFFFF for loan_id in ids], dtype=np.uint64),
+            user_id=np.array(users, dtype=np.int64),
+            book_code=np.array(books, dtype=np.uint32),
+            book_ids=list(book_codes),
+            due=np.array(due, dtype=np.int32),
+            initial=np.array(initial, dtype=np.int32),
+            extended=np.array(extended, dtype=bool),
+        )
+
+    @classmethod
+    def from_records(cls, loans: Iterable[LoanRecord]) -> "LoanColumns":
+        """
+        Membuat kolom dari objek LoanRecord (untuk backend yang tidak menyimpan data per kolom).
+        """
+        return cls.from_rows(
+            (loan.id.int, loan.user_id, loan.book_id, loan.due_date.toordinal(),
+             loan.initial_borrow_date.toordinal(), loan.extended)
+            for loan in loans
+        )
+
+    def loan_id(self, i: int) -> uuid.UUID:
+        return uuid.UUID(int=(int(self.id_hi[i]) << 64) | int(self.id_lo[i]))
+
+
+# ==================================
+#        MESIN DENDA (BATCH)
+# ==================================
+def _descending_order(values: np.ndarray) -> np.ndarray:
+    """
+    Indeks yang mengurutkan `values` (bilangan >= 0) dari besar ke kecil; urutan data
+    yang nilainya sama tidak berubah. Jika rentangnya muat di 16 bit, NumPy memakai
+    radix sort yang jauh lebih cepat daripada sort perbandingan.
+    """
+    if not len(values):
+        return np.zeros(0, dtype=np.intp)
+    key = values.max() - values
+    if key.max() < 1 << 16:
+        key = key.astype(np.uint16)
+    return np.argsort(key, kind="stable")
+
+
+def _group_codes(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Seperti `np.unique(values, return_inverse=True)`. Jika rentang nilainya tidak jauh
+    lebih besar dari jumlah data, dipakai bincount (tanpa sort).
+    """
+    if not len(values):
+        return values, np.zeros(0, dtype=np.intp)
+    low = values.min()
+    span = int(values.max() - low) + 1
+    if span > 4 * len(values) + 1024:
+        return np.unique(values, return_inverse=True)
+    offsets = values - low
+    present = np.flatnonzero(np.bincount(offsets, minlength=span))
+    codes = np.zeros(span, dtype=np.intp)
+    codes[present] = np.arange(len(present))
+    return present + low, codes[offsets]
+
+
+class FineReport:
+    """
+    Menghitung hari keterlambatan dan denda berjalan untuk semua pinjaman aktif sekaligus,
+    seolah-olah semuanya dikembalikan pada tanggal `as_of`. Aturannya sama dengan
+    `calculate_fine` (denda per hari sejak jatuh tempo) dan pengecekan perpanjangan
+    di endpoint `/extend`.
+    """
+
+    def __init__(self, columns: LoanColumns, as_of: date):
+        self.columns = columns
+        self.as_of = as_of
+        days = np.int64(as_of.toordinal()) - columns.due.astype(np.int64)
+        self.days_overdue = np.maximum(days, 0)
+        self.fines = self.days_overdue * FINE_PER_DAY
+        self.overdue_index = np.flatnonzero(self.days_overdue)
+        # Sama dengan aturan perpanjangan: belum pernah diperpanjang dan total durasi
+        # setelah diperpanjang tidak melebihi MAX_LOAN_DAYS_TOTAL
+        total_days = columns.due.astype(np.int64) + LOAN_DURATION_DAYS - columns.initial
+        self.can_extend = ~columns.extended & (total_days <= MAX_LOAN_DAYS_TOTAL)
+        self._by_user: Optional[Tuple[np.ndarray, ...]] = None
+
+    def _overdue_loan(self, i: int) -> OverdueLoan:
+        columns = self.columns
+        return OverdueLoan(
+            loan_id=columns.loan_id(i),
+            user_id=int(columns.user_id[i]),
+            book_id=columns.book_ids[columns.book_code[i]],
+            due_date=date.fromordinal(int(columns.due[i])),
+            days_overdue=int(self.days_overdue[i]),
+            accrued_fine=int(self.fines[i]),
+            can_extend=bool(self.can_extend[i]),
+        )
+
+    def overdue(self, limit: int, offset: int = 0, user_id: Optional[int] = None) -> Tuple[int, List[OverdueLoan]]:
+        """
+        Pinjaman yang terlambat, diurutkan dari yang paling lama terlambat.
+        Mengembalikan (jumlah total, satu halaman hasil).
+        """
+        index = self.overdue_index
+        if user_id is not None:
+            index = index[self.columns.user_id[index] == user_id]
+        values = self.days_overdue[index]
+        end = offset + limit
+        if end < len(index):
+            # Hanya data yang mungkin masuk halaman ini yang diurutkan: cari batas hari
+            # terlambat terkecil yang masih dibutuhkan lewat histogram
+            at_least = np.cumsum(np.bincount(values)[::-1])
+            threshold = len(at_least) - 1 - int(np.searchsorted(at_least, end))
+            candidates = np.flatnonzero(values >= threshold)
+        else:
+            candidates = np.arange(len(index))
+        page = index[candidates[_descending_order(values[candidates])][offset:end]]
+        return len(index), [self._overdue_loan(i) for i in page]
+
+    def _user_totals(self) -> Tuple[np.ndarray, ...]:
+        if self._by_user is None:
+            index = self.overdue_index
+            users, inverse = _group_codes(self.columns.user_id[index])
+            fines = np.bincount(inverse, weights=self.fines[index], minlength=len(users)).astype(np.int64)
+            counts = np.bincount(inverse, minlength=len(users))
+            max_days = np.zeros(len(users), dtype=np.int64)
+            np.maximum.at(max_days, inverse, self.days_overdue[index])
+            self._by_user = (users, fines, counts, max_days)
+        return self._by_user
+
+    def _user_summary(self, i: int) -> UserFineSummary:
+        users, fines, counts, max_days = self._user_totals()
+        return UserFineSummary(
+            user_id=int(users[i]),
+            overdue_loans=int(counts[i]),
+            outstanding_fine=int(fines[i]),
+            max_days_overdue=int(max_days[i]),
+        )
+
+    def per_user(self, limit: int, offset: int = 0) -> Tuple[int, List[UserFineSummary]]:
+        """
+        Total denda berjalan per user, diurutkan dari yang terbesar.
+        """
+        users, fines, _, _ = self._user_totals()
+        order = _descending_order(fines)
+        return len(users), [self._user_summary(i) for i in order[offset:offset + limit]]
+
+    def for_user(self, user_id: int) -> UserFineSummary:
+        users = self._user_totals()[0]
+        i = int(np.searchsorted(users, user_id))
+        if i < len(users) and users[i] == user_id:
+            return self._user_summary(i)
+        return UserFineSummary(user_id=user_id, overdue_loans=0, outstanding_fine=0, max_days_overdue=0)
+
+    def totals(self) -> FineTotals:
+        return FineTotals(
+            as_of=self.as_of,
+            active_loans=len(self.columns),
+            overdue_loans=len(self.overdue_index),
+            users_with_fines=len(self._user_totals()[0]),
+            outstanding_fine=int(self.fines.sum()),
+            max_days_overdue=int(self.days_overdue.max()) if len(self.columns) else 0,
+        )
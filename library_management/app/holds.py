@@ -0,0 +1,370 @@
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import threading
+import uuid
+
+from . import config
+from .clock import SystemClock
+from .storage.base import LibraryStore, BookNotFoundError, OutOfStockError
+
+# ==================================
+#      ANTREAN RESERVASI (HOLD)
+# ==================================
+# Mahasiswa bisa mengantre buku yang stoknya habis. Saat satu salinan dikembalikan,
+# salinan itu langsung diserahkan ke orang pertama di antrean: salinan "disimpan" dan
+# hold-nya menjadi "ready" selama HOLD_WINDOW_HOURS. Pemegang hold mengambilnya lewat
+# POST /borrow/{book_id}; jika tidak diambil, salinan diserahkan ke orang berikutnya
+# atau kembali tersedia untuk semua.
+#
+# Salinan yang disimpan tetap dihitung di stok storage; antrean hanya mencatat jumlahnya
+# per buku (`held`) dan menolak peminjaman oleh user lain jika stok tidak melebihi jumlah
+# itu. State antrean hanya ada di memori proses, jadi jika aplikasi di-restart, hold hilang
+# dan salinannya otomatis tersedia lagi tanpa ada stok yang "tersangkut". Karena itu fitur
+# ini dimatikan jika LIBRARY_WORKERS > 1 (worker lain tidak bisa melihat antrean).
+#
+# Semua perubahan antrean satu buku dilakukan di dalam `store.atomic([book_id])`, jadi
+# berurutan dengan borrow/return buku yang sama. Perubahan yang menyertai borrow/return
+# didaftarkan lewat `store.on_rollback`, sehingga ikut dibatalkan jika transaksi terluar
+# (misalnya batch atomik) gagal.
+WAITING = "waiting"
+READY = "ready"
+FULFILLED = "fulfilled"
+EXPIRED = "expired"
+CANCELLED = "cancelled"
+FINAL_STATUSES = (FULFILLED, EXPIRED, CANCELLED)
+
+
+class HoldError(Exception):
+    pass
+
+class AlreadyQueuedError(HoldError):
+    pass
+
+class HoldNotFoundError(HoldError):
+    pass
+
+class BookAvailableError(HoldError):
+    pass
+
+
+@dataclass
+class Hold:
+    book_id: uuid.UUID
+    user_id: int
+    ticket: int  # Nomor urut antrean (naik terus), untuk menghitung posisi
+    status: str = WAITING
+    expires_at: Optional[datetime] = None
+
+
+HoldKey = Tuple[uuid.UUID, int]
+
+
+class HoldQueue:
+    """
+    Antrean FIFO per buku. Menyerahkan salinan ke orang berikutnya O(1): hold yang
+    dibatalkan tidak dihapus dari tengah deque, tetapi dilewati saat sampai di depan.
+    Perubahan status dikirim ke pengamat (SSE/long-poll) lewat `watch`.
+    """
+
+    def __init__(self, clock=None, window_hours: float = config.HOLD_WINDOW_HOURS):
+        self.clock = clock or SystemClock()
+        self.window = timedelta(hours=window_hours)
+        self._queues: Dict[uuid.UUID, Deque[Hold]] = {}
+        # Hold yang masih berjalan (waiting/ready) per (buku, user)
+        self._holds: Dict[HoldKey, Hold] = {}
+        # Jumlah salinan yang sedang disimpan (hold "ready") per buku
+        self._held: Dict[uuid.UUID, int] = {}
+        # Min-heap hold "ready": (waktu kedaluwarsa, nomor urut, key)
+        self._expiry: List[Tuple[datetime, int, HoldKey]] = []
+        self._tickets = itertools.count(1)
+        self._lock = threading.Lock()
+        self._watchers: Dict[HoldKey, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._holds)
+
+    def clear(self):
+        with self._lock:
+            self._queues.clear()
+            self._holds.clear()
+            self._held.clear()
+            self._expiry = []
+
+    # --- Pembacaan ---
+    def get(self, book_id: uuid.UUID, user_id: int) -> Optional[Hold]:
+        with self._lock:
+            hold = self._holds.get((book_id, user_id))
+            return replace(hold) if hold is not None else None
+
+    def for_user(self, user_id: int) -> List[Hold]:
+        with self._lock:
+            holds = [replace(hold) for (_, owner), hold in self._holds.items() if owner == user_id]
+        return sorted(holds, key=lambda hold: hold.ticket)
+
+    def held(self, book_id: uuid.UUID) -> int:
+        """
+        Jumlah salinan buku yang sedang disimpan untuk pemegang hold "ready".
+        """
+        with self._lock:
+            return self._held.get(book_id, 0)
+
+    def position(self, book_id: uuid.UUID, user_id: int) -> Optional[int]:
+        """
+        Posisi di antrean (1 = berikutnya), atau None jika tidak sedang menunggu.
+        """
+        with self._lock:
+            hold = self._holds.get((book_id, user_id))
+            if hold is None or hold.status != WAITING:
+                return None
+            position = 1
+            for queued in self._queues.get(book_id, ()):
+                if queued is hold:
+                    return position
+                if queued.status == WAITING:
+                    position += 1
+        return None
+
+    # --- Operasi antrean ---
+    def join(self, store: LibraryStore, book_id: uuid.UUID, user_id: int) -> Hold:
+        """
+        Masuk antrean buku. Melempar BookNotFoundError (dari storage), BookAvailableError
+        jika stok masih ada, atau AlreadyQueuedError.
+        """
+        with store.atomic([book_id]):
+            book = store.get_book(book_id)
+            if book is None:
+                raise BookNotFoundError(book_id)
+            with self._lock:
+                if book.stock > self._held.get(book_id, 0):
+                    raise BookAvailableError(book_id)
+                if (book_id, user_id) in self._holds:
+                    raise AlreadyQueuedError(book_id)
+                hold = Hold(book_id, user_id, next(self._tickets))
+                self._holds[(book_id, user_id)] = hold
+                self._queues.setdefault(book_id, deque()).append(hold)
+                return replace(hold)
+
+    def leave(self, store: LibraryStore, book_id: uuid.UUID, user_id: int):
+        """
+        Keluar dari antrean. Salinan yang sedang disimpan untuk user ini diserahkan ke
+        orang berikutnya. Melempar HoldNotFoundError.
+        """
+        with store.atomic([book_id]):
+            with self._lock:
+                hold = self._holds.get((book_id, user_id))
+                if hold is None:
+                    raise HoldNotFoundError(book_id)
+                was_ready = hold.status == READY
+                self._finish_locked(hold, CANCELLED)
+                if was_ready:
+                    self._release_locked(book_id)
+
+    def hand_off(self, store: LibraryStore, book_id: uuid.UUID) -> Optional[Hold]:
+        """
+        Dipanggil setelah satu salinan dikembalikan, di dalam transaksi yang sama dengan
+        pengembalian. Jika ada yang mengantre dan ada salinan yang belum disimpan untuk
+        orang lain, salinan itu disimpan untuk orang pertama di antrean.
+        """
+        if book_id not in self._queues:
+            return None
+        with store.atomic([book_id]):
+            book = store.get_book(book_id)
+            if book is None:
+                return None
+            with self._lock:
+                hold = self._next_waiting_locked(book_id)
+                if hold is None or book.stock <= self._held.get(book_id, 0):
+                    return None
+                ready = self._make_ready_locked(hold)
+            store.on_rollback(lambda: self._undo_ready(hold))
+            return ready
+
+    @contextmanager
+    def claim(self, store: LibraryStore, book_id: uuid.UUID, user_id: int) -> Iterator[Optional[Hold]]:
+        """
+        Dipakai di sekitar borrow. User yang punya hold "ready" meminjam salinan yang
+        disimpan untuknya; user lain hanya boleh meminjam jika stok melebihi jumlah salinan
+        yang disimpan (jika tidak, OutOfStockError). Jika blok berhasil, hold selesai (atau
+        hold yang masih menunggu dibuang, karena user sudah mendapat buku dari stok biasa);
+        jika blok (atau transaksi terluar yang memuatnya) gagal, hold tidak berubah.
+        """
+        with store.atomic([book_id]):
+            with self._lock:
+                hold = self._holds.get((book_id, user_id))
+                ready = hold is not None and hold.status == READY and hold.expires_at > self.clock.now()
+                held = self._held.get(book_id, 0)
+            if held and not ready:
+                book = store.get_book(book_id)
+                if book is not None and book.stock <= held:
+                    raise OutOfStockError(book_id)
+            yield replace(hold) if ready else None
+            # Hold "ready" yang sudah lewat waktunya diurus `expire` (salinannya harus dilepas)
+            if ready or (hold is not None and hold.status == WAITING):
+                with self._lock:
+                    previous = hold.status
+                    self._finish_locked(hold, FULFILLED if ready else CANCELLED)
+                store.on_rollback(lambda: self._undo_finish(hold, previous))
+
+    def expire(self, store: LibraryStore) -> int:
+        """
+        Mengakhiri hold "ready" yang melewati batas waktu dan menyerahkan salinannya.
+        Mengembalikan jumlah hold yang kedaluwarsa.
+        """
+        now = self.clock.now()
+        due: List[Hold] = []
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                _, _, key = heapq.heappop(self._expiry)
+                hold = self._holds.get(key)
+                if hold is not None and hold.status == READY and hold.expires_at <= now:
+                    due.append(hold)
+        expired = 0
+        for hold in due:
+            with store.atomic([hold.book_id]):
+                with self._lock:
+                    # Bisa saja sudah diambil atau dibatalkan sejak keluar dari heap
+                    if self._holds.get((hold.book_id, hold.user_id)) is not hold or hold.status != READY:
+                        continue
+                    self._finish_locked(hold, EXPIRED)
+                    self._release_locked(hold.book_id)
+                expired += 1
+        return expired
+
+    # --- Internal (dipanggil saat memegang lock storage untuk buku terkait) ---
+    def _release_locked(self, book_id: uuid.UUID):
+        # Salinan yang disimpan dilepas: diserahkan ke orang berikutnya, atau (karena masih
+        # dihitung di stok storage) otomatis tersedia lagi untuk semua
+        hold = self._next_waiting_locked(book_id)
+        if hold is not None:
+            self._make_ready_locked(hold)
+
+    def _next_waiting_locked(self, book_id: uuid.UUID) -> Optional[Hold]:
+        queue = self._queues.get(book_id)
+        while queue and queue[0].status != WAITING:
+            queue.popleft()
+        if not queue:
+            self._queues.pop(book_id, None)
+            return None
+        return queue[0]
+
+    def _make_ready_locked(self, hold: Hold) -> Hold:
+        queue = self._queues[hold.book_id]
+        queue.popleft()
+        if not queue:
+            del self._queues[hold.book_id]
+        hold.status = READY
+        hold.expires_at = self.clock.now() + self.window
+        self._hold_copy_locked(hold)
+        self._notify_locked(hold)
+        return replace(hold)
+
+    def _hold_copy_locked(self, hold: Hold):
+        self._held[hold.book_id] = self._held.get(hold.book_id, 0) + 1
+        # Entri heap lama (jika ada) dilewati `expire` karena dicek ulang di sana
+        heapq.heappush(self._expiry, (hold.expires_at, hold.ticket, (hold.book_id, hold.user_id)))
+
+    def _unhold_copy_locked(self, book_id: uuid.UUID):
+        held = self._held[book_id] - 1
+        if held:
+            self._held[book_id] = held
+        else:
+            del self._held[book_id]
+
+    def _requeue_locked(self, hold: Hold):
+        # Kembali ke antrean sesuai nomor urutnya (biasanya di depan)
+        queue = self._queues.setdefault(hold.book_id, deque())
+        if any(queued is hold for queued in queue):
+            return
+        position = next((i for i, queued in enumerate(queue) if queued.ticket > hold.ticket), len(queue))
+        queue.insert(position, hold)
+
+    def _finish_locked(self, hold: Hold, status: str):
+        key = (hold.book_id, hold.user_id)
+        if self._holds.get(key) is hold:
+            del self._holds[key]
+        if hold.status == READY:
+            self._unhold_copy_locked(hold.book_id)
+        hold.status = status
+        self._notify_locked(hold)
+
+    # --- Pembatalan (dijalankan storage saat transaksi di-rollback) ---
+    def _undo_finish(self, hold: Hold, status: str):
+        with self._lock:
+            hold.status = status
+            self._holds[(hold.book_id, hold.user_id)] = hold
+            if status == READY:
+                self._hold_copy_locked(hold)
+            else:
+                self._requeue_locked(hold)
+            self._notify_locked(hold)
+
+    def _undo_ready(self, hold: Hold):
+        with self._lock:
+            if hold.status != READY:
+                return
+            self._unhold_copy_locked(hold.book_id)
+            hold.status = WAITING
+            hold.expires_at = None
+            self._requeue_locked(hold)
+            self._notify_locked(hold)
+
+    # --- Notifikasi ---
+    def _notify_locked(self, hold: Hold):
+        snapshot = replace(hold)
+        for loop, updates in self._watchers.get((hold.book_id, hold.user_id), ()):
+            try:
+                loop.call_soon_threadsafe(updates.put_nowait, snapshot)
+            except RuntimeError:
+                # Event loop pengamat sudah ditutup
+                pass
+
+    @contextmanager
+    def watch(self, book_id: uuid.UUID, user_id: int) -> Iterator[asyncio.Queue]:
+        """
+        Mendaftarkan pengamat status hold dari event loop yang sedang berjalan. Setiap
+        perubahan status dikirim sebagai salinan `Hold` ke queue asyncio yang dikembalikan.
+        """
+        key = (book_id, user_id)
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._watchers.setdefault(key, []).append(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                watchers = self._watchers.get(key, [])
+                if entry in watchers:
+                    watchers.remove(entry)
+                if not watchers:
+                    self._watchers.pop(key, None)
+
+    # --- Pengecekan kedaluwarsa berkala ---
+    def start(self, store: LibraryStore, interval_seconds: float):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(store, interval_seconds),
+                                        name="hold-expiry", daemon=True)
+        self._thread.start()
+
+    def _loop(self, store: LibraryStore, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.expire(store)
+            except Exception as e:
+                print(f"Pengecekan hold kedaluwarsa gagal: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+hold_queue = HoldQueue()
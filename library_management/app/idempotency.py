@@ -0,0 +1,397 @@
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from . import config
+
+# ==================================
+#         IDEMPOTENCY-KEY
+# ==================================
+# Klien yang mengulang request (misalnya setelah timeout) mengirim header
+# `Idempotency-Key` yang sama. Respons pertama disimpan apa adanya (status, header,
+# byte body) dan request ulang dengan key yang sama mendapat salinannya tanpa
+# menjalankan handler lagi. Request ulang yang datang saat request pertama masih
+# diproses menunggu hasilnya, bukan ikut menjalankan handler.
+#
+# Key berlaku per user (X-User-ID). Memakai key yang sama untuk request yang berbeda
+# (method, path, query, atau body lain) ditolak dengan 422. Respons 5xx tidak disimpan
+# agar request ulang bisa mencoba lagi.
+#
+# Dengan satu worker, cache disimpan di memori proses. Dalam mode multi-worker request ulang
+# bisa mendarat di worker lain, jadi respons disimpan di SQLite yang dipakai bersama
+# (`SharedIdempotencyStore`). Body request dibaca utuh untuk fingerprint, jadi path yang
+# body-nya di-stream (IDEMPOTENCY_EXCLUDED_PATHS, misalnya /books/bulk) tidak ikut diproses.
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Jeda antar-pengecekan saat menunggu request yang sedang berjalan di worker lain
+SHARED_POLL_SECONDS = 0.05
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "done", "ready", "status", "headers", "body", "expires")
+
+    def __init__(self, fingerprint: bytes, expires: float):
+        self.fingerprint = fingerprint
+        self.done = False
+        self.ready = asyncio.Event()
+        self.status = 0
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.body = b""
+        self.expires = expires
+
+
+class IdempotencyCache:
+    """
+    Respons tersimpan dengan TTL tetap, dalam OrderedDict berurutan sesuai waktu dibuat
+    (jadi juga berurutan sesuai waktu kedaluwarsa). Entri kedaluwarsa dan entri lama yang
+    melewati batas jumlah/byte dibuang dari depan. Hanya dipakai dari thread event loop.
+    """
+
+    def __init__(self, ttl_seconds: float = config.IDEMPOTENCY_TTL_SECONDS,
+                 max_entries: int = config.IDEMPOTENCY_MAX_ENTRIES,
+                 max_bytes: int = config.IDEMPOTENCY_MAX_BYTES,
+                 clock=time.monotonic):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.size_bytes = 0
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def get(self, key: Hashable) -> Optional[_Entry]:
+        self._evict()
+        return self._entries.get(key)
+
+    def begin(self, key: Hashable, fingerprint: bytes) -> _Entry:
+        entry = self._entries[key] = _Entry(fingerprint, self.clock() + self.ttl)
+        self._evict()
+        return entry
+
+    def complete(self, key: Hashable, entry: _Entry, status_code: int,
+                 headers: List[Tuple[bytes, bytes]], body: bytes):
+        entry.status, entry.headers, entry.body, entry.done = status_code, headers, body, True
+        entry.ready.set()
+        if self._entries.get(key) is not entry:
+            return
+        if len(body) > self.max_bytes:
+            del self._entries[key]
+            return
+        self.size_bytes += len(body)
+        self._evict()
+
+    def abandon(self, key: Hashable, entry: _Entry):
+        # Request pertama gagal; penunggu menjalankan request-nya sendiri
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+        entry.ready.set()
+
+    def _evict(self):
+        now = self.clock()
+        entries = self._entries
+        while entries:
+            key, oldest = next(iter(entries.items()))
+            if oldest.expires > now and len(entries) <= self.max_entries and self.size_bytes <= self.max_bytes:
+                return
+            del entries[key]
+            self.size_bytes -= len(oldest.body)
+
+
+idempotency_cache = IdempotencyCache()
+
+
+# ==================================
+#   PENYIMPANAN BERSAMA (MULTI-WORKER)
+# ==================================
+CLAIMED = "claimed"
+PENDING = "pending"
+MISMATCH = "mismatch"
+DONE = "done"
+
+StoredResponse = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency (
+    user_id TEXT NOT NULL,
+    idempotency_key BLOB NOT NULL,
+    fingerprint BLOB NOT NULL,
+    owner TEXT,
+    status INTEGER NOT NULL DEFAULT 0,
+    headers TEXT,
+    body BLOB,
+    expires REAL NOT NULL,
+    PRIMARY KEY (user_id, idempotency_key)
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency (expires);
+"""
+
+
+class SharedIdempotencyStore:
+    """
+    Respons tersimpan di tabel SQLite yang dipakai semua worker. Request pertama "mengklaim"
+    key (baris dengan status 0 dan token pemilik) di dalam transaksi tulis, jadi hanya satu
+    worker yang menjalankan handler; request lain menunggu sampai respons tersimpan.
+    Klaim berlaku selama `lease_seconds` agar key tidak tersangkut jika pemiliknya mati.
+    Waktu memakai jam dinding karena dibandingkan lintas proses. Semua method blocking
+    (jalankan di threadpool); setiap thread memakai koneksinya sendiri.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = config.IDEMPOTENCY_TTL_SECONDS,
+                 lease_seconds: float = config.IDEMPOTENCY_LEASE_SECONDS,
+                 max_bytes: int = config.IDEMPOTENCY_MAX_BYTES, clock=time.time):
+        self.path = path
+        self.ttl = ttl_seconds
+        self.lease = lease_seconds
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.executescript(SHARED_SCHEMA)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def claim(self, key: Tuple[bytes, bytes], fingerprint: bytes) -> Tuple[str, Optional[object]]:
+        """
+        Mengembalikan (CLAIMED, token pemilik), (DONE, respons tersimpan), (PENDING, None)
+        jika request yang sama masih berjalan, atau (MISMATCH, None).
+        """
+        user_id, idempotency_key = key[0].decode("latin-1"), key[1]
+        conn = self._connection()
+        now = self.clock()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT fingerprint, status, headers, body, expires FROM idempotency"
+                " WHERE user_id = ? AND idempotency_key = ?",
+                (user_id, idempotency_key),
+            ).fetchone()
+            if row is None or row[4] <= now:
+                token = os.urandom(8).hex()
+                conn.execute(
+                    "INSERT OR REPLACE INTO idempotency (user_id, idempotency_key, fingerprint, owner, expires)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (user_id, idempotency_key, fingerprint, token, now + self.lease),
+                )
+                return CLAIMED, token
+        finally:
+            conn.execute("COMMIT")
+        stored_fingerprint, status_code, headers, body, _ = row
+        if stored_fingerprint != fingerprint:
+            return MISMATCH, None
+        if not status_code:
+            return PENDING, None
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(headers)]
+        return DONE, (status_code, headers, body)
+
+    def complete(self, key: Tuple[bytes, bytes], token: str, status_code: int,
+                 headers: List[Tuple[bytes, bytes]], body: bytes):
+        if len(body) > self.max_bytes:
+            self.abandon(key, token)
+            return
+        now = self.clock()
+        encoded = json.dumps([(name.decode("latin-1"), value.decode("latin-1")) for name, value in headers])
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE idempotency SET status = ?, headers = ?, body = ?, expires = ?"
+                " WHERE user_id = ? AND idempotency_key = ? AND owner = ?",
+                (status_code, encoded, body, now + self.ttl, key[0].decode("latin-1"), key[1], token),
+            )
+            conn.execute("DELETE FROM idempotency WHERE expires <= ?", (now,))
+        finally:
+            conn.execute("COMMIT")
+
+    def abandon(self, key: Tuple[bytes, bytes], token: str):
+        self._connection().execute(
+            "DELETE FROM idempotency WHERE user_id = ? AND idempotency_key = ? AND owner = ? AND status = 0",
+            (key[0].decode("latin-1"), key[1], token),
+        )
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class IdempotencyMiddleware:
+    """
+    Middleware ASGI untuk header `Idempotency-Key` pada request yang mengubah data
+    di path berawalan `paths` (kecuali `excluded_paths`). Request tanpa header diproses
+    seperti biasa. Jika `shared` diisi (mode multi-worker), respons disimpan di sana.
+    """
+
+    def __init__(self, app, cache: IdempotencyCache = None, paths: Tuple[str, ...] = config.IDEMPOTENCY_PATHS,
+                 excluded_paths: Tuple[str, ...] = config.IDEMPOTENCY_EXCLUDED_PATHS,
+                 shared: Optional[SharedIdempotencyStore] = None):
+        self.app = app
+        self.cache = cache if cache is not None else idempotency_cache
+        self.paths = tuple(paths)
+        self.excluded_paths = tuple(excluded_paths)
+        self.shared = shared
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] in SAFE_METHODS or not scope["path"].startswith(self.paths)
+                or (self.excluded_paths and scope["path"].startswith(self.excluded_paths))):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or ())
+        idempotency_key = headers.get(IDEMPOTENCY_HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await self._error(status.HTTP_400_BAD_REQUEST,
+                              f"Idempotency-Key harus berisi 1-{MAX_KEY_LENGTH} karakter.", scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        digest = hashlib.sha256()
+        for part in (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body):
+            digest.update(len(part).to_bytes(8, "little"))
+            digest.update(part)
+        fingerprint = digest.digest()
+        key = (headers.get(b"x-user-id", b""), idempotency_key)
+        if self.shared is not None:
+            await self._call_shared(key, fingerprint, body, scope, receive, send)
+            return
+
+        cache = self.cache
+        while True:
+            entry = cache.get(key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                await self._error(status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                  "Idempotency-Key sudah dipakai untuk request yang berbeda.", scope, receive, send)
+                return
+            if entry.done:
+                await _replay(entry.status, entry.headers, entry.body, send)
+                return
+            await entry.ready.wait()
+
+        entry = cache.begin(key, fingerprint)
+        try:
+            response = await self._run(body, scope, receive, send)
+        except BaseException:
+            cache.abandon(key, entry)
+            raise
+        if response is not None:
+            cache.complete(key, entry, *response)
+        else:
+            cache.abandon(key, entry)
+
+    async def _call_shared(self, key, fingerprint: bytes, body: bytes, scope, receive, send):
+        shared = self.shared
+        while True:
+            state, value = await run_in_threadpool(shared.claim, key, fingerprint)
+            if state == CLAIMED:
+                break
+            if state == MISMATCH:
+                await self._error(status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                  "Idempotency-Key sudah dipakai untuk request yang berbeda.", scope, receive, send)
+                return
+            if state == DONE:
+                await _replay(*value, send)
+                return
+            # Request yang sama masih berjalan (mungkin di worker lain)
+            await asyncio.sleep(SHARED_POLL_SECONDS)
+
+        token = value
+        try:
+            response = await self._run(body, scope, receive, send)
+        except BaseException:
+            await run_in_threadpool(shared.abandon, key, token)
+            raise
+        if response is not None:
+            await run_in_threadpool(shared.complete, key, token, *response)
+        else:
+            await run_in_threadpool(shared.abandon, key, token)
+
+    async def _run(self, body: bytes, scope, receive, send) -> Optional[StoredResponse]:
+        """
+        Menjalankan handler dengan body yang sudah dibaca sambil merekam responsnya.
+        Mengembalikan respons yang boleh disimpan, atau None (respons 5xx / tidak selesai).
+        """
+        response_status = 0
+        response_headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+        finished = False
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture_send(message):
+            nonlocal response_status, response_headers, finished
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+                response_headers = list(message.get("headers", ()))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                finished = not message.get("more_body", False)
+            await send(message)
+
+        await self.app(scope, replay_receive, capture_send)
+        if finished and response_status < 500:
+            return response_status, response_headers, b"".join(chunks)
+        return None
+
+    async def _error(self, status_code: int, detail: str, scope, receive, send):
+        await JSONResponse({"detail": detail}, status_code=status_code)(scope, receive, send)
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _replay(status_code: int, headers: List[Tuple[bytes, bytes]], body: bytes, send):
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": headers + [(REPLAYED_HEADER, b"true")],
+    })
+    await send({"type": "http.response.body", "body": body})
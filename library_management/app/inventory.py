@@ -0,0 +1,100 @@
+from contextlib import contextmanager
+from typing import Hashable, Iterable, Iterator
+import threading
+import uuid
+
+from .data_store import BookCatalog
+
+# ==================================
+#     INVENTARIS & LOCK BERGARIS
+# ==================================
+# Endpoint `def` biasa dijalankan FastAPI di threadpool, jadi beberapa request bisa
+# mengubah stok buku yang sama secara bersamaan. Daripada satu lock global, setiap buku
+# dipetakan ke salah satu dari N lock ("striped lock"). Buku yang berbeda umumnya
+# memakai lock yang berbeda sehingga tetap bisa diproses paralel.
+DEFAULT_STRIPES = 64
+
+
+class StripedLocks:
+    """
+    Kumpulan lock yang dipilih berdasarkan hash key. Lock bersifat reentrant agar
+    operasi bertingkat pada buku yang sama (misalnya wrapper journal) tidak deadlock.
+    """
+
+    def __init__(self, stripes: int = DEFAULT_STRIPES):
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def for_key(self, key: Hashable) -> threading.RLock:
+        return self._locks[hash(key) % len(self._locks)]
+
+    @contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        lock = self.for_key(key)
+        with lock:
+            yield
+
+    @contextmanager
+    def hold_many(self, keys: Iterable[Hashable]) -> Iterator[None]:
+        """
+        Mengunci beberapa key sekaligus. Lock diambil berurutan sesuai indeksnya agar
+        dua thread yang mengunci kumpulan key yang sama tidak saling deadlock.
+        """
+        indexes = sorted({hash(key) % len(self._locks) for key in keys})
+        acquired = []
+        try:
+            for i in indexes:
+                self._locks[i].acquire()
+                acquired.append(self._locks[i])
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+
+class Inventory:
+    """
+    Pengelola stok buku. Semua pengecekan dan perubahan stok satu buku dilakukan
+    di bawah lock milik buku tersebut, sehingga stok tidak pernah negatif dan tidak
+    bergeser karena race condition.
+    """
+
+    def __init__(self, books: BookCatalog, stripes: int = DEFAULT_STRIPES):
+        self.books = books
+        self.locks = StripedLocks(stripes)
+
+    def lock(self, book_id: uuid.UUID):
+        """
+        Context manager untuk mengunci satu buku. Pakai ini jika pengecekan lain
+        (misalnya pinjaman ganda) harus atomik bersama perubahan stok.
+        """
+        return self.locks.hold(book_id)
+
+    def lock_many(self, book_ids: Iterable[uuid.UUID]):
+        """
+        Context manager untuk mengunci beberapa buku sekaligus (misalnya transaksi batch).
+        """
+        return self.locks.hold_many(book_ids)
+
+    def reserve(self, book_id: uuid.UUID) -> bool:
+        """
+        Mengambil satu eksemplar jika stok masih ada. Mengembalikan False jika stok habis.
+        """
+        with self.lock(book_id):
+            book = self.books.get(book_id)
+            if book is None or book.stock <= 0:
+                return False
+            self.books.adjust_stock(book_id, -1)
+            return True
+
+    def release(self, book_id: uuid.UUID) -> bool:
+        """
+        Mengembalikan satu eksemplar ke stok. Mengembalikan False jika buku sudah dihapus.
+        """
+        with self.lock(book_id):
+            if book_id not in self.books:
+                return False
+            self.books.adjust_stock(book_id, 1)
+            return True
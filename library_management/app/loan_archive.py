@@ -0,0 +1,184 @@
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+import bisect
+import mmap
+import struct
+import tempfile
+
+# ==================================
+#     ARSIP PINJAMAN (COLD STORAGE)
+# ==================================
+# Pinjaman yang sudah dikembalikan hampir tidak pernah diubah lagi, jadi disimpan
+# sebagai record lebar tetap di file yang di-memory-map, bukan sebagai objek Python.
+# Format record (little-endian):
+#   id (128 bit, dipecah hi/lo), user_id, kode buku, tanggal pinjam, jatuh tempo,
+#   tanggal pinjam awal, tanggal kembali (ordinal hari), denda, nomor urut, flag.
+ARCHIVE_RECORD = struct.Struct("<QQqIiiiiqQB")
+
+# Bit pada kolom flag
+FLAG_EXTENDED = 0x01
+FLAG_DEAD = 0x80  # Record dikeluarkan lagi dari arsip (rollback); diabaikan saat dibaca
+
+# Nilai baris untuk entri indeks yang sudah dihapus
+_DELETED = 0xFFFFFFFF
+_MASK_64 = (1 << 64) - 1
+_FLAG_OFFSET = ARCHIVE_RECORD.size - 1
+_INITIAL_CAPACITY = ARCHIVE_RECORD.size * 4096
+
+# Urutan kolom satu baris arsip
+ArchiveRow = Tuple[int, int, int, int, int, int, int, int, int, int]
+
+
+class LoanArchive:
+    """
+    Segmen arsip append-only untuk pinjaman yang sudah selesai. Data ada di file
+    sementara yang di-mmap (dihapus otomatis saat ditutup), sehingga halaman yang
+    jarang dibaca bisa dikeluarkan OS dari RAM.
+
+    Yang tetap di RAM hanya indeks ringkas: 64 bit atas ID + nomor baris dalam array
+    terurut (12 byte per pinjaman) dan daftar nomor baris per user (4 byte per pinjaman).
+    Class ini tidak thread-safe; pemanggil (LoanRepository) yang memegang lock.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._count = 0
+        self._live = 0
+        # Indeks ID: `_keys` (64 bit atas ID, terurut) sejajar dengan `_rows`.
+        # Entri baru ditampung di `_pending` lalu digabung per batch.
+        self._keys = array("Q")
+        self._rows = array("I")
+        self._pending: Dict[int, int] = {}
+        self._rows_by_user: Dict[int, array] = {}
+
+    def __len__(self) -> int:
+        return self._live
+
+    @property
+    def size_bytes(self) -> int:
+        return self._count * ARCHIVE_RECORD.size
+
+    def _ensure_capacity(self, size: int):
+        if self._map is None:
+            self._file = tempfile.TemporaryFile(dir=self.directory)
+            capacity = max(_INITIAL_CAPACITY, size)
+            self._file.truncate(capacity)
+            self._map = mmap.mmap(self._file.fileno(), capacity)
+        elif size > len(self._map):
+            self._map.resize(max(size, len(self._map) * 2))
+
+    # --- Tulis ---
+    def append(self, row: ArchiveRow) -> int:
+        """
+        Menambahkan satu record di akhir arsip. Mengembalikan nomor barisnya.
+        """
+        loan_id, user_id = row[0], row[1]
+        index = self._count
+        offset = index * ARCHIVE_RECORD.size
+        self._ensure_capacity(offset + ARCHIVE_RECORD.size)
+        ARCHIVE_RECORD.pack_into(self._map, offset, loan_id >> 64, loan_id & _MASK_64, *row[1:])
+        self._count += 1
+        self._live += 1
+        self._pending[loan_id] = index
+        user_rows = self._rows_by_user.get(user_id)
+        if user_rows is None:
+            user_rows = self._rows_by_user[user_id] = array("I")
+        user_rows.append(index)
+        if len(self._pending) > max(1024, len(self._keys) >> 4):
+            self._merge_pending()
+        return index
+
+    def discard(self, loan_id: int) -> bool:
+        """
+        Mengeluarkan pinjaman dari arsip (misalnya saat pengembalian di-rollback).
+        Record di file hanya ditandai mati; ruangnya tidak dipakai ulang.
+        """
+        index = self._pending.pop(loan_id, None)
+        if index is None:
+            position = self._position(loan_id)
+            if position is None:
+                return False
+            index = self._rows[position]
+            self._rows[position] = _DELETED
+        user_id = self._read(index)[2]
+        self._map[index * ARCHIVE_RECORD.size + _FLAG_OFFSET] |= FLAG_DEAD
+        self._rows_by_user[user_id].remove(index)
+        self._live -= 1
+        return True
+
+    def clear(self):
+        self.close()
+        self._count = 0
+        self._live = 0
+        self._keys = array("Q")
+        self._rows = array("I")
+        self._pending.clear()
+        self._rows_by_user.clear()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+            self._file = None
+
+    def _merge_pending(self):
+        # Menggabungkan entri baru ke array terurut; bagian lama disalin per potongan
+        # (memcpy), jadi biayanya linear dan jarang terjadi.
+        items = sorted((loan_id >> 64, index) for loan_id, index in self._pending.items())
+        keys, rows = array("Q"), array("I")
+        start = 0
+        for key, index in items:
+            position = bisect.bisect_right(self._keys, key, start)
+            keys += self._keys[start:position]
+            rows += self._rows[start:position]
+            keys.append(key)
+            rows.append(index)
+            start = position
+        keys += self._keys[start:]
+        rows += self._rows[start:]
+        self._keys, self._rows = keys, rows
+        self._pending.clear()
+
+    # --- Baca ---
+    def _read(self, index: int) -> tuple:
+        return ARCHIVE_RECORD.unpack_from(self._map, index * ARCHIVE_RECORD.size)
+
+    def _to_row(self, record: tuple) -> ArchiveRow:
+        return ((record[0] << 64) | record[1],) + record[2:]
+
+    def _position(self, loan_id: int) -> Optional[int]:
+        key = loan_id >> 64
+        position = bisect.bisect_left(self._keys, key)
+        while position < len(self._keys) and self._keys[position] == key:
+            index = self._rows[position]
+            if index != _DELETED and self._read(index)[1] == loan_id & _MASK_64:
+                return position
+            position += 1
+        return None
+
+    def get(self, loan_id: int) -> Optional[ArchiveRow]:
+        index = self._pending.get(loan_id)
+        if index is None:
+            position = self._position(loan_id)
+            if position is None:
+                return None
+            index = self._rows[position]
+        return self._to_row(self._read(index))
+
+    def rows_for_user(self, user_id: int) -> List[ArchiveRow]:
+        return [self._to_row(self._read(index)) for index in self._rows_by_user.get(user_id, ())]
+
+    def __iter__(self) -> Iterator[ArchiveRow]:
+        if self._map is None:
+            return
+        # Dibaca per potongan (salinan bytes) agar tidak ada buffer yang menahan mmap,
+        # karena mmap harus bisa di-resize saat arsip bertambah.
+        chunk = ARCHIVE_RECORD.size * 4096
+        for start in range(0, self.size_bytes, chunk):
+            data = self._map[start:min(start + chunk, self.size_bytes)]
+            for record in ARCHIVE_RECORD.iter_unpack(data):
+                if not record[-1] & FLAG_DEAD:
+                    yield self._to_row(record)
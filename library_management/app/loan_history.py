@@ -0,0 +1,258 @@
+from array import array
+from dataclasses import dataclass
+from datetime import date
+from operator import itemgetter
+from typing import Dict, List, NamedTuple, Optional
+import bisect
+import uuid
+
+import numpy as np
+
+# ==================================
+#     RIWAYAT PINJAMAN (INDEKS TANGGAL)
+# ==================================
+# Riwayat pinjaman bisa difilter berdasarkan user, buku, status, dan rentang tanggal
+# pinjam atau tanggal kembali, terurut berdasarkan tanggal tersebut. Pagination memakai
+# cursor (tanggal, ID pinjaman) dari item terakhir halaman sebelumnya; urutan pinjaman
+# dengan tanggal yang sama ditentukan oleh backend, tetapi selalu stabil.
+BORROW_DATE = "borrow_date"
+RETURN_DATE = "return_date"
+STATUS_ACTIVE = "active"
+STATUS_RETURNED = "returned"
+
+
+class HistoryCursor(NamedTuple):
+    date: date
+    loan_id: uuid.UUID
+
+    def __str__(self) -> str:
+        return f"{self.date.isoformat()}_{self.loan_id}"
+
+    @classmethod
+    def parse(cls, text: str) -> "HistoryCursor":
+        """
+        Kebalikan dari `str(cursor)`. Melempar ValueError jika format tidak valid.
+        """
+        day, _, loan_id = text.partition("_")
+        return cls(date.fromisoformat(day), uuid.UUID(loan_id))
+
+
+@dataclass(frozen=True)
+class LoanHistoryQuery:
+    """
+    Filter riwayat pinjaman. `start`/`end` (inklusif) berlaku untuk field `sort_by`;
+    mengurutkan berdasarkan RETURN_DATE berarti hanya pinjaman yang sudah dikembalikan.
+    """
+    user_id: Optional[int] = None
+    book_id: Optional[uuid.UUID] = None
+    status: Optional[str] = None
+    sort_by: str = BORROW_DATE
+    start: Optional[date] = None
+    end: Optional[date] = None
+
+    def cursor(self, loan) -> HistoryCursor:
+        return HistoryCursor(getattr(loan, self.sort_by), loan.id)
+
+
+# Key indeks: ordinal tanggal di bit atas, nomor urut pinjaman (unik, dari LoanRepository)
+# di 40 bit bawah. Urutan key = urutan (tanggal, nomor urut).
+SEQ_BITS = 40
+SEQ_MASK = (1 << SEQ_BITS) - 1
+_MASK_64 = (1 << 64) - 1
+
+
+def date_key(ordinal: int, seq: int = 0) -> int:
+    return (ordinal << SEQ_BITS) | seq
+
+
+class SortedKeys:
+    """
+    Key 64 bit terurut dalam `array("Q")` (8 byte per key). Key dari muat massal
+    (`extend`) ditambahkan di akhir dan diurutkan sekali (NumPy, in-place) saat dibaca berikutnya.
+    Key baru biasanya bertanggal hari ini, jadi sisipan hampir selalu di ujung array.
+    """
+    __slots__ = ("keys", "dirty")
+
+    def __init__(self):
+        self.keys = array("Q")
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _sort(self):
+        if self.dirty:
+            view = np.frombuffer(self.keys, dtype=np.uint64)
+            view.sort()
+            # View harus dilepas agar array bisa bertambah panjang lagi
+            del view
+            self.dirty = False
+
+    def add(self, key: int):
+        self._sort()
+        keys = self.keys
+        if not keys or key > keys[-1]:
+            keys.append(key)
+        else:
+            bisect.insort(keys, key)
+
+    def extend(self, keys: np.ndarray):
+        """
+        Menambahkan banyak key (uint64) tanpa langsung mengurutkannya.
+        """
+        self.keys.frombytes(keys.tobytes())
+        self.dirty = True
+
+    def discard(self, key: int):
+        self._sort()
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def ordered(self) -> array:
+        """
+        Array key yang sudah terurut (tidak boleh diubah pemanggil).
+        """
+        self._sort()
+        return self.keys
+
+    def position(self, key: int) -> int:
+        """
+        Posisi key pertama yang >= `key`.
+        """
+        self._sort()
+        return bisect.bisect_left(self.keys, key)
+
+
+# Kolom ArchiveRow yang dipakai indeks: user, kode buku, pinjam, kembali, nomor urut
+_INDEXED_FIELDS = itemgetter(1, 2, 3, 6, 8)
+_INDEXED_DTYPE = np.dtype([(name, np.int64) for name in ("user", "book", "borrow", "returned", "seq")])
+
+
+def _owned(indexes: Dict[int, SortedKeys], owner: int) -> SortedKeys:
+    keys = indexes.get(owner)
+    if keys is None:
+        keys = indexes[owner] = SortedKeys()
+    return keys
+
+
+class LoanDateIndex:
+    """
+    Indeks sekunder riwayat pinjaman berdasarkan tanggal: global, per user, dan per buku,
+    masing-masing untuk tanggal pinjam dan tanggal kembali, plus pinjaman aktif berdasarkan
+    tanggal pinjam. Pencarian rentang tanggal cukup satu bisect lalu membaca key berurutan.
+
+    Key hanya berisi nomor urut pinjaman; ID pinjaman disimpan per nomor urut dalam dua
+    `array("Q")`. Class ini tidak thread-safe; pemanggil (LoanRepository) yang memegang lock.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._id_hi = array("Q")
+        self._id_lo = array("Q")
+        self.borrowed = SortedKeys()
+        self.returned = SortedKeys()
+        self.active = SortedKeys()
+        self.user_borrowed: Dict[int, SortedKeys] = {}
+        self.user_returned: Dict[int, SortedKeys] = {}
+        self.book_borrowed: Dict[int, SortedKeys] = {}
+        self.book_returned: Dict[int, SortedKeys] = {}
+
+    def loan_id(self, key: int) -> int:
+        seq = key & SEQ_MASK
+        return (self._id_hi[seq] << 64) | self._id_lo[seq]
+
+    def _lists(self, row):
+        # (indeks, pemilik, key) untuk satu baris pinjaman (format ArchiveRow); pemilik
+        # adalah user/kode buku untuk indeks per user/buku, None untuk indeks global
+        user_id, book_code, borrow, returned, seq = row[1], row[2], row[3], row[6], row[8]
+        borrow_key = date_key(borrow, seq)
+        yield self.borrowed, None, borrow_key
+        yield self.user_borrowed, user_id, borrow_key
+        yield self.book_borrowed, book_code, borrow_key
+        if returned:
+            return_key = date_key(returned, seq)
+            yield self.returned, None, return_key
+            yield self.user_returned, user_id, return_key
+            yield self.book_returned, book_code, return_key
+        else:
+            yield self.active, None, borrow_key
+
+    def _set_ids(self, seq: int, loan_id: int):
+        while len(self._id_hi) <= seq:
+            self._id_hi.append(0)
+            self._id_lo.append(0)
+        self._id_hi[seq] = loan_id >> 64
+        self._id_lo[seq] = loan_id & _MASK_64
+
+    def add(self, row):
+        self._set_ids(row[8], row[0])
+        for target, owner, key in self._lists(row):
+            if owner is not None:
+                target = _owned(target, owner)
+            target.add(key)
+
+    def add_many(self, rows: List):
+        """
+        Muat massal (misalnya snapshot): key dihitung per kolom dengan NumPy dan ditambahkan
+        ke akhir setiap indeks tanpa diurutkan; pengurutan dilakukan saat indeks dibaca.
+        """
+        if not rows:
+            return
+        columns = np.fromiter(map(_INDEXED_FIELDS, rows), dtype=_INDEXED_DTYPE, count=len(rows))
+        users, books, borrow, returned, seqs = (columns[name] for name in _INDEXED_DTYPE.names)
+        top = int(seqs.max())
+        if len(self._id_hi) <= top:
+            padding = array("Q", bytes(8 * (top + 1 - len(self._id_hi))))
+            self._id_hi.extend(padding)
+            self._id_lo.extend(padding)
+        id_hi = np.frombuffer(self._id_hi, dtype=np.uint64)
+        id_lo = np.frombuffer(self._id_lo, dtype=np.uint64)
+        id_hi[seqs] = np.fromiter((row[0] >> 64 for row in rows), dtype=np.uint64, count=len(rows))
+        id_lo[seqs] = np.fromiter((row[0] & _MASK_64 for row in rows), dtype=np.uint64, count=len(rows))
+        del id_hi, id_lo
+
+        borrow_keys = ((borrow << SEQ_BITS) | seqs).astype(np.uint64)
+        done = returned != 0
+        return_keys = ((returned[done] << SEQ_BITS) | seqs[done]).astype(np.uint64)
+        self.borrowed.extend(borrow_keys)
+        self.active.extend(borrow_keys[~done])
+        self.returned.extend(return_keys)
+        for indexes, owners, keys in (
+            (self.user_borrowed, users, borrow_keys), (self.book_borrowed, books, borrow_keys),
+            (self.user_returned, users[done], return_keys), (self.book_returned, books[done], return_keys),
+        ):
+            if not len(keys):
+                continue
+            order = np.argsort(owners, kind="stable")
+            owners, keys = owners[order], keys[order]
+            bounds = np.flatnonzero(np.diff(owners)) + 1
+            for start, end in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(keys)]))):
+                _owned(indexes, int(owners[start])).extend(keys[start:end])
+
+    def discard(self, row):
+        for target, owner, key in self._lists(row):
+            if owner is None:
+                target.discard(key)
+                continue
+            keys = target.get(owner)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del target[owner]
+
+    def keys_for(self, by_return: bool, user_id: Optional[int], book_code: Optional[int],
+                 active_only: bool) -> Optional[SortedKeys]:
+        """
+        Memilih indeks paling sempit untuk filter yang diberikan. Filter lain yang tidak
+        tercakup indeks (misalnya buku saat user juga difilter) dicek per pinjaman.
+        """
+        if user_id is not None:
+            return (self.user_returned if by_return else self.user_borrowed).get(user_id)
+        if book_code is not None:
+            return (self.book_returned if by_return else self.book_borrowed).get(book_code)
+        if by_return:
+            return self.returned
+        return self.active if active_only else self.borrowed
@@ -1,15 +1,57 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-from library_management.app.routes import books, transactions
-from .data_store import seed_initial_data
+from .routes import books, transactions, users, fines, stats, holds, changes, profiles, metrics as metrics_routes
+from .data_store import users_db
+from .storage import get_store
+from .scheduler import DueDateScheduler, create_sinks
+from .shared_state import try_acquire_leader
+from .analytics import circulation_stats
+from .holds import hold_queue
+from .changes import change_log
+from .metrics import MetricsMiddleware
+from .admission import AdmissionMiddleware
+from .idempotency import IdempotencyMiddleware, SharedIdempotencyStore
+from .profiling import ProfilingMiddleware, request_profiler
+from . import config
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Kode ini dieksekusi saat aplikasi startup
     print("Startup: Menginisialisasi data awal...")
-    seed_initial_data()
+    if config.USERS_FILE:
+        total = users_db.load_file(config.USERS_FILE)
+        print(f"Startup: {total} pengguna dimuat dari {config.USERS_FILE}.")
+    if config.WORKERS > 1 and config.STORAGE_BACKEND != "sqlite":
+        raise RuntimeError("LIBRARY_WORKERS > 1 memerlukan LIBRARY_STORAGE_BACKEND=sqlite.")
+    store = get_store()
+    store.seed_initial_data()
+    if config.WORKERS == 1:
+        circulation_stats.bind(store)
+    change_log.bind(store)
+    scheduler = None
+    # Dengan beberapa worker, hanya satu worker yang menjalankan penjadwal
+    leader_lock = try_acquire_leader(f"{config.SQLITE_PATH}-scheduler.lock") if config.WORKERS > 1 else None
+    if config.SCHEDULER_ENABLED and (config.WORKERS == 1 or leader_lock is not None):
+        scheduler = DueDateScheduler(
+            create_sinks(config.SCHEDULER_SINKS, config.SCHEDULER_EVENTS_FILE),
+            reminder_days=config.REMINDER_DAYS_BEFORE_DUE,
+        )
+        scheduler.attach(store)
+        scheduler.start(config.SCHEDULER_INTERVAL_SECONDS)
+        print(f"Startup: Penjadwal jatuh tempo memantau {len(scheduler)} pinjaman aktif.")
+    app.state.scheduler = scheduler
+    # Reservasi hanya tersedia dengan satu worker (lihat `holds`)
+    if config.WORKERS == 1:
+        hold_queue.start(store, config.HOLD_EXPIRY_CHECK_SECONDS)
     yield
     # Kode ini dieksekusi saat aplikasi shutdown
+    if scheduler is not None:
+        scheduler.stop()
+    hold_queue.stop()
+    if leader_lock is not None:
+        leader_lock.close()
+    request_profiler.stop()
+    store.close()
     print("Shutdown: Aplikasi dimatikan.")
 
 app = FastAPI(
@@ -30,6 +72,41 @@ app.include_router(books.public_router)
 app.include_router(books.router)
 # Router untuk transaksi peminjaman dan pengembalian
 app.include_router(transactions.router)
+# Router untuk antrean reservasi buku yang stoknya habis
+app.include_router(holds.router)
+# Router untuk manajemen pengguna oleh admin
+app.include_router(users.router)
+# Router untuk laporan denda oleh admin
+app.include_router(fines.router)
+# Router untuk statistik sirkulasi oleh admin
+app.include_router(stats.router)
+# Router untuk change feed (sinkronisasi inkremental katalog dan pinjaman)
+app.include_router(changes.router)
+
+# Router untuk melihat hasil profiling oleh admin
+app.include_router(profiles.router)
+
+# === Idempotency-Key ===
+# Request ulang dengan Idempotency-Key yang sama mendapat respons tersimpan (dipasang di
+# dalam admission control agar request yang ditolak tidak ikut disimpan). Dengan beberapa
+# worker, respons disimpan di SQLite bersama agar request ulang ke worker lain tetap dikenali.
+if config.IDEMPOTENCY_ENABLED:
+    app.add_middleware(
+        IdempotencyMiddleware,
+        shared=SharedIdempotencyStore(f"{config.SQLITE_PATH}-idempotency") if config.WORKERS > 1 else None,
+    )
+
+# === Admission Control ===
+# Membatasi laju dan jumlah request bersamaan di jalur transaksi (dipasang di dalam
+# middleware metrik agar request yang ditolak tetap tercatat)
+if config.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
+# === Monitoring ===
+# Middleware mencatat jumlah request dan latensi per route untuk endpoint /metrics
+if config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_routes.router)
 
 
 @app.get("/", tags=["Root"])
@@ -38,3 +115,9 @@ def read_root():
     Endpoint root untuk mengecek apakah API berjalan.
     """
     return {"message": "Selamat datang di API Perpustakaan Universitas!"}
+
+
+# === Profiling ===
+# Middleware profiling hanya dipasang jika diaktifkan (termasuk untuk header X-Profile)
+if config.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
@@ -0,0 +1,264 @@
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+import functools
+import threading
+import time
+
+import anyio.to_thread
+
+# ==================================
+#      METRIK (FORMAT PROMETHEUS)
+# ==================================
+# Setiap thread mencatat ke "shard" miliknya sendiri (dict biasa di threading.local),
+# jadi pencatatan di jalur request tidak memakai lock. Shard semua thread baru
+# dijumlahkan saat /metrics dibaca.
+
+# Batas bucket histogram latensi (detik)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# Nama metrik yang dicatat aplikasi
+HTTP_REQUESTS = "library_http_requests_total"
+HTTP_LATENCY = "library_http_request_duration_seconds"
+LOAN_LOOKUP_LATENCY = "library_store_loan_lookup_duration_seconds"
+
+
+class _Shard:
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, tuple], float] = {}
+        # (nama, label) -> [jumlah per bucket..., jumlah di atas bucket terakhir, total nilai]
+        self.histograms: Dict[Tuple[str, tuple], List[float]] = {}
+
+
+class MetricsRegistry:
+    """
+    Counter dan histogram per thread. Metrik harus didaftarkan lewat `describe`
+    sebelum ditampilkan; label diberikan sebagai tuple sesuai urutan `label_names`.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {}
+        # Request yang sedang diproses; hanya diubah dari thread event loop (middleware)
+        self.in_flight = 0
+
+    def describe(self, name: str, kind: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self._meta[name] = (kind, help_text, label_names)
+
+    def _shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    # --- Pencatatan (jalur cepat) ---
+    def inc(self, name: str, labels: tuple = (), value: float = 1):
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: tuple, value: float):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        values = histograms.get(key)
+        if values is None:
+            values = histograms[key] = [0] * (len(self.buckets) + 2)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def timed(self, name: str, *labels) -> Callable:
+        """
+        Decorator yang mencatat durasi setiap pemanggilan fungsi ke histogram `name`.
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(name, labels, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    # --- Pembacaan ---
+    def snapshot(self) -> Tuple[Dict[Tuple[str, tuple], float], Dict[Tuple[str, tuple], List[float]]]:
+        """
+        Jumlah semua shard. Shard thread lain dibaca tanpa lock (list(dict.items())
+        atomik di bawah GIL); nilai yang sedang ditulis bisa tertinggal satu pencatatan.
+        """
+        with self._lock:
+            shards = list(self._shards)
+        counters: Dict[Tuple[str, tuple], float] = {}
+        histograms: Dict[Tuple[str, tuple], List[float]] = {}
+        for shard in shards:
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, values in list(shard.histograms.items()):
+                total = histograms.get(key)
+                if total is None:
+                    histograms[key] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        total[i] += value
+        return counters, histograms
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+
+    def render(self, gauges: Dict[str, float] = None) -> str:
+        """
+        Semua metrik dalam format teks Prometheus. `gauges` berisi nilai gauge tanpa
+        label yang dihitung saat itu juga (misalnya jumlah buku).
+        """
+        counters, histograms = self.snapshot()
+        by_name: Dict[str, List[str]] = {}
+        for (name, labels), value in sorted(counters.items()):
+            by_name.setdefault(name, []).append(f"{name}{self._labels(name, labels)} {_number(value)}")
+        for (name, labels), values in sorted(histograms.items()):
+            lines = by_name.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{name}_bucket{self._labels(name, labels, le=_number(bound))} {_number(cumulative)}")
+            cumulative += values[-2]
+            lines.append(f"{name}_bucket{self._labels(name, labels, le='+Inf')} {_number(cumulative)}")
+            lines.append(f"{name}_sum{self._labels(name, labels)} {_number(values[-1])}")
+            lines.append(f"{name}_count{self._labels(name, labels)} {_number(cumulative)}")
+        for name, value in (gauges or {}).items():
+            by_name[name] = [f"{name} {_number(value)}"]
+
+        out = []
+        for name in sorted(by_name):
+            kind, help_text, _ = self._meta.get(name, (GAUGE, "", ()))
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(by_name[name])
+        return "\n".join(out) + "\n"
+
+    def _labels(self, name: str, values: tuple, le: Optional[str] = None) -> str:
+        label_names = self._meta.get(name, (None, None, ()))[2]
+        pairs = [f'{key}="{_escape(str(value))}"' for key, value in zip(label_names, values)]
+        if le is not None:
+            pairs.append(f'le="{le}"')
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else repr(value)
+    return str(value)
+
+
+metrics = MetricsRegistry()
+metrics.describe(HTTP_REQUESTS, COUNTER, "Jumlah request HTTP per route dan status.", ("method", "route", "status"))
+metrics.describe(HTTP_LATENCY, HISTOGRAM, "Latensi request HTTP per route (detik).", ("method", "route"))
+metrics.describe(LOAN_LOOKUP_LATENCY, HISTOGRAM, "Waktu pencarian pinjaman di storage (detik).", ("operation",))
+metrics.describe("library_http_requests_in_flight", GAUGE, "Request yang sedang diproses.")
+metrics.describe("library_threadpool_busy_threads", GAUGE, "Thread pool yang sedang menjalankan endpoint sinkron.")
+metrics.describe("library_threadpool_max_threads", GAUGE, "Ukuran maksimum thread pool.")
+metrics.describe("library_threadpool_queue_depth", GAUGE, "Endpoint sinkron yang menunggu thread kosong.")
+metrics.describe("library_books", GAUGE, "Jumlah buku di katalog.")
+metrics.describe("library_loans_active", GAUGE, "Jumlah pinjaman yang belum dikembalikan.")
+metrics.describe("library_loans", GAUGE, "Jumlah seluruh pinjaman (aktif dan selesai).")
+
+
+# ==================================
+#         MIDDLEWARE HTTP
+# ==================================
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI yang mencatat jumlah request, status, dan latensi per route.
+    Route dicatat sebagai template path (misalnya `/books/{book_id}`), bukan URL
+    aslinya, agar jumlah label tetap terbatas.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+        self._route_paths: Dict[Callable, str] = {}
+
+    def _route_label(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            # Peta endpoint -> template path dibangun sekali dari daftar route aplikasi
+            self._route_paths = {getattr(route, "endpoint", None): route.path for route in scope["app"].routes}
+            path = self._route_paths.get(endpoint, UNMATCHED_ROUTE)
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry = self.registry
+        registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            registry.in_flight -= 1
+            route = self._route_label(scope)
+            registry.inc(HTTP_REQUESTS, (scope["method"], route, str(status_code)))
+            registry.observe(HTTP_LATENCY, (scope["method"], route), elapsed)
+
+
+def runtime_gauges(registry: MetricsRegistry = metrics) -> Dict[str, float]:
+    """
+    Gauge proses yang dihitung saat /metrics dibaca. Harus dipanggil dari event loop
+    (untuk membaca statistik thread pool anyio); tidak menyentuh storage.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    statistics = limiter.statistics()
+    return {
+        "library_http_requests_in_flight": registry.in_flight,
+        "library_threadpool_busy_threads": statistics.borrowed_tokens,
+        "library_threadpool_max_threads": limiter.total_tokens,
+        "library_threadpool_queue_depth": statistics.tasks_waiting,
+    }
+
+
+def store_gauges(store) -> Dict[str, float]:
+    """
+    Jumlah data di storage. Pada SQLite ini query COUNT(*), jadi jalankan di threadpool,
+    bukan di event loop.
+    """
+    total_loans, active_loans = store.loan_counts()
+    return {
+        "library_books": store.count_books(),
+        "library_loans_active": active_loans,
+        "library_loans": total_loans,
+    }
@@ -0,0 +1,65 @@
+from typing import Callable, Iterator, List, Optional, Any
+import uuid
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+
+# ==================================
+#     PAGINATION & STREAMING NDJSON
+# ==================================
+# Cursor yang dipakai adalah ID item terakhir pada halaman sebelumnya (keyset pagination).
+# Fungsi `fetch_page(after, limit)` harus mengembalikan item terurut berdasarkan ID.
+# Urutan lain bisa dipakai dengan `cursor_of`: fungsi yang membuat cursor dari item
+# terakhir (dikirim sebagai `str(cursor)` di header).
+FetchPage = Callable[[Optional[Any], Optional[int]], List[Any]]
+CursorOf = Callable[[Any], Any]
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+STREAM_CHUNK_SIZE = 500
+
+
+def _item_id(item) -> uuid.UUID:
+    return item.id
+
+
+def paginate(fetch_page: FetchPage, after: Optional[Any], limit: Optional[int], response: Response,
+             cursor_of: CursorOf = _item_id) -> List[Any]:
+    """
+    Mengambil satu halaman data. Jika masih ada data berikutnya, cursor untuk halaman
+    selanjutnya dikirim lewat header `X-Next-Cursor`.
+    """
+    if limit is None:
+        return fetch_page(after, None)
+
+    # Ambil satu item lebih untuk mengetahui apakah masih ada halaman berikutnya
+    items = fetch_page(after, limit + 1)
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(cursor_of(items[-1]))
+    return items
+
+
+def iter_ndjson(fetch_page: FetchPage, after: Optional[Any] = None, limit: Optional[int] = None,
+                cursor_of: CursorOf = _item_id) -> Iterator[bytes]:
+    """
+    Menghasilkan item satu per satu dalam format NDJSON (satu objek JSON per baris).
+    Data diambil per potongan kecil sehingga memori yang dipakai tetap kecil.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        chunk_size = STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining)
+        items = fetch_page(after, chunk_size)
+        if not items:
+            return
+        for item in items:
+            yield item.model_dump_json().encode() + b"\n"
+        after = cursor_of(items[-1])
+        if remaining is not None:
+            remaining -= len(items)
+        if len(items) < chunk_size:
+            return
+
+
+def stream_ndjson(fetch_page: FetchPage, after: Optional[Any] = None, limit: Optional[int] = None,
+                  cursor_of: CursorOf = _item_id) -> StreamingResponse:
+    return StreamingResponse(iter_ndjson(fetch_page, after, limit, cursor_of), media_type="application/x-ndjson")
@@ -0,0 +1,272 @@
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+import cProfile
+import itertools
+import os
+import pstats
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from fastapi import HTTPException
+
+from . import config
+from .dependencies import get_current_user, require_admin_role
+
+# ==================================
+#       PROFILING REQUEST LAMBAT
+# ==================================
+# Profiling sepenuhnya dilakukan di middleware ASGI, yang hanya dipasang jika
+# LIBRARY_PROFILING_ENABLED aktif; route dan fungsi framework tidak diubah.
+#
+# Dua cara pengambilan profil:
+# - Stack sampler: thread latar yang setiap beberapa milidetik mengambil stack semua
+#   thread yang sedang menjalankan fungsi endpoint request yang dipantau (dikenali dari
+#   `scope["endpoint"]` yang diisi router), termasuk endpoint sinkron di thread pool.
+#   Hasilnya collapsed stack (`.collapsed`, format flamegraph), disimpan untuk request
+#   yang lebih lambat dari batas atau yang dipilih untuk diprofil. Request bersamaan ke
+#   endpoint yang sama tidak bisa dibedakan, jadi sampelnya tercatat di semua trace itu.
+# - cProfile: untuk request yang dipilih di awal (sampling acak atau header admin),
+#   selama request berjalan di thread event loop (routing, middleware, endpoint async).
+#   Hanya satu profil yang aktif sekaligus. Hasilnya file `.pstats`.
+
+PROFILE_HEADER = "x-profile"
+
+REASON_SAMPLED = "sampled"
+REASON_HEADER = "header"
+REASON_SLOW = "slow"
+
+
+@dataclass
+class ProfileTrace:
+    id: str
+    method: str
+    path: str
+    reasons: List[str] = field(default_factory=list)
+    status_code: int = 0
+    duration_ms: float = 0.0
+    started_at: float = field(default_factory=time.time)
+    files: Dict[str, str] = field(default_factory=dict)  # jenis ("pstats"/"collapsed") -> path
+    # Diisi selama request berjalan
+    use_cprofile: bool = False
+    scope: dict = field(default_factory=dict, repr=False)
+    profile: Optional[cProfile.Profile] = field(default=None, repr=False)
+    samples: Counter = field(default_factory=Counter, repr=False)
+
+
+def _collapsed_stack(frame) -> str:
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class RequestProfiler:
+    """
+    Memilih request yang diprofil, menjalankan stack sampler, dan menyimpan
+    `keep` trace terakhir beserta filenya (file trace lama dihapus).
+    """
+
+    def __init__(self, enabled: bool = config.PROFILING_ENABLED,
+                 sample_rate: float = config.PROFILE_SAMPLE_RATE,
+                 slow_ms: float = config.PROFILE_SLOW_MS,
+                 interval_ms: float = config.PROFILE_SAMPLE_INTERVAL_MS,
+                 directory: str = config.PROFILE_DIR,
+                 keep: int = config.PROFILE_KEEP):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.interval = interval_ms / 1000
+        self.directory = directory
+        self.traces: Deque[ProfileTrace] = deque()
+        self.keep = keep
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        # Request yang sedang berjalan dan dipantau sampler
+        self._active: List[ProfileTrace] = []
+        # Trace yang sedang memakai cProfile (hanya satu per thread event loop)
+        self._cprofile_owner: Optional[ProfileTrace] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # --- Siklus request ---
+    def begin(self, scope: dict, profile_header: bool) -> Optional[ProfileTrace]:
+        """
+        Membuat trace untuk request baru (ASGI `scope`) dan mulai memantaunya, atau None
+        jika request tidak perlu dipantau. Dipanggil dari thread event loop.
+        """
+        reasons = []
+        if profile_header:
+            reasons.append(REASON_HEADER)
+        if self.enabled and self.sample_rate > 0 and random.random() < self.sample_rate:
+            reasons.append(REASON_SAMPLED)
+        if not reasons and not (self.enabled and self.slow_ms > 0):
+            return None
+        trace = ProfileTrace(id=f"{int(time.time())}-{next(self._counter)}", method=scope["method"],
+                             path=scope["path"], reasons=reasons, use_cprofile=bool(reasons), scope=scope)
+        self._ensure_sampler()
+        with self._lock:
+            self._active.append(trace)
+            if trace.use_cprofile and self._cprofile_owner is None:
+                self._cprofile_owner = trace
+                trace.profile = cProfile.Profile()
+        if trace.profile is not None:
+            trace.profile.enable()
+        return trace
+
+    def finish(self, trace: ProfileTrace, status_code: int, duration_ms: float):
+        """
+        Berhenti memantau request dan menulis file profilnya. Dipanggil dari thread yang
+        sama dengan `begin`.
+        """
+        if trace.profile is not None:
+            trace.profile.disable()
+        with self._lock:
+            self._active.remove(trace)
+            if self._cprofile_owner is trace:
+                self._cprofile_owner = None
+        trace.status_code = status_code
+        trace.duration_ms = duration_ms
+        slow = self.slow_ms > 0 and duration_ms >= self.slow_ms
+        if slow and trace.samples:
+            trace.reasons.append(REASON_SLOW)
+        if trace.samples and (slow or trace.use_cprofile):
+            trace.files["collapsed"] = self._write_collapsed(trace)
+        if trace.profile is not None:
+            trace.files["pstats"] = self._write_pstats(trace)
+        trace.profile = None
+        trace.scope = {}
+        trace.samples = Counter()
+        if trace.files:
+            self._remember(trace)
+
+    def _remember(self, trace: ProfileTrace):
+        with self._lock:
+            self.traces.append(trace)
+            while len(self.traces) > self.keep:
+                for path in self.traces.popleft().files.values():
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def slowest(self, limit: int) -> List[ProfileTrace]:
+        with self._lock:
+            traces = list(self.traces)
+        return sorted(traces, key=lambda trace: trace.duration_ms, reverse=True)[:limit]
+
+    def get(self, trace_id: str) -> Optional[ProfileTrace]:
+        with self._lock:
+            return next((trace for trace in self.traces if trace.id == trace_id), None)
+
+    # --- Stack sampler ---
+    def _ensure_sampler(self):
+        if self._sampler is None or not self._sampler.is_alive():
+            with self._lock:
+                if self._sampler is None or not self._sampler.is_alive():
+                    self._stop.clear()
+                    self._sampler = threading.Thread(target=self._sample_loop, name="request-stack-sampler", daemon=True)
+                    self._sampler.start()
+
+    def _sample_loop(self):
+        own_thread = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                active = list(self._active)
+            # Kode fungsi endpoint -> trace; endpoint baru diketahui setelah router mencocokkan route
+            endpoints: Dict[object, List[ProfileTrace]] = {}
+            for trace in active:
+                code = getattr(trace.scope.get("endpoint"), "__code__", None)
+                if code is not None:
+                    endpoints.setdefault(code, []).append(trace)
+            if not endpoints:
+                continue
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                caller = frame
+                while caller is not None and caller.f_code not in endpoints:
+                    caller = caller.f_back
+                if caller is None:
+                    continue
+                stack = _collapsed_stack(frame)
+                for trace in endpoints[caller.f_code]:
+                    trace.samples[stack] += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=5)
+            self._sampler = None
+
+    # --- File hasil ---
+    def _path(self, trace: ProfileTrace, suffix: str) -> str:
+        if not self.directory:
+            self.directory = tempfile.mkdtemp(prefix="library-profiles-")
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"{trace.id}.{suffix}")
+
+    def _write_pstats(self, trace: ProfileTrace) -> str:
+        path = self._path(trace, "pstats")
+        pstats.Stats(trace.profile).dump_stats(path)
+        return path
+
+    def _write_collapsed(self, trace: ProfileTrace) -> str:
+        path = self._path(trace, "collapsed")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in trace.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+request_profiler = RequestProfiler()
+
+
+def _admin_requested_profile(scope) -> bool:
+    headers = dict(scope.get("headers") or ())
+    if headers.get(PROFILE_HEADER.encode(), b"").lower() not in (b"1", b"true"):
+        return False
+    try:
+        require_admin_role(get_current_user(int(headers.get(b"x-user-id", b""))))
+    except (HTTPException, ValueError):
+        return False
+    return True
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI yang memantau request (jika perlu) selama request diproses.
+    Header `X-Profile: 1` dari admin memaksa request diprofil.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler = None):
+        self.app = app
+        self.profiler = profiler or request_profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trace = self.profiler.begin(scope, _admin_requested_profile(scope))
+        if trace is None:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.profiler.finish(trace, status_code, (time.perf_counter() - start) * 1000)
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Response
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Response, Query, Request
+from pydantic import TypeAdapter
+from typing import List, Optional
 import uuid
-from ..schemas import Book, BookCreate, BookUpdate, User
-from ..data_store import books_db
+from ..schemas import Book, BookCreate, BookUpdate, User, BulkImportResult
+from ..storage import LibraryStore, BookNotFoundError, get_store
 from ..dependencies import require_admin_role, get_current_user
+from ..pagination import paginate, stream_ndjson
+from ..bulk_import import BookImporter, detect_format, FORMAT_CSV, FORMAT_NDJSON
+from ..cache import cached_json_response, list_key, book_key
+from ..serialization import json_response
 
 router = APIRouter(
     prefix="/books",
@@ -18,66 +23,120 @@ public_router = APIRouter(
     tags=["Books (Public)"]
 )
 
+# Serializer untuk respons yang disimpan di cache (tanpa validasi ulang lewat response_model)
+_book_adapter = TypeAdapter(Book)
+_book_list_adapter = TypeAdapter(List[Book])
+
 @public_router.get("/", response_model=List[Book])
-def get_all_books(available_only: bool = False):
+def get_all_books(
+    request: Request,
+    response: Response,
+    available_only: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Jumlah maksimal buku per halaman"),
+    after: Optional[uuid.UUID] = Query(None, description="Cursor: ID buku terakhir dari halaman sebelumnya"),
+    stream: bool = Query(False, description="Kirim hasil sebagai NDJSON yang di-stream"),
+    store: LibraryStore = Depends(get_store),
+):
     """
-    Mendapatkan daftar semua buku. Bisa diakses oleh semua user.
+    Mendapatkan daftar semua buku, diurutkan berdasarkan ID. Bisa diakses oleh semua user.
     Jika query parameter `available_only` adalah true, hanya buku dengan stok > 0 yang ditampilkan.
+    Gunakan `limit` dan `after` untuk pagination; cursor halaman berikutnya ada di header `X-Next-Cursor`.
+    Daftar lengkap (tanpa pagination) dikirim dari cache dan mendukung `If-None-Match`.
     """
-    book_list = list(books_db.values())
-    if available_only:
-        return [book for book in book_list if book.stock > 0]
-    return book_list
+    if limit is None and after is None and not stream:
+        return cached_json_response(
+            request, store, list_key(available_only),
+            lambda: _book_list_adapter.dump_json(store.list_books(available_only=available_only)),
+        )
+
+    def fetch_page(cursor, size):
+        return store.list_books(after=cursor, limit=size, available_only=available_only)
+
+    if stream:
+        return stream_ndjson(fetch_page, after, limit)
+    return json_response(paginate(fetch_page, after, limit, response), List[Book], response)
+
+@public_router.get("/search", response_model=List[Book])
+def search_books(
+    response: Response,
+    q: str = Query(..., min_length=1, description="Kata kunci judul atau penulis"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    store: LibraryStore = Depends(get_store),
+):
+    """
+    Mencari buku berdasarkan judul dan penulis. Bisa diakses oleh semua user.
+    Semua kata harus cocok; kata terakhir boleh berupa awalan (prefix). Hasil diurutkan
+    berdasarkan relevansi, dan jumlah total hasil dikirim lewat header `X-Total-Count`.
+    """
+    total, books = store.search_books(q, limit=limit, offset=offset)
+    response.headers["X-Total-Count"] = str(total)
+    return json_response(books, List[Book], response)
 
 @public_router.get("/{book_id}", response_model=Book)
-def get_book_by_id(book_id: uuid.UUID):
+def get_book_by_id(book_id: uuid.UUID, request: Request, store: LibraryStore = Depends(get_store)):
     """
     Mendapatkan detail satu buku berdasarkan ID. Bisa diakses oleh semua user.
+    Respons dikirim dari cache dan mendukung `If-None-Match`.
     """
-    book = books_db.get(book_id)
-    if not book:
+    def build():
+        book = store.get_book(book_id)
+        return _book_adapter.dump_json(book) if book else None
+
+    response = cached_json_response(request, store, book_key(book_id), build)
+    if response is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Buku tidak ditemukan.")
-    return book
+    return response
 
 
 @router.post("/", response_model=Book, status_code=status.HTTP_201_CREATED)
-def add_new_book(book_data: BookCreate):
+def add_new_book(book_data: BookCreate, store: LibraryStore = Depends(get_store)):
     """
     Menambahkan buku baru ke dalam sistem. (Hanya Admin)
     """
-    new_id = uuid.uuid4()
-    # Pastikan tidak ada duplikat ID, meskipun kemungkinannya sangat kecil
-    while new_id in books_db:
-        new_id = uuid.uuid4()
-    
-    new_book = Book(id=new_id, **book_data.model_dump())
-    books_db[new_id] = new_book
-    return new_book
+    return json_response(store.add_book(book_data), Book, status_code=status.HTTP_201_CREATED)
+
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_import_books(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Format body; default mengikuti Content-Type"),
+    dry_run: bool = Query(False, description="Hanya validasi, tanpa menyimpan data"),
+    store: LibraryStore = Depends(get_store),
+):
+    """
+    Mengimpor banyak buku sekaligus dari body CSV (`title,author,stock`) atau NDJSON. (Hanya Admin)
+    Body dibaca secara streaming dan disimpan per batch. Baris yang tidak valid dilaporkan
+    per baris tanpa membatalkan impor baris lainnya.
+    """
+    fmt = format or detect_format(request.headers.get("content-type", ""))
+    if fmt not in (FORMAT_CSV, FORMAT_NDJSON):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Format tidak didukung. Gunakan text/csv atau application/x-ndjson."
+        )
+    importer = BookImporter(store, fmt, dry_run=dry_run)
+    return await importer.run(request.stream())
 
 @router.put("/{book_id}", response_model=Book)
-def update_book_details(book_id: uuid.UUID, book_update: BookUpdate):
+def update_book_details(book_id: uuid.UUID, book_update: BookUpdate, store: LibraryStore = Depends(get_store)):
     """
     Memperbarui informasi buku berdasarkan ID. (Hanya Admin)
     Hanya field yang diisi yang akan diperbarui.
     """
-    book = books_db.get(book_id)
-    if not book:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Buku tidak ditemukan.")
-
     update_data = book_update.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(book, key, value)
-    
-    books_db[book_id] = book
-    return book
+    try:
+        book = store.update_book(book_id, update_data)
+    except BookNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Buku tidak ditemukan.")
+    return json_response(book, Book)
 
 @router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_book(book_id: uuid.UUID):
+def delete_book(book_id: uuid.UUID, store: LibraryStore = Depends(get_store)):
     """
     Menghapus buku dari sistem berdasarkan ID. (Hanya Admin)
     """
-    if book_id not in books_db:
+    try:
+        store.delete_book(book_id)
+    except BookNotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Buku tidak ditemukan.")
-    
-    del books_db[book_id]
     return Response(status_code=status.HTTP_204_NO_CONTENT)
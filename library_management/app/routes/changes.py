@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, Header, Query
+from typing import Optional
+
+from ..schemas import ChangeFeed, ChangeEntry
+from ..storage import LibraryStore, get_store
+from ..data_store import users_db
+from ..changes import ChangeLog, change_log, ENTITY_BOOK, ENTITY_LOAN
+
+router = APIRouter(
+    tags=["Change Feed"]
+)
+
+def get_change_log(store: LibraryStore = Depends(get_store)) -> ChangeLog:
+    """
+    Dependensi yang mengembalikan change log untuk storage yang aktif.
+    """
+    # Dalam mode multi-worker feed dibaca dari storage, jadi sama untuk semua worker
+    change_log.bind(store)
+    return change_log
+
+@router.get("/changes", response_model=ChangeFeed)
+def get_changes(
+    since: int = Query(0, ge=0, description="Nomor urut perubahan terakhir yang sudah diterima (`next` dari respons sebelumnya)"),
+    epoch: Optional[str] = Query(None, description="`epoch` dari respons sebelumnya; jika berbeda, klien harus resync"),
+    limit: int = Query(500, ge=1, le=5000, description="Jumlah maksimal nomor urut yang dibaca"),
+    x_user_id: Optional[int] = Header(None, description="Opsional; admin juga menerima perubahan pinjaman"),
+    log: ChangeLog = Depends(get_change_log),
+):
+    """
+    Perubahan buku (dan pinjaman, untuk admin) setelah nomor urut `since`. Klien menyimpan
+    `next` dan `epoch` lalu memakainya pada request berikutnya. Jika `resync_required`
+    true, data lengkap dimuat ulang (GET /books/, /loans/active-all) sebelum melanjutkan.
+    """
+    user = users_db.get(x_user_id) if x_user_id is not None else None
+    entities = (ENTITY_BOOK, ENTITY_LOAN) if user is not None and user.role == "admin" else (ENTITY_BOOK,)
+
+    page = log.read(since, epoch, limit)
+    return ChangeFeed(
+        epoch=page.epoch,
+        resync_required=page.resync_required,
+        next=page.next,
+        has_more=page.has_more,
+        changes=[
+            ChangeEntry(
+                seq=change.seq, entity=change.entity, op=change.op, id=change.id,
+                book=change.data if change.entity == ENTITY_BOOK else None,
+                loan=change.data if change.entity == ENTITY_LOAN else None,
+            )
+            for change in page.changes if change.entity in entities
+        ],
+    )
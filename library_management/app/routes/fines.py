@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, Response, Query
+from datetime import date
+from typing import List, Optional
+
+from ..schemas import OverdueLoan, UserFineSummary, FineTotals
+from ..storage import LibraryStore, get_store
+from ..dependencies import require_admin_role
+from ..fines import FineReport
+
+router = APIRouter(
+    prefix="/fines",
+    tags=["Fines Report (Admin)"],
+    dependencies=[Depends(require_admin_role)]
+)
+
+def get_fine_report(
+    as_of: Optional[date] = Query(None, description="Tanggal perhitungan denda; default hari ini"),
+    store: LibraryStore = Depends(get_store),
+) -> FineReport:
+    """
+    Dependensi yang menghitung denda berjalan semua pinjaman aktif pada tanggal `as_of`.
+    """
+    return FineReport(store.active_loan_columns(), as_of or date.today())
+
+@router.get("/summary", response_model=FineTotals)
+def get_fine_totals(report: FineReport = Depends(get_fine_report)):
+    """
+    Total pinjaman terlambat dan denda berjalan di seluruh perpustakaan. (Hanya Admin)
+    """
+    return report.totals()
+
+@router.get("/overdue", response_model=List[OverdueLoan])
+def get_overdue_loans(
+    response: Response,
+    user_id: Optional[int] = Query(None, description="Hanya pinjaman milik user ini"),
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    report: FineReport = Depends(get_fine_report),
+):
+    """
+    Daftar pinjaman yang lewat jatuh tempo, diurutkan dari yang paling lama terlambat. (Hanya Admin)
+    Jumlah total hasil dikirim lewat header `X-Total-Count`.
+    """
+    total, loans = report.overdue(limit, offset, user_id=user_id)
+    response.headers["X-Total-Count"] = str(total)
+    return loans
+
+@router.get("/users", response_model=List[UserFineSummary])
+def get_fines_per_user(
+    response: Response,
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    report: FineReport = Depends(get_fine_report),
+):
+    """
+    Denda berjalan per user, diurutkan dari yang terbesar. (Hanya Admin)
+    Jumlah total user yang punya denda dikirim lewat header `X-Total-Count`.
+    """
+    total, users = report.per_user(limit, offset)
+    response.headers["X-Total-Count"] = str(total)
+    return users
+
+@router.get("/users/{user_id}", response_model=UserFineSummary)
+def get_fines_for_user(user_id: int, report: FineReport = Depends(get_fine_report)):
+    """
+    Denda berjalan milik satu user. (Hanya Admin)
+    """
+    return report.for_user(user_id)
@@ -0,0 +1,115 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List
+import asyncio
+import uuid
+
+from ..schemas import User, HoldInfo
+from ..storage import LibraryStore, get_store, BookNotFoundError
+from ..dependencies import get_current_user, require_single_worker
+from ..holds import (
+    Hold, hold_queue, WAITING, FINAL_STATUSES,
+    AlreadyQueuedError, HoldNotFoundError, BookAvailableError,
+)
+
+# Antrean hanya ada di memori satu proses, jadi reservasi dimatikan dalam mode multi-worker
+router = APIRouter(
+    prefix="/holds",
+    tags=["Reservations"],
+    dependencies=[Depends(require_single_worker)]
+)
+
+# Komentar SSE yang dikirim berkala agar koneksi tidak diputus proxy saat tidak ada event
+KEEPALIVE_SECONDS = 15
+
+def _hold_info(hold: Hold) -> HoldInfo:
+    position = hold_queue.position(hold.book_id, hold.user_id) if hold.status == WAITING else None
+    return HoldInfo(book_id=hold.book_id, status=hold.status, position=position, expires_at=hold.expires_at)
+
+def _current_hold(book_id: uuid.UUID, current_user: User) -> Hold:
+    hold = hold_queue.get(book_id, current_user.id)
+    if hold is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Anda tidak ada di antrean buku ini.")
+    return hold
+
+@router.get("/my-holds", response_model=List[HoldInfo])
+def get_my_holds(current_user: User = Depends(get_current_user)):
+    """
+    Melihat semua reservasi user saat ini yang masih menunggu atau siap diambil.
+    """
+    return [_hold_info(hold) for hold in hold_queue.for_user(current_user.id)]
+
+@router.post("/{book_id}", response_model=HoldInfo, status_code=status.HTTP_201_CREATED)
+def join_hold_queue(book_id: uuid.UUID, current_user: User = Depends(get_current_user), store: LibraryStore = Depends(get_store)):
+    """
+    Masuk antrean untuk buku yang stoknya habis. Saat salinan dikembalikan, salinan itu
+    disimpan untuk orang pertama di antrean dan diambil lewat `POST /borrow/{book_id}`.
+    """
+    if current_user.role == 'admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin tidak dapat mengantre buku.")
+    if any(loan.book_id == book_id for loan in store.active_loans_for_user(current_user.id)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Anda sudah meminjam buku ini.")
+    try:
+        hold = hold_queue.join(store, book_id, current_user.id)
+    except BookNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Buku tidak ditemukan.")
+    except BookAvailableError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Stok buku masih tersedia, silakan langsung meminjam.")
+    except AlreadyQueuedError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Anda sudah ada di antrean buku ini.")
+    return _hold_info(hold)
+
+@router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
+def leave_hold_queue(book_id: uuid.UUID, current_user: User = Depends(get_current_user), store: LibraryStore = Depends(get_store)):
+    """
+    Keluar dari antrean. Salinan yang sedang disimpan diserahkan ke orang berikutnya.
+    """
+    try:
+        hold_queue.leave(store, book_id, current_user.id)
+    except HoldNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Anda tidak ada di antrean buku ini.")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.get("/{book_id}/wait", response_model=HoldInfo)
+async def wait_for_hold(
+    book_id: uuid.UUID,
+    timeout: float = Query(30, ge=0, le=60, description="Lama maksimal menunggu perubahan status (detik)"),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Long-polling: menunggu sampai status reservasi berubah (misalnya salinan siap diambil)
+    atau `timeout` habis, lalu mengembalikan status terbaru.
+    """
+    # Pengamat didaftarkan sebelum status dibaca agar perubahan di antaranya tidak terlewat
+    with hold_queue.watch(book_id, current_user.id) as updates:
+        hold = _current_hold(book_id, current_user)
+        if hold.status == WAITING:
+            try:
+                hold = await asyncio.wait_for(updates.get(), timeout)
+            except asyncio.TimeoutError:
+                pass
+    return _hold_info(hold)
+
+@router.get("/{book_id}/events")
+async def stream_hold_events(book_id: uuid.UUID, current_user: User = Depends(get_current_user)):
+    """
+    Server-Sent Events: mengirim status reservasi saat ini, lalu setiap perubahannya.
+    Stream selesai setelah reservasi berakhir (diambil, kedaluwarsa, atau dibatalkan).
+    """
+    _current_hold(book_id, current_user)
+
+    async def events():
+        with hold_queue.watch(book_id, current_user.id) as updates:
+            hold = hold_queue.get(book_id, current_user.id)
+            if hold is None:
+                return
+            yield f"event: hold\ndata: {_hold_info(hold).model_dump_json()}\n\n"
+            while hold.status not in FINAL_STATUSES:
+                try:
+                    hold = await asyncio.wait_for(updates.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: hold\ndata: {_hold_info(hold).model_dump_json()}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
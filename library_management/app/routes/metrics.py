@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Response
+from starlette.concurrency import run_in_threadpool
+
+from ..storage import LibraryStore, get_store
+from ..metrics import metrics, runtime_gauges, store_gauges
+
+router = APIRouter(
+    tags=["Monitoring"]
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/metrics", response_class=Response)
+async def get_metrics(store: LibraryStore = Depends(get_store)):
+    """
+    Metrik aplikasi dalam format teks Prometheus: jumlah dan latensi request per route,
+    request yang sedang berjalan, antrean thread pool, dan jumlah data di storage.
+    """
+    # Handler async karena statistik thread pool anyio hanya bisa dibaca dari event loop;
+    # hitungan storage (COUNT(*) di SQLite) dijalankan di threadpool agar request lain tidak tertahan
+    gauges = runtime_gauges()
+    gauges.update(await run_in_threadpool(store_gauges, store))
+    return Response(content=metrics.render(gauges), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+from typing import List
+
+from ..schemas import ProfileTraceInfo
+from ..dependencies import require_admin_role
+from ..profiling import request_profiler
+
+router = APIRouter(
+    prefix="/profiles",
+    tags=["Profiling (Admin)"],
+    dependencies=[Depends(require_admin_role)]
+)
+
+@router.get("/slowest", response_model=List[ProfileTraceInfo])
+def get_slowest_traces(limit: int = Query(20, ge=1, le=200)):
+    """
+    Request terbaru yang diprofil, diurutkan dari yang paling lambat. (Hanya Admin)
+    """
+    return [
+        ProfileTraceInfo(
+            id=trace.id, method=trace.method, path=trace.path, reasons=trace.reasons,
+            status_code=trace.status_code, duration_ms=round(trace.duration_ms, 3),
+            started_at=trace.started_at, files=sorted(trace.files),
+        )
+        for trace in request_profiler.slowest(limit)
+    ]
+
+@router.get("/{trace_id}/{kind}")
+def download_profile(trace_id: str, kind: str):
+    """
+    Mengunduh file profil sebuah trace: `pstats` (buka dengan `python -m pstats`)
+    atau `collapsed` (untuk flamegraph). (Hanya Admin)
+    """
+    trace = request_profiler.get(trace_id)
+    if trace is None or kind not in trace.files:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profil tidak ditemukan.")
+    return FileResponse(trace.files[kind], media_type="application/octet-stream",
+                        filename=f"{trace_id}.{kind}")
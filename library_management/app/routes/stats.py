@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List
+
+from ..schemas import BookPopularity, AuthorPopularity, DailyCirculation
+from ..storage import LibraryStore, get_store
+from ..dependencies import require_admin_role, require_single_worker
+from ..analytics import CirculationStats, circulation_stats
+from .. import config
+
+# Statistik dihitung dari event storage di proses ini saja, jadi dimatikan dalam mode multi-worker
+router = APIRouter(
+    prefix="/stats",
+    tags=["Circulation Stats (Admin)"],
+    dependencies=[Depends(require_admin_role), Depends(require_single_worker)]
+)
+
+WINDOW_PATTERN = "^(week|all)$"
+
+def get_stats(store: LibraryStore = Depends(get_store)) -> CirculationStats:
+    """
+    Dependensi yang mengembalikan statistik sirkulasi untuk storage yang aktif.
+    """
+    circulation_stats.bind(store)
+    return circulation_stats
+
+@router.get("/top-books", response_model=List[BookPopularity])
+def get_top_books(
+    limit: int = Query(10, ge=1, le=100),
+    window: str = Query("week", pattern=WINDOW_PATTERN, description="`week` = jendela terakhir, `all` = sejak statistik dimulai"),
+    stats: CirculationStats = Depends(get_stats),
+):
+    """
+    Buku yang paling sering dipinjam. (Hanya Admin)
+    """
+    return [
+        BookPopularity(book_id=book_id, title=title, author=author, borrows=borrows)
+        for book_id, title, author, borrows in stats.top_books(limit, window=window == "week")
+    ]
+
+@router.get("/top-authors", response_model=List[AuthorPopularity])
+def get_top_authors(
+    limit: int = Query(10, ge=1, le=100),
+    window: str = Query("week", pattern=WINDOW_PATTERN),
+    stats: CirculationStats = Depends(get_stats),
+):
+    """
+    Penulis yang bukunya paling sering dipinjam. (Hanya Admin)
+    """
+    return [AuthorPopularity(author=author, borrows=borrows)
+            for author, borrows in stats.top_authors(limit, window=window == "week")]
+
+@router.get("/daily", response_model=List[DailyCirculation])
+def get_daily_circulation(
+    days: int = Query(7, ge=1, le=config.STATS_RETENTION_DAYS),
+    stats: CirculationStats = Depends(get_stats),
+):
+    """
+    Jumlah peminjaman dan pengembalian per hari, dari yang terlama sampai hari ini. (Hanya Admin)
+    """
+    return [DailyCirculation(day=day, borrows=borrows, returns=returns)
+            for day, borrows, returns in stats.daily(days)]
@@ -1,100 +1,70 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Response, Query
 from datetime import date, timedelta
 import uuid
-from typing import List
+from typing import List, Optional
 
-from ..schemas import User, LoanRecord, ReturnConfirmation, ActiveLoanResponse
-from ..data_store import books_db, loans_db
+from ..schemas import (
+    User, LoanRecord, ReturnConfirmation, ActiveLoanResponse, ActiveLoanRow,
+    BatchOperation, BatchTransactionRequest, BatchItemResult, BatchTransactionResponse,
+)
+from ..storage import (
+    LibraryStore, get_store, BookNotFoundError, OutOfStockError, DuplicateLoanError,
+    LoanNotFoundError, LoanAlreadyReturnedError, LoanAlreadyExtendedError,
+)
 from ..dependencies import get_current_user, require_admin_role
-
-# === KONFIGURASI ATURAN PEMINJAMAN ===
-LOAN_DURATION_DAYS = 14
-MAX_LOAN_DAYS_TOTAL = 30
-FINE_PER_DAY = 1000  # dalam Rupiah
+from ..pagination import paginate, stream_ndjson
+from ..holds import hold_queue
+from ..loan_history import LoanHistoryQuery, HistoryCursor, BORROW_DATE
+from ..serialization import json_response
+# Aturan peminjaman dan denda ada di `fines` agar dipakai bersama dengan laporan denda
+from ..fines import LOAN_DURATION_DAYS, MAX_LOAN_DAYS_TOTAL, FINE_PER_DAY, calculate_fine
 
 router = APIRouter(
     tags=["Loan Transactions"]
 )
 
-@router.post("/borrow/{book_id}", response_model=LoanRecord, status_code=status.HTTP_201_CREATED)
-def borrow_book(book_id: uuid.UUID, current_user: User = Depends(get_current_user)):
-    """
-    Endpoint untuk mahasiswa meminjam buku.
-    """
+# === LOGIKA TRANSAKSI ===
+# Dipakai bersama oleh endpoint tunggal dan endpoint batch. Setiap fungsi melempar
+# HTTPException jika transaksi ditolak.
+def process_borrow(store: LibraryStore, current_user: User, book_id: uuid.UUID, today: date) -> LoanRecord:
     if current_user.role == 'admin':
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin tidak dapat meminjam buku.")
 
-    book = books_db.get(book_id)
-    if not book:
+    # Proses peminjaman: cek stok, cek pinjaman ganda, kurangi stok, dan catat pinjaman
+    # dilakukan storage dalam satu transaksi. Salinan yang disimpan untuk antrean hanya
+    # boleh dipinjam pemegang hold-nya.
+    try:
+        with hold_queue.claim(store, book_id, current_user.id):
+            return store.borrow(
+                user_id=current_user.id,
+                book_id=book_id,
+                borrow_date=today,
+                due_date=today + timedelta(days=LOAN_DURATION_DAYS),
+            )
+    except BookNotFoundError:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Buku tidak ditemukan.")
-    
-    if book.stock <= 0:
+    except OutOfStockError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Stok buku habis.")
-
-    # Cek apakah user sudah meminjam buku yang sama dan belum dikembalikan
-    existing_loan = next((loan for loan in loans_db if loan.user_id == current_user.id and loan.book_id == book_id and loan.return_date is None), None)
-    if existing_loan:
+    except DuplicateLoanError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Anda sudah meminjam buku ini.")
 
-    # Proses peminjaman
-    book.stock -= 1
-    today = date.today()
-    
-    new_loan = LoanRecord(
-        id=uuid.uuid4(),
-        user_id=current_user.id,
-        book_id=book_id,
-        borrow_date=today,
-        due_date=today + timedelta(days=LOAN_DURATION_DAYS),
-        initial_borrow_date=today, # Set tanggal pinjam awal
-    )
-    loans_db.append(new_loan)
-    return new_loan
-
-@router.post("/return/{loan_id}", response_model=ReturnConfirmation)
-def return_book(loan_id: uuid.UUID, current_user: User = Depends(get_current_user)):
-    """
-    Endpoint untuk mahasiswa mengembalikan buku.
-    """
-    loan = next((l for l in loans_db if l.id == loan_id), None)
-    
+def process_return(store: LibraryStore, current_user: User, loan: Optional[LoanRecord], today: date) -> LoanRecord:
     if not loan:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Data peminjaman tidak ditemukan.")
 
     if loan.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Anda tidak berhak mengembalikan pinjaman ini.")
 
-    if loan.return_date is not None:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Buku ini sudah dikembalikan.")
-
     # Proses pengembalian
-    today = date.today()
-    fine_charged = 0
-    if today > loan.due_date:
-        days_late = (today - loan.due_date).days
-        fine_charged = days_late * FINE_PER_DAY
-    
-    loan.return_date = today
-    loan.fine = fine_charged
-    
-    book = books_db.get(loan.book_id)
-    if book:
-        book.stock += 1
-        
-    return ReturnConfirmation(
-        message="Buku berhasil dikembalikan.",
-        loan_id=loan.id,
-        fine_charged=fine_charged
-    )
-
-@router.post("/extend/{loan_id}", response_model=LoanRecord)
-def extend_loan_period(loan_id: uuid.UUID, current_user: User = Depends(get_current_user)):
-    """
-    Endpoint untuk mahasiswa memperpanjang masa pinjam.
-    """
-    loan = next((l for l in loans_db if l.id == loan_id and l.user_id == current_user.id), None)
+    try:
+        return store.return_loan(loan.id, today, lambda l: calculate_fine(l, today))
+    except LoanNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Data peminjaman tidak ditemukan.")
+    except LoanAlreadyReturnedError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Buku ini sudah dikembalikan.")
 
-    if not loan:
+def process_extend(store: LibraryStore, current_user: User, loan: Optional[LoanRecord]) -> LoanRecord:
+    if not loan or loan.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Data peminjaman tidak ditemukan.")
     
     if loan.return_date is not None:
@@ -109,36 +79,203 @@ def extend_loan_period(loan_id: uuid.UUID, current_user: User = Depends(get_curr
     if total_loan_duration > MAX_LOAN_DAYS_TOTAL:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Perpanjangan ditolak. Total durasi pinjam tidak boleh melebihi {MAX_LOAN_DAYS_TOTAL} hari.")
 
-    loan.due_date = new_due_date
-    loan.extended = True
-    return loan
+    try:
+        return store.extend_loan(loan.id, new_due_date)
+    except LoanNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Data peminjaman tidak ditemukan.")
+    except LoanAlreadyReturnedError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tidak dapat memperpanjang pinjaman yang sudah selesai.")
+    except LoanAlreadyExtendedError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Masa pinjam hanya bisa diperpanjang satu kali.")
+
+
+@router.post("/borrow/{book_id}", response_model=LoanRecord, status_code=status.HTTP_201_CREATED)
+def borrow_book(book_id: uuid.UUID, current_user: User = Depends(get_current_user), store: LibraryStore = Depends(get_store)):
+    """
+    Endpoint untuk mahasiswa meminjam buku.
+    Jika user punya reservasi yang siap diambil, salinan yang disimpan untuknya yang dipinjam.
+    """
+    loan = process_borrow(store, current_user, book_id, date.today())
+    return json_response(loan, LoanRecord, status_code=status.HTTP_201_CREATED)
+
+@router.post("/return/{loan_id}", response_model=ReturnConfirmation)
+def return_book(loan_id: uuid.UUID, current_user: User = Depends(get_current_user), store: LibraryStore = Depends(get_store)):
+    """
+    Endpoint untuk mahasiswa mengembalikan buku.
+    Jika ada yang mengantre buku ini, salinannya langsung disimpan untuk orang pertama di antrean.
+    """
+    loan = store.get_loan(loan_id)
+    with store.atomic([loan.book_id] if loan else []):
+        loan = process_return(store, current_user, loan, date.today())
+        hold_queue.hand_off(store, loan.book_id)
+    return json_response(ReturnConfirmation(
+        message="Buku berhasil dikembalikan.",
+        loan_id=loan.id,
+        fine_charged=loan.fine
+    ), ReturnConfirmation)
+
+@router.post("/extend/{loan_id}", response_model=LoanRecord)
+def extend_loan_period(loan_id: uuid.UUID, current_user: User = Depends(get_current_user), store: LibraryStore = Depends(get_store)):
+    """
+    Endpoint untuk mahasiswa memperpanjang masa pinjam.
+    """
+    return json_response(process_extend(store, current_user, store.get_loan(loan_id)), LoanRecord)
+
+class _BatchAborted(Exception):
+    """
+    Dipakai untuk membatalkan transaksi batch atomik saat ada operasi yang gagal.
+    """
+
+@router.post("/transactions/batch", response_model=BatchTransactionResponse)
+def run_batch_transactions(
+    batch: BatchTransactionRequest,
+    current_user: User = Depends(get_current_user),
+    store: LibraryStore = Depends(get_store),
+):
+    """
+    Menjalankan beberapa operasi borrow/return/extend milik user saat ini dalam satu request.
+    Setiap operasi punya hasilnya sendiri. Jika `atomic` true dan ada operasi yang gagal,
+    semua perubahan stok dan pinjaman dari batch ini dibatalkan.
+    """
+    today = date.today()
+    # Data pinjaman yang dirujuk diambil sekali di awal dan dipakai bersama semua operasi
+    loans = {op.loan_id: store.get_loan(op.loan_id) for op in batch.operations if op.loan_id}
+    book_ids = {op.book_id for op in batch.operations if op.book_id}
+    book_ids.update(loan.book_id for loan in loans.values() if loan)
+
+    results: List[BatchItemResult] = []
+    # Buku yang dikembalikan; pada batch atomik salinannya diserahkan ke antrean setelah semua operasi berhasil
+    returned_book_ids: List[uuid.UUID] = []
+
+    def run_operation(index: int, op: BatchOperation) -> BatchItemResult:
+        try:
+            if op.action == "borrow":
+                loan = process_borrow(store, current_user, op.book_id, today)
+                return BatchItemResult(index=index, action=op.action, status="ok", status_code=status.HTTP_201_CREATED, loan=loan)
+            if op.action == "return":
+                loan = loans[op.loan_id]
+                with store.atomic([loan.book_id] if loan else []):
+                    loan = process_return(store, current_user, loan, today)
+                    if not batch.atomic:
+                        hold_queue.hand_off(store, loan.book_id)
+                returned_book_ids.append(loan.book_id)
+                loans[op.loan_id] = loan
+                return BatchItemResult(index=index, action=op.action, status="ok", status_code=status.HTTP_200_OK,
+                                       loan=loan, fine_charged=loan.fine)
+            loan = process_extend(store, current_user, loans[op.loan_id])
+            loans[op.loan_id] = loan
+            return BatchItemResult(index=index, action=op.action, status="ok", status_code=status.HTTP_200_OK, loan=loan)
+        except HTTPException as e:
+            return BatchItemResult(index=index, action=op.action, status="error", status_code=e.status_code, detail=e.detail)
+
+    rolled_back = False
+    if not batch.atomic:
+        results = [run_operation(i, op) for i, op in enumerate(batch.operations)]
+    else:
+        try:
+            with store.atomic(book_ids):
+                for i, op in enumerate(batch.operations):
+                    results.append(run_operation(i, op))
+                    if results[-1].status == "error":
+                        raise _BatchAborted()
+                for book_id in returned_book_ids:
+                    hold_queue.hand_off(store, book_id)
+        except _BatchAborted:
+            rolled_back = True
+            for result in results[:-1]:
+                result.status = "rolled_back"
+            for i in range(len(results), len(batch.operations)):
+                results.append(BatchItemResult(
+                    index=i, action=batch.operations[i].action, status="skipped",
+                    status_code=status.HTTP_409_CONFLICT, detail="Tidak dijalankan karena operasi sebelumnya gagal."
+                ))
+
+    succeeded = sum(1 for result in results if result.status == "ok")
+    return json_response(BatchTransactionResponse(
+        atomic=batch.atomic,
+        rolled_back=rolled_back,
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results,
+    ), BatchTransactionResponse)
 
 @router.get("/loans/my-loans", response_model=List[ActiveLoanResponse])
-def get_my_active_loans(current_user: User = Depends(get_current_user)):
+def get_my_active_loans(current_user: User = Depends(get_current_user), store: LibraryStore = Depends(get_store)):
     """
     Melihat daftar buku yang sedang dipinjam oleh user saat ini.
     """
-    active_loans = [
-        loan for loan in loans_db 
-        if loan.user_id == current_user.id and loan.return_date is None
-    ]
-    
-    response = []
-    for loan in active_loans:
-        book = books_db.get(loan.book_id)
-        response.append(ActiveLoanResponse(
-            loan_id=loan.id,
-            book_id=loan.book_id,
-            book_title=book.title if book else "Buku Tidak Ditemukan",
-            borrow_date=loan.borrow_date,
-            due_date=loan.due_date,
-            extended=loan.extended
-        ))
-    return response
+    rows = []
+    for loan in store.active_loans_for_user(current_user.id):
+        book = store.get_book(loan.book_id)
+        rows.append({
+            "loan_id": loan.id,
+            "book_id": loan.book_id,
+            "book_title": book.title if book else "Buku Tidak Ditemukan",
+            "borrow_date": loan.borrow_date,
+            "due_date": loan.due_date,
+            "extended": loan.extended,
+        })
+    # Dict biasa: mode respons cepat menserialisasinya langsung, mode biasa memvalidasinya
+    # lewat response_model seperti sebelumnya
+    return json_response(rows, List[ActiveLoanRow])
+
+# Jumlah pinjaman per halaman riwayat jika `limit` tidak diisi (kecuali mode streaming)
+HISTORY_PAGE_SIZE = 100
+
+@router.get("/loans/history", response_model=List[LoanRecord])
+def get_loan_history(
+    response: Response,
+    user_id: Optional[int] = Query(None, description="Filter user (admin); mahasiswa hanya bisa melihat riwayatnya sendiri"),
+    book_id: Optional[uuid.UUID] = Query(None, description="Filter buku"),
+    loan_status: Optional[str] = Query(None, alias="status", pattern="^(active|returned)$", description="Filter status pinjaman"),
+    sort_by: str = Query(BORROW_DATE, pattern="^(borrow_date|return_date)$", description="Tanggal untuk urutan dan rentang"),
+    start_date: Optional[date] = Query(None, description="Awal rentang tanggal `sort_by` (inklusif)"),
+    end_date: Optional[date] = Query(None, description="Akhir rentang tanggal `sort_by` (inklusif)"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description=f"Jumlah maksimal pinjaman per halaman (default {HISTORY_PAGE_SIZE})"),
+    after: Optional[str] = Query(None, description="Cursor dari header X-Next-Cursor halaman sebelumnya"),
+    stream: bool = Query(False, description="Ekspor hasil sebagai NDJSON yang di-stream (tanpa batas default)"),
+    current_user: User = Depends(get_current_user),
+    store: LibraryStore = Depends(get_store),
+):
+    """
+    Riwayat pinjaman (aktif dan selesai) terurut berdasarkan tanggal pinjam atau tanggal kembali.
+    Admin bisa melihat semua pinjaman; mahasiswa hanya pinjamannya sendiri.
+    Mendukung pagination cursor (`limit`, `after`) dan ekspor NDJSON (`stream`).
+    """
+    if current_user.role != 'admin':
+        if user_id is not None and user_id != current_user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Anda hanya dapat melihat riwayat pinjaman sendiri.")
+        user_id = current_user.id
+    try:
+        cursor = HistoryCursor.parse(after) if after else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor tidak valid.")
+    query = LoanHistoryQuery(user_id=user_id, book_id=book_id, status=loan_status, sort_by=sort_by,
+                             start=start_date, end=end_date)
+
+    def fetch_page(page_cursor, size):
+        return store.loan_history(query, after=page_cursor, limit=size)
+
+    if stream:
+        return stream_ndjson(fetch_page, cursor, limit, cursor_of=query.cursor)
+    items = paginate(fetch_page, cursor, limit or HISTORY_PAGE_SIZE, response, cursor_of=query.cursor)
+    return json_response(items, List[LoanRecord], response)
 
 @router.get("/loans/active-all", response_model=List[LoanRecord], dependencies=[Depends(require_admin_role)])
-def get_all_active_loans():
+def get_all_active_loans(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Jumlah maksimal pinjaman per halaman"),
+    after: Optional[uuid.UUID] = Query(None, description="Cursor: ID pinjaman terakhir dari halaman sebelumnya"),
+    stream: bool = Query(False, description="Kirim hasil sebagai NDJSON yang di-stream"),
+    store: LibraryStore = Depends(get_store),
+):
     """
-    Melihat semua buku yang sedang dipinjam di seluruh perpustakaan. (Hanya Admin)
+    Melihat semua buku yang sedang dipinjam di seluruh perpustakaan, diurutkan berdasarkan ID pinjaman. (Hanya Admin)
+    Mendukung pagination cursor (`limit`, `after`) dan mode streaming NDJSON.
     """
-    return [loan for loan in loans_db if loan.return_date is None]
+    def fetch_page(cursor, size):
+        return store.list_active_loans(after=cursor, limit=size)
+
+    if stream:
+        return stream_ndjson(fetch_page, after, limit)
+    return json_response(paginate(fetch_page, after, limit, response), List[LoanRecord], response)
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+
+from ..data_store import users_db
+from ..dependencies import require_admin_role
+
+router = APIRouter(
+    prefix="/users",
+    tags=["Users Management (Admin)"],
+    dependencies=[Depends(require_admin_role)]
+)
+
+@router.post("/reload")
+def reload_users():
+    """
+    Memuat ulang daftar pengguna dari file tanpa me-restart aplikasi. (Hanya Admin)
+    Request lain tetap dilayani dengan data lama sampai data baru selesai dimuat.
+    """
+    try:
+        total = users_db.reload()
+    except (ValueError, OSError, KeyError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Gagal memuat ulang pengguna: {e}")
+    return {"message": "Daftar pengguna berhasil dimuat ulang.", "total_users": total}
@@ -0,0 +1,307 @@
+from dataclasses import dataclass, asdict
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import heapq
+import itertools
+import json
+import queue
+import threading
+import uuid
+
+from .clock import SystemClock, ManualClock
+from .storage.base import (
+    LibraryStore, StoreEvent,
+    LOAN_BORROWED, LOAN_RETURNED, LOAN_EXTENDED, LOAN_REVERTED, LOAN_REMOVED, EXTERNAL_CHANGE,
+)
+from .fines import LoanColumns
+
+# ==================================
+#     PENJADWAL JATUH TEMPO PINJAMAN
+# ==================================
+# Setiap pinjaman aktif punya dua entri di min-heap: pengingat "due_soon" beberapa hari
+# sebelum jatuh tempo dan "overdue" sehari setelah jatuh tempo (hari pertama denda).
+# Entri tidak pernah dihapus dari tengah heap; entri milik pinjaman yang sudah
+# dikembalikan atau diperpanjang dilewati saat keluar dari heap (pembatalan malas).
+DUE_SOON = "due_soon"
+OVERDUE = "overdue"
+
+
+@dataclass
+class DueEvent:
+    kind: str
+    loan_id: uuid.UUID
+    user_id: int
+    book_id: uuid.UUID
+    due_date: date
+    fired_on: date
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        for key in ("loan_id", "book_id", "due_date", "fired_on"):
+            data[key] = str(data[key])
+        return data
+
+
+DueEventSink = Callable[[DueEvent], None]
+
+
+# --- Sink event ---
+class LogSink:
+    def __call__(self, event: DueEvent):
+        label = "akan jatuh tempo" if event.kind == DUE_SOON else "terlambat"
+        print(f"Pinjaman {event.loan_id} milik user {event.user_id} {label} (jatuh tempo {event.due_date}).")
+
+
+class FileSink:
+    """
+    Menulis event sebagai NDJSON (satu objek per baris) di akhir file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, event: DueEvent):
+        line = json.dumps(event.to_dict()) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class QueueSink:
+    """
+    Menaruh event di `queue.Queue` untuk dikonsumsi komponen lain di proses yang sama.
+    Jika antrean penuh, event dibuang agar penjadwal tidak ikut tertahan.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.queue: "queue.Queue[DueEvent]" = queue.Queue(maxsize)
+        self.dropped = 0
+
+    def __call__(self, event: DueEvent):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+
+def create_sinks(names: Iterable[str], events_file: str = "") -> List[DueEventSink]:
+    """
+    Membuat sink dari nama di konfigurasi: "log", "file", atau "queue".
+    """
+    sinks: List[DueEventSink] = []
+    for name in names:
+        name = name.strip()
+        if name == "log":
+            sinks.append(LogSink())
+        elif name == "file":
+            if not events_file:
+                raise ValueError("Sink 'file' memerlukan LIBRARY_SCHEDULER_EVENTS_FILE.")
+            sinks.append(FileSink(events_file))
+        elif name == "queue":
+            sinks.append(QueueSink())
+        elif name:
+            raise ValueError(f"Sink penjadwal tidak dikenal: {name}")
+    return sinks
+
+
+class DueDateScheduler:
+    """
+    Menyimpan pinjaman aktif dalam min-heap berdasarkan tanggal event berikutnya.
+    Perubahan pinjaman diterima lewat listener storage, jadi borrow, extend, dan return
+    cukup O(log n) tanpa memindai seluruh riwayat pinjaman.
+    """
+
+    def __init__(self, sinks: Iterable[DueEventSink] = (), clock=None, reminder_days: int = 2):
+        self.sinks = list(sinks)
+        self.clock = clock or SystemClock()
+        self.reminder_days = reminder_days
+        # Entri heap: (ordinal hari event, nomor urut, id.int pinjaman, jenis event)
+        self._heap: List[Tuple[int, int, int, str]] = []
+        # Pinjaman yang masih dijadwalkan: id.int -> (ordinal jatuh tempo, user_id, book_id)
+        self._loans: Dict[int, Tuple[int, int, uuid.UUID]] = {}
+        # Pinjaman aktif yang event overdue-nya sudah dikirim: id.int -> ordinal jatuh tempo.
+        # Dipakai saat sinkronisasi ulang agar event yang sama tidak dikirim dua kali.
+        self._overdue_sent: Dict[int, int] = {}
+        # True jika worker lain mengubah pinjaman dan heap perlu disinkronkan dengan storage
+        self._stale = False
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._store: Optional[LibraryStore] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._loans)
+
+    def _fire_day(self, due: int, kind: str) -> int:
+        return due - self.reminder_days if kind == DUE_SOON else due + 1
+
+    # --- Penjadwalan ---
+    def _push(self, loan_id: int, due: int):
+        # Harus dipanggil saat memegang lock
+        if self.reminder_days > 0:
+            heapq.heappush(self._heap, (self._fire_day(due, DUE_SOON), next(self._counter), loan_id, DUE_SOON))
+        heapq.heappush(self._heap, (self._fire_day(due, OVERDUE), next(self._counter), loan_id, OVERDUE))
+
+    def schedule(self, loan_id: uuid.UUID, user_id: int, book_id: uuid.UUID, due_date: date):
+        """
+        Menjadwalkan (atau menjadwalkan ulang) event untuk satu pinjaman aktif.
+        """
+        due = due_date.toordinal()
+        with self._lock:
+            current = self._loans.get(loan_id.int)
+            if current is not None and current[0] == due:
+                return
+            self._loans[loan_id.int] = (due, user_id, book_id)
+            self._overdue_sent.pop(loan_id.int, None)
+            self._push(loan_id.int, due)
+            self._compact_if_needed()
+
+    def cancel(self, loan_id: uuid.UUID):
+        """
+        Membatalkan event pinjaman. Entri di heap dibiarkan dan dilewati saat keluar.
+        """
+        with self._lock:
+            self._loans.pop(loan_id.int, None)
+            self._overdue_sent.pop(loan_id.int, None)
+            self._compact_if_needed()
+
+    def _compact_if_needed(self):
+        # Entri basi yang menumpuk (pinjaman dikembalikan/diperpanjang) dibuang sesekali
+        if len(self._heap) > 4 * len(self._loans) + 1024:
+            self._heap = [entry for entry in self._heap if self._is_current(entry)]
+            heapq.heapify(self._heap)
+
+    def _is_current(self, entry: Tuple[int, int, int, str]) -> bool:
+        fire, _, loan_id, kind = entry
+        loan = self._loans.get(loan_id)
+        return loan is not None and self._fire_day(loan[0], kind) == fire
+
+    # --- Sumber data ---
+    def on_store_event(self, event: StoreEvent):
+        if event.kind == EXTERNAL_CHANGE:
+            # Disinkronkan pada `run_due` berikutnya, bukan di dalam listener
+            self._stale = True
+            return
+        loan = event.loan
+        if event.kind in (LOAN_BORROWED, LOAN_EXTENDED):
+            self.schedule(loan.id, loan.user_id, loan.book_id, loan.due_date)
+        elif event.kind in (LOAN_RETURNED, LOAN_REMOVED):
+            self.cancel(loan.id)
+        elif event.kind == LOAN_REVERTED:
+            if loan.return_date is None:
+                self.schedule(loan.id, loan.user_id, loan.book_id, loan.due_date)
+            else:
+                self.cancel(loan.id)
+
+    def attach(self, store: LibraryStore):
+        """
+        Memuat semua pinjaman aktif dari storage lalu mengikuti perubahannya.
+        Listener didaftarkan lebih dulu dan pemuatan dilakukan sambil memegang lock,
+        jadi event yang datang bersamaan diterapkan setelah data awal.
+        """
+        store.add_listener(self.on_store_event)
+        self._store = store
+        with self._lock:
+            self._loans = self._active_loans(store.active_loan_columns())
+            self._overdue_sent.clear()
+            self._stale = False
+            self._heap = []
+            for loan_id, (due, _, _) in self._loans.items():
+                if self.reminder_days > 0:
+                    self._heap.append((self._fire_day(due, DUE_SOON), next(self._counter), loan_id, DUE_SOON))
+                self._heap.append((self._fire_day(due, OVERDUE), next(self._counter), loan_id, OVERDUE))
+            heapq.heapify(self._heap)
+
+    @staticmethod
+    def _active_loans(columns: LoanColumns) -> Dict[int, Tuple[int, int, uuid.UUID]]:
+        return {
+            columns.loan_id(i).int: (due, user_id, columns.book_ids[book_code])
+            for i, (user_id, book_code, due) in enumerate(
+                zip(columns.user_id.tolist(), columns.book_code.tolist(), columns.due.tolist()))
+        }
+
+    def _sync(self):
+        """
+        Menyamakan jadwal dengan pinjaman aktif di storage setelah worker lain mengubahnya.
+        Hanya pinjaman yang hilang, baru, atau jatuh temponya berubah yang disentuh, dan
+        pinjaman yang event overdue-nya sudah dikirim tidak dijadwalkan lagi.
+        """
+        with self._lock:
+            # Dibaca sambil memegang lock, jadi event lokal yang datang bersamaan diterapkan sesudahnya
+            self._stale = False
+            active = self._active_loans(self._store.active_loan_columns())
+            for loan_id in [loan_id for loan_id in self._loans if loan_id not in active]:
+                del self._loans[loan_id]
+            for loan_id in [loan_id for loan_id in self._overdue_sent if loan_id not in active]:
+                del self._overdue_sent[loan_id]
+            for loan_id, loan in active.items():
+                current = self._loans.get(loan_id)
+                if current is not None and current[0] == loan[0]:
+                    continue
+                if current is None and self._overdue_sent.get(loan_id) == loan[0]:
+                    continue
+                self._overdue_sent.pop(loan_id, None)
+                self._loans[loan_id] = loan
+                self._push(loan_id, loan[0])
+            self._compact_if_needed()
+
+    def detach(self):
+        if self._store is not None:
+            self._store.remove_listener(self.on_store_event)
+            self._store = None
+
+    # --- Menjalankan event ---
+    def run_due(self) -> List[DueEvent]:
+        """
+        Mengeluarkan semua event yang waktunya sudah tiba menurut jam, lalu mengirimnya ke sink.
+        """
+        if self._store is not None:
+            self._store.poll_changes()
+            if self._stale:
+                self._sync()
+        today = self.clock.today()
+        today_ordinal = today.toordinal()
+        events: List[DueEvent] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= today_ordinal:
+                entry = heapq.heappop(self._heap)
+                if not self._is_current(entry):
+                    continue
+                loan_id, kind = entry[2], entry[3]
+                due, user_id, book_id = self._loans[loan_id]
+                if kind == DUE_SOON and today_ordinal > due:
+                    # Sudah lewat jatuh tempo; cukup kirim event overdue
+                    continue
+                if kind == OVERDUE:
+                    del self._loans[loan_id]
+                    self._overdue_sent[loan_id] = due
+                events.append(DueEvent(kind, uuid.UUID(int=loan_id), user_id, book_id, date.fromordinal(due), today))
+        for event in events:
+            for sink in self.sinks:
+                try:
+                    sink(event)
+                except Exception as e:
+                    print(f"Sink penjadwal gagal: {e}")
+        return events
+
+    def start(self, interval_seconds: float):
+        """
+        Menjalankan `run_due` secara berkala di thread latar belakang.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval_seconds,), name="due-scheduler", daemon=True)
+        self._thread.start()
+
+    def _loop(self, interval: float):
+        while True:
+            self.run_due()
+            if self._stop.wait(interval):
+                return
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.detach()
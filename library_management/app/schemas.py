@@ -1,6 +1,8 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
-from datetime import date
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional
+# Pydantic membutuhkan TypedDict dari typing_extensions untuk Python < 3.12
+from typing_extensions import TypedDict
+from datetime import date, datetime
 import uuid
 
 # ==================================
@@ -48,6 +50,25 @@ class Book(BookBase):
         from_attributes = True
 
 
+class BulkImportError(BaseModel):
+    """
+    Detail satu baris yang gagal diimpor.
+    """
+    line: int
+    detail: str
+
+class BulkImportResult(BaseModel):
+    """
+    Ringkasan hasil impor buku secara massal.
+    """
+    total_rows: int
+    imported: int
+    failed: int
+    dry_run: bool
+    errors: List[BulkImportError] = []
+    errors_truncated: bool = False  # True jika tidak semua error ikut dikirim
+
+
 # ==================================
 #      TRANSACTION SCHEMAS
 # ==================================
@@ -76,6 +97,18 @@ class ActiveLoanResponse(BaseModel):
     due_date: date
     extended: bool
 
+class ActiveLoanRow(TypedDict):
+    """
+    Bentuk dict dari ActiveLoanResponse untuk mode respons cepat: dict biasa diserialisasi
+    langsung tanpa membuat model per pinjaman.
+    """
+    loan_id: uuid.UUID
+    book_id: uuid.UUID
+    book_title: str
+    borrow_date: date
+    due_date: date
+    extended: bool
+
 class ReturnConfirmation(BaseModel):
     """
     Schema respons setelah buku dikembalikan.
@@ -83,3 +116,173 @@ class ReturnConfirmation(BaseModel):
     message: str
     loan_id: uuid.UUID
     fine_charged: int = 0 # Denda yang dikenakan
+
+
+# ==================================
+#      BATCH TRANSACTION SCHEMAS
+# ==================================
+class BatchOperation(BaseModel):
+    """
+    Satu operasi di dalam transaksi batch. `borrow` memerlukan `book_id`,
+    sedangkan `return` dan `extend` memerlukan `loan_id`.
+    """
+    action: Literal["borrow", "return", "extend"]
+    book_id: Optional[uuid.UUID] = None
+    loan_id: Optional[uuid.UUID] = None
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if self.action == "borrow" and self.book_id is None:
+            raise ValueError("Operasi borrow memerlukan book_id.")
+        if self.action != "borrow" and self.loan_id is None:
+            raise ValueError(f"Operasi {self.action} memerlukan loan_id.")
+        return self
+
+class BatchTransactionRequest(BaseModel):
+    """
+    Kumpulan operasi untuk satu pengguna. Jika `atomic` true, semua operasi dibatalkan
+    bila ada satu saja yang gagal.
+    """
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=50)
+    atomic: bool = False
+
+class BatchItemResult(BaseModel):
+    """
+    Hasil satu operasi batch. `status` bernilai ok, error, rolled_back, atau skipped.
+    """
+    index: int
+    action: str
+    status: Literal["ok", "error", "rolled_back", "skipped"]
+    status_code: int
+    detail: Optional[str] = None
+    loan: Optional[LoanRecord] = None
+    fine_charged: Optional[int] = None
+
+class BatchTransactionResponse(BaseModel):
+    """
+    Schema respons transaksi batch.
+    """
+    atomic: bool
+    rolled_back: bool = False
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
+
+# ==================================
+#         FINE REPORT SCHEMAS
+# ==================================
+class OverdueLoan(BaseModel):
+    """
+    Pinjaman aktif yang sudah lewat jatuh tempo beserta denda berjalannya.
+    """
+    loan_id: uuid.UUID
+    user_id: int
+    book_id: uuid.UUID
+    due_date: date
+    days_overdue: int
+    accrued_fine: int  # Denda jika dikembalikan pada tanggal laporan
+    can_extend: bool   # Masih memenuhi aturan perpanjangan
+
+class UserFineSummary(BaseModel):
+    """
+    Ringkasan denda berjalan milik satu user.
+    """
+    user_id: int
+    overdue_loans: int
+    outstanding_fine: int
+    max_days_overdue: int
+
+class FineTotals(BaseModel):
+    """
+    Total denda berjalan di seluruh perpustakaan.
+    """
+    as_of: date
+    active_loans: int
+    overdue_loans: int
+    users_with_fines: int
+    outstanding_fine: int
+    max_days_overdue: int
+
+
+# ==================================
+#       CIRCULATION STATS SCHEMAS
+# ==================================
+class BookPopularity(BaseModel):
+    """
+    Jumlah peminjaman satu buku dalam periode statistik.
+    """
+    book_id: uuid.UUID
+    title: Optional[str] = None   # Kosong jika buku sudah tidak dikenal
+    author: Optional[str] = None
+    borrows: int
+
+class AuthorPopularity(BaseModel):
+    author: str
+    borrows: int
+
+class DailyCirculation(BaseModel):
+    """
+    Jumlah peminjaman dan pengembalian pada satu hari.
+    """
+    day: date
+    borrows: int
+    returns: int
+
+
+# ==================================
+#         PROFILING SCHEMAS
+# ==================================
+class ProfileTraceInfo(BaseModel):
+    """
+    Ringkasan satu request yang diprofil. `files` berisi jenis file yang tersedia
+    (`pstats` dan/atau `collapsed`) untuk diunduh.
+    """
+    id: str
+    method: str
+    path: str
+    reasons: List[str]
+    status_code: int
+    duration_ms: float
+    started_at: float
+    files: List[str]
+
+
+# ==================================
+#      RESERVATION (HOLD) SCHEMAS
+# ==================================
+class HoldInfo(BaseModel):
+    """
+    Status reservasi satu buku milik user. `position` hanya diisi saat masih menunggu;
+    `expires_at` adalah batas waktu mengambil salinan yang disimpan (status "ready").
+    """
+    book_id: uuid.UUID
+    status: Literal["waiting", "ready", "fulfilled", "expired", "cancelled"]
+    position: Optional[int] = None
+    expires_at: Optional[datetime] = None
+
+
+# ==================================
+#        CHANGE FEED SCHEMAS
+# ==================================
+class ChangeEntry(BaseModel):
+    """
+    Satu perubahan data. `book`/`loan` berisi data terbaru untuk `upsert` dan kosong untuk `delete`.
+    """
+    seq: int
+    entity: Literal["book", "loan"]
+    op: Literal["upsert", "delete"]
+    id: uuid.UUID
+    book: Optional[Book] = None
+    loan: Optional[LoanRecord] = None
+
+class ChangeFeed(BaseModel):
+    """
+    Hasil GET /changes. Jika `resync_required` true, klien harus memuat ulang seluruh data
+    lalu melanjutkan dengan `since=next`. `epoch` berubah saat server dimulai ulang.
+    """
+    epoch: str
+    resync_required: bool
+    next: int
+    has_more: bool
+    changes: List[ChangeEntry]
@@ -0,0 +1,203 @@
+from typing import Dict, List, Optional, Tuple
+import heapq
+import re
+import threading
+import unicodedata
+import uuid
+
+from .schemas import Book
+from .sorted_index import SortedIndex
+
+# ==================================
+#     INDEKS PENCARIAN BUKU
+# ==================================
+# Inverted index sederhana: setiap token menunjuk ke buku-buku yang mengandungnya.
+# Token yang cocok di judul diberi bobot lebih tinggi daripada token di nama penulis.
+TITLE_WEIGHT = 2
+AUTHOR_WEIGHT = 1
+# Token terakhir pada query diperlakukan sebagai prefix dan diekspansi ke SEMUA token yang
+# diawalinya. Jika posting list hasil ekspansi lebih besar daripada kandidat dari token
+# utuh, kandidat itu yang disaring dengan prefix (lebih murah, hasilnya sama).
+
+_TOKEN_PATTERN = re.compile(r"[0-9a-z]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Menormalkan teks (huruf kecil, tanpa aksen) lalu memecahnya menjadi token alfanumerik.
+    """
+    if text.isascii():
+        return _TOKEN_PATTERN.findall(text.lower())
+    normalized = unicodedata.normalize("NFKD", text)
+    normalized = "".join(c for c in normalized if not unicodedata.combining(c)).lower()
+    return _TOKEN_PATTERN.findall(normalized)
+
+
+class BookSearchIndex:
+    """
+    Inverted index atas judul dan penulis buku yang diperbarui secara inkremental.
+    Buku yang berbeda bisa ditambah/diubah dari beberapa thread sekaligus (lock per buku
+    di BookCatalog), jadi perubahan index dan pembacaan posting list saat mencari
+    dilindungi satu lock.
+    """
+
+    def __init__(self):
+        # token -> { book_id: bobot }
+        self._postings: Dict[str, Dict[uuid.UUID, int]] = {}
+        # book_id -> { token: bobot }, agar penghapusan tidak perlu memindai index
+        self._doc_tokens: Dict[uuid.UUID, Dict[str, int]] = {}
+        # Daftar token terurut untuk pencarian prefix dengan bisect
+        self._sorted_tokens = SortedIndex()
+        self._titles: Dict[uuid.UUID, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+
+    def add(self, book: Book):
+        """
+        Menambahkan (atau memperbarui) satu buku ke dalam index.
+        """
+        with self._lock:
+            for token in self._index_book(book):
+                self._sorted_tokens.add(token)
+
+    def add_many(self, books: List[Book]):
+        """
+        Menambahkan banyak buku sekaligus; daftar token terurut digabung sekali di akhir.
+        """
+        with self._lock:
+            new_tokens = []
+            for book in books:
+                new_tokens.extend(self._index_book(book))
+            self._sorted_tokens.add_many(new_tokens)
+
+    def _index_book(self, book: Book) -> List[str]:
+        """
+        Mendaftarkan token buku ke posting list. Mengembalikan token yang baru pertama kali muncul.
+        Pemanggil memegang `_lock`.
+        """
+        self._remove(book.id)
+        weights: Dict[str, int] = {}
+        for token in tokenize(book.author):
+            weights[token] = max(weights.get(token, 0), AUTHOR_WEIGHT)
+        for token in tokenize(book.title):
+            weights[token] = max(weights.get(token, 0), TITLE_WEIGHT)
+
+        new_tokens = []
+        for token, weight in weights.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                new_tokens.append(token)
+            posting[book.id] = weight
+        self._doc_tokens[book.id] = weights
+        self._titles[book.id] = book.title.lower()
+        return new_tokens
+
+    def remove(self, book_id: uuid.UUID):
+        with self._lock:
+            self._remove(book_id)
+
+    def _remove(self, book_id: uuid.UUID):
+        weights = self._doc_tokens.pop(book_id, None)
+        if weights is None:
+            return
+        self._titles.pop(book_id, None)
+        for token in weights:
+            posting = self._postings[token]
+            posting.pop(book_id, None)
+            if not posting:
+                del self._postings[token]
+                self._sorted_tokens.discard(token)
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._doc_tokens.clear()
+            self._sorted_tokens.clear()
+            self._titles.clear()
+
+    def search(self, query: str, limit: Optional[int] = None, offset: int = 0) -> Tuple[int, List[Tuple[uuid.UUID, int]]]:
+        """
+        Mencari buku yang cocok dengan SEMUA token query. Token terakhir boleh cocok
+        sebagai prefix. Mengembalikan jumlah total hasil dan pasangan (book_id, skor)
+        pada halaman yang diminta, terurut dari skor tertinggi.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return 0, []
+
+        with self._lock:
+            scores = self._match(tokens)
+        if not scores:
+            return 0, []
+
+        def rank(item):
+            return (-item[1], self._titles.get(item[0], ""), item[0])
+
+        if limit is None:
+            ranked = sorted(scores.items(), key=rank)
+        else:
+            # Cukup ambil top-(offset + limit) tanpa mengurutkan semua hasil
+            ranked = heapq.nsmallest(offset + limit, scores.items(), key=rank)
+        return len(scores), ranked[offset:]
+
+    def _match(self, tokens: List[str]) -> Dict[uuid.UUID, int]:
+        """
+        Skor gabungan buku yang cocok dengan semua token, sebagai dict baru yang aman dibaca
+        setelah lock dilepas. Pemanggil memegang `_lock`.
+        """
+        prefix = tokens[-1]
+        expanded = self._sorted_tokens.with_prefix(prefix)
+        if not expanded:
+            return {}
+        candidates: List[Dict[uuid.UUID, int]] = []
+        for token in tokens[:-1]:
+            matches = self._postings.get(token)
+            if not matches:
+                return {}
+            candidates.append(matches)
+        filter_by_prefix = bool(candidates) and (
+            min(map(len, candidates)) < sum(len(self._postings[token]) for token in expanded))
+        if not filter_by_prefix:
+            candidates.append(self._prefix_matches(prefix, expanded))
+
+        # Mulai dari himpunan terkecil agar irisan secepat mungkin
+        candidates.sort(key=len)
+        scores = dict(candidates[0])
+        for matches in candidates[1:]:
+            scores = {book_id: score + matches[book_id] for book_id, score in scores.items() if book_id in matches}
+            if not scores:
+                return {}
+        if filter_by_prefix:
+            scores = self._filter_by_prefix(scores, prefix)
+        return scores
+
+    def _prefix_matches(self, prefix: str, tokens: List[str]) -> Dict[uuid.UUID, int]:
+        """
+        Menggabungkan posting dari `tokens` (semua token yang diawali `prefix`).
+        Token yang sama persis dengan prefix mendapat bonus satu poin.
+        """
+        matches: Dict[uuid.UUID, int] = {}
+        for token in tokens:
+            bonus = 1 if token == prefix else 0
+            for book_id, weight in self._postings[token].items():
+                score = weight + bonus
+                if score > matches.get(book_id, 0):
+                    matches[book_id] = score
+        return matches
+
+    def _filter_by_prefix(self, scores: Dict[uuid.UUID, int], prefix: str) -> Dict[uuid.UUID, int]:
+        """
+        Menyisakan kandidat yang punya token diawali `prefix` dan menambahkan skor token itu.
+        """
+        result: Dict[uuid.UUID, int] = {}
+        for book_id, score in scores.items():
+            best = 0
+            for token, weight in self._doc_tokens[book_id].items():
+                if token.startswith(prefix):
+                    best = max(best, weight + (1 if token == prefix else 0))
+            if best:
+                result[book_id] = score + best
+        return result
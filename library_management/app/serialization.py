@@ -0,0 +1,42 @@
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from . import config
+
+# ==================================
+#     MODE RESPONS CEPAT (OPT-IN)
+# ==================================
+# Secara default FastAPI memproses nilai yang dikembalikan endpoint lewat `response_model`:
+# model diubah ke dict, divalidasi ulang terhadap schema respons, diubah lagi lewat
+# `jsonable_encoder`, lalu di-`json.dumps`. Untuk data yang sudah berupa model yang benar
+# (hasil storage) semua itu hanya mengulang pekerjaan.
+#
+# Jika LIBRARY_FAST_RESPONSES aktif, endpoint mengembalikan `Response` berisi byte JSON dari
+# `TypeAdapter.dump_json` (serializer Rust milik pydantic-core) sehingga langkah di atas
+# dilewati. `response_model` di dekorator tetap ada, jadi schema OpenAPI tidak berubah.
+# Header yang sudah diisi endpoint pada parameter `response` (misalnya X-Next-Cursor)
+# disalin ke respons yang dikembalikan.
+
+
+@lru_cache(maxsize=None)
+def adapter_for(tp) -> TypeAdapter:
+    # Membuat TypeAdapter cukup mahal, jadi dibuat sekali per tipe
+    return TypeAdapter(tp)
+
+
+def json_response(value: Any, tp, response: Optional[Response] = None, status_code: int = 200) -> Any:
+    """
+    Mengembalikan `value` apa adanya (diproses `response_model` seperti biasa) atau, dalam
+    mode respons cepat, `Response` berisi `value` yang diserialisasi sebagai `tp`.
+    `status_code` harus sama dengan status di dekorator endpoint.
+    """
+    if not config.FAST_RESPONSES:
+        return value
+    headers = None
+    if response is not None:
+        headers = {name: v for name, v in response.headers.items() if name not in ("content-length", "content-type")}
+    return Response(adapter_for(tp).dump_json(value), status_code=status_code, headers=headers,
+                    media_type="application/json")
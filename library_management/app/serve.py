@@ -0,0 +1,32 @@
+import argparse
+import os
+
+import uvicorn
+
+# ==================================
+#      MENJALANKAN BEBERAPA WORKER
+# ==================================
+# Contoh: `python -m app.serve --workers 4 --sqlite-path library.db`
+# Setiap worker adalah proses terpisah dengan salinan aplikasi sendiri. Stok dan
+# pinjaman disimpan di SQLite (transaksi BEGIN IMMEDIATE menyerialkan penulis lintas
+# proses), sedangkan cache respons per worker dibuang lewat penghitung generasi bersama.
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Menjalankan API perpustakaan dengan beberapa worker.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--sqlite-path", default=os.getenv("LIBRARY_SQLITE_PATH", "library.db"))
+    args = parser.parse_args(argv)
+
+    # Konfigurasi dibaca dari environment saat setiap worker mengimpor aplikasi
+    os.environ["LIBRARY_WORKERS"] = str(args.workers)
+    if args.workers > 1:
+        os.environ["LIBRARY_STORAGE_BACKEND"] = "sqlite"
+    os.environ["LIBRARY_SQLITE_PATH"] = os.path.abspath(args.sqlite_path)
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
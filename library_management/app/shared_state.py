@@ -0,0 +1,68 @@
+from typing import Optional, IO
+import fcntl
+import mmap
+import os
+import struct
+
+# ==================================
+#    STATE BERSAMA ANTAR-PROSES
+# ==================================
+# Dipakai saat aplikasi berjalan dengan beberapa worker (proses). Data utama (stok,
+# pinjaman) ada di SQLite yang sudah aman dipakai banyak proses; modul ini hanya
+# menyediakan sinyal ringan agar cache per proses tahu kapan proses lain menulis data.
+
+# Isi file: epoch (acak, dibuat sekali saat file dibuat) + nomor generasi perubahan
+_LAYOUT = struct.Struct("<QQ")
+
+
+class SharedCounter:
+    """
+    Penghitung generasi perubahan di file kecil yang di-memory-map oleh semua worker.
+    Membaca nilai hanya membaca 8 byte dari memori bersama (tanpa lock dan tanpa syscall).
+    `increment` harus dipanggil dari dalam transaksi tulis SQLite, yang sudah
+    menyerialkan semua penulis lintas proses, jadi tidak perlu lock tambahan.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # Inisialisasi dilakukan di bawah flock agar hanya satu worker yang mengisi epoch
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < _LAYOUT.size:
+                    os.ftruncate(fd, _LAYOUT.size)
+                    os.pwrite(fd, _LAYOUT.pack(int.from_bytes(os.urandom(8), "little"), 0), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(fd, _LAYOUT.size)
+        finally:
+            os.close(fd)
+        self.epoch = _LAYOUT.unpack_from(self._map)[0]
+
+    @property
+    def value(self) -> int:
+        return struct.unpack_from("<Q", self._map, 8)[0]
+
+    def increment(self) -> int:
+        value = self.value + 1
+        struct.pack_into("<Q", self._map, 8, value)
+        return value
+
+    def close(self):
+        self._map.close()
+
+
+def try_acquire_leader(path: str) -> Optional[IO]:
+    """
+    Mencoba menjadi satu-satunya worker yang menjalankan tugas latar (misalnya penjadwal).
+    Mengembalikan file yang harus tetap dibuka selama tugas berjalan, atau None jika
+    worker lain sudah memegangnya. Lock dilepas otomatis oleh OS saat proses berhenti.
+    """
+    f = open(path, "a+")
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
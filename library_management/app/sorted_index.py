@@ -0,0 +1,119 @@
+from typing import Iterable, List, Optional
+import bisect
+import threading
+import uuid
+
+# ==================================
+#        INDEKS TERURUT (CURSOR)
+# ==================================
+class SortedIndex:
+    """
+    Daftar key yang selalu terurut, dipakai untuk pagination berbasis cursor (keyset)
+    dan pencarian prefix. Halaman berikutnya dicari dengan bisect dari key terakhir,
+    sehingga hasilnya tetap stabil walaupun ada data yang ditambah atau dihapus di
+    antara dua request.
+
+    `add_many` hanya menampung key baru; penggabungan (satu kali sort) dilakukan saat
+    index dibaca berikutnya, jadi impor massal tidak membayar insert O(n) per key.
+    """
+
+    def __init__(self):
+        self._keys: list = []
+        self._pending: list = []
+        # bisect + insert bukan operasi atomik, jadi dijaga lock singkat
+        self._lock = threading.Lock()
+
+    def _merge_pending(self):
+        # Harus dipanggil saat memegang lock
+        if self._pending:
+            self._keys.extend(self._pending)
+            self._pending.clear()
+            self._keys.sort()
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._pending)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            self._merge_pending()
+            i = bisect.bisect_left(self._keys, key)
+            return i < len(self._keys) and self._keys[i] == key
+
+    def add(self, key):
+        with self._lock:
+            self._merge_pending()
+            i = bisect.bisect_left(self._keys, key)
+            if i == len(self._keys) or self._keys[i] != key:
+                self._keys.insert(i, key)
+
+    def add_many(self, keys: Iterable):
+        """
+        Menambahkan banyak key baru sekaligus. Key tidak boleh sudah ada di index.
+        """
+        with self._lock:
+            self._pending.extend(keys)
+
+    def discard(self, key):
+        with self._lock:
+            self._merge_pending()
+            i = bisect.bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self._pending.clear()
+
+    def page(self, after=None, limit: Optional[int] = None) -> list:
+        """
+        Mengambil maksimal `limit` key yang lebih besar dari `after`.
+        """
+        with self._lock:
+            self._merge_pending()
+            start = 0 if after is None else bisect.bisect_right(self._keys, after)
+            end = None if limit is None else start + limit
+            return self._keys[start:end]
+
+    def starting_from(self, start_key, limit: int) -> list:
+        """
+        Mengambil maksimal `limit` key yang lebih besar atau sama dengan `start_key`.
+        """
+        with self._lock:
+            self._merge_pending()
+            start = bisect.bisect_left(self._keys, start_key)
+            return self._keys[start:start + limit]
+
+    def with_prefix(self, prefix: str) -> list:
+        """
+        Mengambil semua key string yang diawali `prefix`.
+        """
+        with self._lock:
+            self._merge_pending()
+            start = bisect.bisect_left(self._keys, prefix)
+            end = bisect.bisect_left(self._keys, prefix + "\U0010ffff", start)
+            return self._keys[start:end]
+
+
+class UUIDSortedIndex(SortedIndex):
+    """
+    SortedIndex untuk UUID. Disimpan sebagai integer agar perbandingan saat bisect
+    dan sort dilakukan di C, bukan lewat `UUID.__lt__` yang jauh lebih lambat.
+    Urutan integer sama dengan urutan UUID.
+    """
+
+    def __contains__(self, key: uuid.UUID) -> bool:
+        return super().__contains__(key.int)
+
+    def add(self, key: uuid.UUID):
+        super().add(key.int)
+
+    def add_many(self, keys: Iterable[uuid.UUID]):
+        super().add_many(key.int for key in keys)
+
+    def discard(self, key: uuid.UUID):
+        super().discard(key.int)
+
+    def page(self, after: Optional[uuid.UUID] = None, limit: Optional[int] = None) -> List[uuid.UUID]:
+        keys = super().page(None if after is None else after.int, limit)
+        return [uuid.UUID(int=key) for key in keys]
@@ -0,0 +1,56 @@
+from typing import Optional
+
+from .. import config
+from .base import (
+    LibraryStore, StoreError, BookNotFoundError, OutOfStockError, DuplicateLoanError,
+    LoanNotFoundError, LoanAlreadyReturnedError, LoanAlreadyExtendedError,
+)
+from .memory import MemoryStore
+from .journal import JournaledMemoryStore
+from .sqlite import SQLiteStore
+
+__all__ = [
+    "LibraryStore", "StoreError", "BookNotFoundError", "OutOfStockError", "DuplicateLoanError",
+    "LoanNotFoundError", "LoanAlreadyReturnedError", "LoanAlreadyExtendedError",
+    "MemoryStore", "JournaledMemoryStore", "SQLiteStore", "create_store", "get_store", "set_store",
+]
+
+_store: Optional[LibraryStore] = None
+
+
+def create_store(backend: str) -> LibraryStore:
+    """
+    Membuat storage sesuai nama backend di konfigurasi ("memory" atau "sqlite").
+    Backend "memory" memakai journal dan snapshot jika `LIBRARY_JOURNAL_DIR` diisi.
+    Backend "sqlite" mengaktifkan notifikasi perubahan antar-worker jika `LIBRARY_WORKERS` > 1.
+    """
+    if backend == "memory":
+        if config.JOURNAL_DIR:
+            return JournaledMemoryStore(
+                config.JOURNAL_DIR,
+                group_commit_ms=config.JOURNAL_GROUP_COMMIT_MS,
+                snapshot_interval_seconds=config.SNAPSHOT_INTERVAL_SECONDS,
+                lock_stripes=config.INVENTORY_LOCK_STRIPES,
+            )
+        return MemoryStore(lock_stripes=config.INVENTORY_LOCK_STRIPES)
+    if backend == "sqlite":
+        return SQLiteStore(config.SQLITE_PATH, shared=config.WORKERS > 1, change_log_size=config.CHANGE_LOG_SIZE)
+    raise ValueError(f"Storage backend tidak dikenal: {backend}")
+
+
+def get_store() -> LibraryStore:
+    """
+    Dependensi FastAPI untuk mendapatkan storage yang sedang aktif.
+    """
+    global _store
+    if _store is None:
+        _store = create_store(config.STORAGE_BACKEND)
+    return _store
+
+
+def set_store(store: Optional[LibraryStore]):
+    """
+    Mengganti storage yang aktif (misalnya saat testing). `None` berarti dibuat ulang dari konfigurasi.
+    """
+    global _store
+    _store = store
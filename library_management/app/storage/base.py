@@ -0,0 +1,280 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+import uuid
+
+from ..data_store import SEED_BOOKS
+from ..fines import LoanColumns
+from ..loan_history import LoanHistoryQuery, HistoryCursor
+from ..schemas import Book, BookCreate, LoanRecord
+
+# ==================================
+#        ERROR DARI STORAGE
+# ==================================
+# Router menerjemahkan error ini menjadi HTTPException dengan pesan yang sesuai.
+class StoreError(Exception):
+    pass
+
+class BookNotFoundError(StoreError):
+    pass
+
+class OutOfStockError(StoreError):
+    pass
+
+class DuplicateLoanError(StoreError):
+    pass
+
+class LoanNotFoundError(StoreError):
+    pass
+
+class LoanAlreadyReturnedError(StoreError):
+    pass
+
+class LoanAlreadyExtendedError(StoreError):
+    pass
+
+
+# ==================================
+#        EVENT PERUBAHAN DATA
+# ==================================
+# Jenis event yang dikirim storage ke listener setelah data berubah
+BOOK_ADDED = "book_added"
+BOOK_UPDATED = "book_updated"
+BOOK_DELETED = "book_deleted"
+LOAN_BORROWED = "loan_borrowed"
+LOAN_RETURNED = "loan_returned"
+LOAN_EXTENDED = "loan_extended"
+# Perubahan pinjaman yang dibatalkan (rollback transaksi batch); `loan` berisi state terbaru
+LOAN_REVERTED = "loan_reverted"
+LOAN_REMOVED = "loan_removed"
+# Data diubah oleh proses lain (mode multi-worker); rinciannya tidak diketahui, jadi
+# listener harus menganggap semua data bisa berubah. `book_id` bernilai None.
+EXTERNAL_CHANGE = "external_change"
+
+
+@dataclass
+class StoreEvent:
+    """
+    Event perubahan data. `book_id` selalu diisi (kecuali EXTERNAL_CHANGE);
+    `book`/`loan` diisi sesuai jenis event.
+    Untuk LOAN_REVERTED, `previous` berisi state pinjaman sebelum pembatalan.
+    """
+    kind: str
+    book_id: Optional[uuid.UUID]
+    book: Optional[Book] = None
+    loan: Optional[LoanRecord] = None
+    previous: Optional[LoanRecord] = None
+
+
+StoreListener = Callable[[StoreEvent], None]
+
+
+# ==================================
+#     FEED PERUBAHAN DI STORAGE
+# ==================================
+# Nama entitas dan operasi pada feed perubahan (lihat `changes`)
+ENTITY_BOOK = "book"
+ENTITY_LOAN = "loan"
+OP_UPSERT = "upsert"
+OP_DELETE = "delete"
+
+
+class StoredChanges(NamedTuple):
+    """
+    Hasil `LibraryStore.change_feed`. `first`/`last` adalah nomor urut tertua dan terbaru
+    yang masih disimpan (`first` = `last` + 1 jika kosong); `changes` berisi
+    (seq, entitas, operasi, id, data) dan `next` adalah nomor urut terakhir yang dibaca.
+    """
+    epoch: str
+    first: int
+    last: int
+    changes: List[Tuple[int, str, str, uuid.UUID, Optional[Union[Book, LoanRecord]]]]
+    next: int
+
+
+# ==================================
+#       INTERFACE STORAGE
+# ==================================
+class LibraryStore(ABC):
+    """
+    Interface penyimpanan data buku dan peminjaman yang dipakai oleh router.
+    Setiap operasi yang mengubah stok dan data pinjaman (borrow/return) harus atomik:
+    stok dan data pinjaman tidak boleh berbeda satu sama lain jika terjadi error.
+    """
+
+    # --- Listener ---
+    def add_listener(self, listener: StoreListener):
+        """
+        Mendaftarkan fungsi yang dipanggil setiap kali data berubah. Listener dipanggil
+        secara sinkron (bisa di dalam lock), jadi harus cepat dan tidak boleh memanggil
+        operasi tulis storage.
+        """
+        if "_listeners" not in self.__dict__:
+            self._listeners: List[StoreListener] = []
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: StoreListener):
+        listeners = self.__dict__.get("_listeners", [])
+        if listener in listeners:
+            listeners.remove(listener)
+
+    def _emit(self, event: StoreEvent):
+        for listener in self.__dict__.get("_listeners", ()):
+            listener(event)
+
+    def poll_changes(self) -> bool:
+        """
+        Memeriksa apakah proses lain mengubah data sejak pemeriksaan terakhir. Jika ya,
+        listener menerima event EXTERNAL_CHANGE dan hasilnya True. Dipanggil oleh
+        komponen yang menyimpan cache per proses sebelum memakai cache-nya.
+        Default: storage hanya dipakai satu proses, jadi tidak pernah ada perubahan luar.
+        """
+        return False
+
+    def change_feed(self, after: int, limit: int) -> Optional[StoredChanges]:
+        """
+        Perubahan setelah nomor urut `after` (paling banyak `limit`) yang dicatat storage
+        sendiri, sehingga sama untuk semua worker. Default None: storage tidak mencatatnya,
+        dan `changes.ChangeLog` memakai change log di memori proses.
+        """
+        return None
+
+    # --- Buku ---
+    @abstractmethod
+    def get_book(self, book_id: uuid.UUID) -> Optional[Book]:
+        ...
+
+    @abstractmethod
+    def list_books(self, after: Optional[uuid.UUID] = None, limit: Optional[int] = None,
+                   available_only: bool = False) -> List[Book]:
+        """
+        Mengambil buku terurut berdasarkan ID, setelah cursor `after`.
+        """
+
+    @abstractmethod
+    def search_books(self, query: str, limit: int, offset: int = 0) -> Tuple[int, List[Book]]:
+        """
+        Mencari buku berdasarkan judul/penulis. Mengembalikan (jumlah total, satu halaman hasil).
+        """
+
+    @abstractmethod
+    def count_books(self) -> int:
+        ...
+
+    @abstractmethod
+    def add_book(self, book_data: BookCreate) -> Book:
+        ...
+
+    def add_books(self, books_data: List[BookCreate]) -> List[Book]:
+        """
+        Menambahkan banyak buku sekaligus (untuk impor massal).
+        Backend sebaiknya meng-override ini agar tidak membayar biaya per buku.
+        """
+        return [self.add_book(book_data) for book_data in books_data]
+
+    @abstractmethod
+    def update_book(self, book_id: uuid.UUID, changes: dict) -> Book:
+        """
+        Memperbarui field buku. Melempar BookNotFoundError jika buku tidak ada.
+        """
+
+    @abstractmethod
+    def delete_book(self, book_id: uuid.UUID):
+        """
+        Menghapus buku. Melempar BookNotFoundError jika buku tidak ada.
+        """
+
+    # --- Peminjaman ---
+    @abstractmethod
+    def get_loan(self, loan_id: uuid.UUID) -> Optional[LoanRecord]:
+        ...
+
+    @abstractmethod
+    def borrow(self, user_id: int, book_id: uuid.UUID, borrow_date: date, due_date: date) -> LoanRecord:
+        """
+        Mengurangi stok dan mencatat pinjaman baru dalam satu transaksi.
+        Melempar BookNotFoundError, OutOfStockError, atau DuplicateLoanError.
+        """
+
+    @abstractmethod
+    def return_loan(self, loan_id: uuid.UUID, return_date: date,
+                    compute_fine: Callable[[LoanRecord], int]) -> LoanRecord:
+        """
+        Menandai pinjaman selesai dan mengembalikan stok dalam satu transaksi.
+        Denda dihitung oleh `compute_fine` dari data pinjaman di dalam transaksi.
+        Melempar LoanNotFoundError atau LoanAlreadyReturnedError.
+        """
+
+    @abstractmethod
+    def extend_loan(self, loan_id: uuid.UUID, new_due_date: date) -> LoanRecord:
+        """
+        Menyimpan perpanjangan masa pinjam.
+        Melempar LoanNotFoundError, LoanAlreadyReturnedError, atau LoanAlreadyExtendedError.
+        """
+
+    @abstractmethod
+    def active_loans_for_user(self, user_id: int) -> List[LoanRecord]:
+        ...
+
+    @abstractmethod
+    def list_active_loans(self, after: Optional[uuid.UUID] = None, limit: Optional[int] = None) -> List[LoanRecord]:
+        """
+        Mengambil pinjaman aktif terurut berdasarkan ID pinjaman, setelah cursor `after`.
+        """
+
+    @abstractmethod
+    def loan_history(self, query: LoanHistoryQuery, after: Optional[HistoryCursor] = None,
+                     limit: Optional[int] = None) -> List[LoanRecord]:
+        """
+        Mengambil riwayat pinjaman (aktif dan selesai) sesuai filter `query`, terurut
+        berdasarkan tanggal `query.sort_by`, setelah cursor `after`. Backend harus memakai
+        indeks tanggal sehingga biayanya sebanding dengan jumlah hasil, bukan jumlah pinjaman.
+        """
+
+    @abstractmethod
+    def loan_counts(self) -> Tuple[int, int]:
+        """
+        Jumlah seluruh pinjaman dan jumlah pinjaman aktif: (total, aktif).
+        """
+
+    def active_loan_columns(self) -> LoanColumns:
+        """
+        Semua pinjaman aktif sebagai kolom NumPy, untuk perhitungan denda massal.
+        Backend sebaiknya meng-override ini agar tidak membuat LoanRecord per pinjaman.
+        """
+        return LoanColumns.from_records(self.list_active_loans())
+
+    # --- Transaksi ---
+    @abstractmethod
+    @contextmanager
+    def atomic(self, book_ids: Iterable[uuid.UUID] = ()) -> Iterator[None]:
+        """
+        Menjalankan beberapa operasi sebagai satu kesatuan: jika blok melempar error,
+        semua perubahan di dalamnya dibatalkan. `book_ids` adalah buku yang akan
+        disentuh, agar backend bisa menguncinya selama blok berjalan.
+        """
+
+    @abstractmethod
+    def on_rollback(self, undo: Callable[[], None]):
+        """
+        Mendaftarkan aksi pembatalan untuk state di luar storage (misalnya antrean hold)
+        yang diubah di dalam `atomic`: aksi dijalankan jika transaksi terluar dibatalkan.
+        Di luar transaksi tidak ada efeknya.
+        """
+
+    # --- Siklus hidup ---
+    def seed_initial_data(self):
+        """
+        Mengisi data awal jika storage masih kosong.
+        """
+        # Dicek di dalam transaksi agar beberapa worker yang start bersamaan tidak ikut mengisi
+        with self.atomic():
+            if self.count_books() == 0:
+                for title, author, stock in SEED_BOOKS:
+                    self.add_book(BookCreate(title=title, author=author, stock=stock))
+                print("Initial book data has been seeded.")
+
+    def close(self):
+        pass
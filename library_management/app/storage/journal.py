@@ -0,0 +1,461 @@
+from contextlib import contextmanager
+from datetime import date
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+
+from ..schemas import Book, BookCreate, LoanRecord
+from ..data_store import BookCatalog, LoanRepository
+from .base import StoreEvent, BOOK_ADDED, BOOK_UPDATED, BOOK_DELETED, LOAN_REMOVED
+from ..inventory import DEFAULT_STRIPES
+from .memory import MemoryStore
+
+# ==================================
+#        FORMAT BINER JOURNAL
+# ==================================
+# Setiap record journal: [panjang payload u32][crc32 payload u32][payload].
+# Payload diawali 1 byte kode operasi. Semua nilai bersifat absolut (bukan delta),
+# sehingga record yang sudah tercakup di snapshot aman untuk diputar ulang.
+FRAME_HEADER = struct.Struct("<II")
+BOOK_HEADER = struct.Struct("<16siHH")            # id, stock, panjang judul, panjang penulis
+LOAN_STRUCT = struct.Struct("<16sq16siii?iqi")    # ... + stok buku setelah operasi (-1 jika buku tidak ada)
+BOOK_ID = struct.Struct("<16s")
+
+OP_BOOK_PUT = 1
+OP_BOOK_DELETE = 2
+OP_LOAN_PUT = 3
+OP_LOAN_DELETE = 4
+
+SNAPSHOT_MAGIC = b"LIBSNAP1"
+SNAPSHOT_HEADER = struct.Struct("<8sQQQ")          # magic, segmen journal awal, jumlah buku, jumlah pinjaman
+SNAPSHOT_FILE = "snapshot.bin"
+_SEGMENT_PATTERN = re.compile(r"^journal\.(\d+)\.bin$")
+
+
+def encode_book(book: Book) -> bytes:
+    title = book.title.encode("utf-8")
+    author = book.author.encode("utf-8")
+    return BOOK_HEADER.pack(book.id.bytes, book.stock, len(title), len(author)) + title + author
+
+
+def decode_book(buf, offset: int) -> Tuple[Book, int]:
+    raw_id, stock, title_len, author_len = BOOK_HEADER.unpack_from(buf, offset)
+    offset += BOOK_HEADER.size
+    title = bytes(buf[offset:offset + title_len]).decode("utf-8")
+    offset += title_len
+    author = bytes(buf[offset:offset + author_len]).decode("utf-8")
+    offset += author_len
+    book = Book.model_construct(id=uuid.UUID(bytes=raw_id), title=title, author=author, stock=stock)
+    return book, offset
+
+
+def encode_loan(loan: LoanRecord, book_stock: int = -1) -> bytes:
+    return LOAN_STRUCT.pack(
+        loan.id.bytes, loan.user_id, loan.book_id.bytes,
+        loan.borrow_date.toordinal(), loan.due_date.toordinal(),
+        loan.return_date.toordinal() if loan.return_date else 0,
+        loan.extended, loan.initial_borrow_date.toordinal(), loan.fine, book_stock,
+    )
+
+
+# Banyak pinjaman memakai buku dan tanggal yang sama; cache menghemat alokasi saat pemulihan
+_book_uuid = lru_cache(maxsize=65536)(lambda raw: uuid.UUID(bytes=raw))
+_from_ordinal = lru_cache(maxsize=65536)(date.fromordinal)
+
+
+def decode_loan(buf, offset: int) -> Tuple[LoanRecord, int, int]:
+    (raw_id, user_id, raw_book_id, borrow, due, returned,
+     extended, initial, fine, book_stock) = LOAN_STRUCT.unpack_from(buf, offset)
+    loan = LoanRecord.model_construct(
+        id=uuid.UUID(bytes=raw_id),
+        user_id=user_id,
+        book_id=_book_uuid(raw_book_id),
+        borrow_date=_from_ordinal(borrow),
+        due_date=_from_ordinal(due),
+        return_date=_from_ordinal(returned) if returned else None,
+        extended=extended,
+        initial_borrow_date=_from_ordinal(initial),
+        fine=fine,
+    )
+    return loan, book_stock, offset + LOAN_STRUCT.size
+
+
+def _frame(payload: bytes) -> bytes:
+    return FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+# ==================================
+#       JOURNAL (GROUP COMMIT)
+# ==================================
+class JournalWriteError(OSError):
+    """
+    Journal gagal ditulis atau di-fsync, jadi perubahan yang ditunggu tidak tahan restart.
+    """
+
+
+class Journal:
+    """
+    File journal append-only yang dibagi per segmen (`journal.<n>.bin`).
+    Record ditampung di buffer lalu ditulis dan di-fsync oleh satu thread latar
+    belakang. Banyak request yang menulis bersamaan cukup menunggu satu fsync yang
+    sama (group commit).
+
+    Jika penulisan gagal (misalnya disk penuh), isi file tidak lagi bisa dipercaya:
+    journal ditandai rusak (`error`), semua penunggu dan penulisan berikutnya mendapat
+    JournalWriteError, dan record tidak ditulis lagi sampai aplikasi di-restart.
+    """
+
+    def __init__(self, directory: str, segment: int, group_commit_ms: float = 2.0):
+        self.directory = directory
+        self.segment = segment
+        self.group_commit_seconds = group_commit_ms / 1000
+        self._file = open(self._segment_path(segment), "ab")
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._buffer = bytearray()
+        self._appended_seq = 0
+        self._durable_seq = 0
+        self._closed = False
+        self.error: Optional[OSError] = None
+        self._flusher = threading.Thread(target=self._flush_loop, name="journal-flusher", daemon=True)
+        self._flusher.start()
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"journal.{segment}.bin")
+
+    def append(self, payload: bytes) -> int:
+        """
+        Menambahkan satu record ke buffer. Mengembalikan nomor urut record untuk `wait`.
+        """
+        frame = _frame(payload)
+        with self._cond:
+            self._buffer += frame
+            self._appended_seq += 1
+            self._cond.notify_all()
+            return self._appended_seq
+
+    def wait(self, seq: int):
+        """
+        Menunggu sampai record dengan nomor urut `seq` sudah di-fsync ke disk.
+        Melempar JournalWriteError jika journal gagal ditulis sebelum itu.
+        """
+        with self._cond:
+            while self._durable_seq < seq and self.error is None and not self._closed:
+                self._cond.wait()
+            if self._durable_seq < seq and self.error is not None:
+                raise JournalWriteError(f"Journal gagal ditulis: {self.error}") from self.error
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._buffer:
+                    return
+            # Beri kesempatan request lain menumpang pada fsync yang sama
+            if self.group_commit_seconds:
+                time.sleep(self.group_commit_seconds)
+            try:
+                self.flush()
+            except OSError as e:
+                # Penunggu sudah dibangunkan dengan error; thread tetap hidup agar record
+                # berikutnya juga langsung gagal, bukan menunggu selamanya
+                print(f"Journal gagal ditulis: {e}")
+
+    def flush(self):
+        with self._io_lock:
+            with self._cond:
+                data = bytes(self._buffer)
+                self._buffer.clear()
+                seq = self._appended_seq
+            if data and self.error is None:
+                self._write(self._file, data)
+            self._mark_durable(seq)
+
+    def _write(self, file, data: bytes):
+        # Dipanggil saat memegang `_io_lock`
+        try:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        except OSError as e:
+            with self._cond:
+                self.error = e
+                self._cond.notify_all()
+            raise
+
+    def _mark_durable(self, seq: int):
+        with self._cond:
+            if self.error is None:
+                self._durable_seq = max(self._durable_seq, seq)
+            self._cond.notify_all()
+
+    def rotate(self) -> int:
+        """
+        Menutup segmen aktif dan mulai menulis ke segmen baru. Mengembalikan nomor segmen baru.
+        """
+        with self._io_lock:
+            # Dibuka sebelum buffer diambil, agar kegagalan di sini tidak menghilangkan record
+            new_file = open(self._segment_path(self.segment + 1), "ab")
+            with self._cond:
+                data = bytes(self._buffer)
+                self._buffer.clear()
+                seq = self._appended_seq
+                self.segment += 1
+                old_file, self._file = self._file, new_file
+            try:
+                if self.error is None:
+                    self._write(old_file, data)
+            finally:
+                old_file.close()
+            self._mark_durable(seq)
+            return self.segment
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        self.flush()
+        self._file.close()
+
+
+def list_segments(directory: str) -> List[int]:
+    segments = []
+    for name in os.listdir(directory):
+        match = _SEGMENT_PATTERN.match(name)
+        if match:
+            segments.append(int(match.group(1)))
+    return sorted(segments)
+
+
+def iter_frames(buf):
+    """
+    Membaca record dari isi satu segmen. Berhenti di record terakhir yang utuh;
+    sisa yang rusak (misalnya karena crash saat menulis) diabaikan.
+    """
+    offset = 0
+    end = len(buf)
+    while offset + FRAME_HEADER.size <= end:
+        length, crc = FRAME_HEADER.unpack_from(buf, offset)
+        start = offset + FRAME_HEADER.size
+        if start + length > end:
+            return
+        payload = buf[start:start + length]
+        if zlib.crc32(payload) != crc:
+            return
+        yield payload
+        offset = start + length
+
+
+# ==================================
+#    STORAGE IN-MEMORY + JOURNAL
+# ==================================
+class JournaledMemoryStore(MemoryStore):
+    """
+    Storage in-memory yang mencatat setiap perubahan ke journal dan menulis snapshot
+    berkala. Saat startup, snapshot terakhir dimuat (lewat mmap) lalu hanya segmen
+    journal setelah snapshot yang diputar ulang.
+    """
+
+    def __init__(self, directory: str, books: Optional[BookCatalog] = None, loans: Optional[LoanRepository] = None,
+                 group_commit_ms: float = 2.0, snapshot_interval_seconds: float = 0,
+                 lock_stripes: int = DEFAULT_STRIPES):
+        super().__init__(books=books, loans=loans, lock_stripes=lock_stripes)
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        # Nomor urut record journal terakhir milik thread ini, untuk ditunggu fsync-nya
+        self._pending = threading.local()
+        next_segment = self.recover()
+        self.journal = Journal(directory, next_segment, group_commit_ms)
+
+        self._stop_snapshots = threading.Event()
+        self._snapshotter = None
+        if snapshot_interval_seconds > 0:
+            self._snapshotter = threading.Thread(
+                target=self._snapshot_loop, args=(snapshot_interval_seconds,), name="snapshotter", daemon=True
+            )
+            self._snapshotter.start()
+
+    # --- Pemulihan ---
+    def recover(self) -> int:
+        """
+        Memulihkan state dari snapshot dan journal. Mengembalikan nomor segmen journal berikutnya.
+        """
+        self.books.clear()
+        self.loans.clear()
+        first_segment = self._load_snapshot()
+        segments = [s for s in list_segments(self.directory) if s >= first_segment]
+        for segment in segments:
+            path = os.path.join(self.directory, f"journal.{segment}.bin")
+            with open(path, "rb") as f:
+                data = f.read()
+            for payload in iter_frames(memoryview(data)):
+                self._apply(payload)
+        # Selalu mulai segmen baru agar tidak menulis setelah ekor yang mungkin rusak
+        return max(segments + [first_segment - 1]) + 1
+
+    def _load_snapshot(self) -> int:
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if not os.path.exists(path) or os.path.getsize(path) < SNAPSHOT_HEADER.size:
+            return 0
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            magic, segment, book_count, loan_count = SNAPSHOT_HEADER.unpack_from(buf, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"File snapshot tidak valid: {path}")
+            offset = SNAPSHOT_HEADER.size
+            for _ in range(book_count):
+                book, offset = decode_book(buf, offset)
+                self.books[book.id] = book
+            loans = memoryview(buf)[offset:offset + loan_count * LOAN_STRUCT.size]
+            try:
+                self.loans.load_fields(
+                    (int.from_bytes(raw_id, "big"), user_id, _book_uuid(raw_book_id),
+                     borrow, due, returned, extended, initial, fine)
+                    for (raw_id, user_id, raw_book_id, borrow, due, returned,
+                         extended, initial, fine, _) in LOAN_STRUCT.iter_unpack(loans)
+                )
+            finally:
+                loans.release()
+        return segment
+
+    def _apply(self, payload):
+        op = payload[0]
+        if op == OP_BOOK_PUT:
+            book, _ = decode_book(payload, 1)
+            self.books[book.id] = book
+        elif op == OP_BOOK_DELETE:
+            book_id = uuid.UUID(bytes=bytes(payload[1:17]))
+            self.books.pop(book_id, None)
+        elif op == OP_LOAN_PUT:
+            loan, book_stock, _ = decode_loan(payload, 1)
+            self.loans.restore(loan)
+            self._restore_stock(loan.book_id, book_stock)
+        elif op == OP_LOAN_DELETE:
+            loan, book_stock, _ = decode_loan(payload, 1)
+            self.loans.remove(loan.id)
+            self._restore_stock(loan.book_id, book_stock)
+
+    def _restore_stock(self, book_id: uuid.UUID, book_stock: int):
+        book = self.books.get(book_id)
+        if book is not None and book_stock >= 0:
+            book.stock = book_stock
+            self.books.refresh_stock(book_id)
+
+    # --- Snapshot ---
+    def snapshot(self):
+        """
+        Menulis seluruh state ke snapshot baru lalu menghapus segmen journal lama.
+        Perubahan selalu diterapkan ke memori sebelum record-nya masuk journal, jadi
+        record yang masih di segmen lama pasti sudah terlihat di state yang diambil
+        setelah rotasi; sisanya ada di segmen baru dan akan diputar ulang di atas
+        snapshot ini. Karena itu snapshot tidak perlu menghentikan request lain.
+        """
+        segment = self.journal.rotate()
+        books = list(self.books.values())
+        loans = self.loans.dump_fields()
+
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, segment, len(books), len(loans)))
+            for book in books:
+                f.write(encode_book(book))
+            for loan_id, user_id, book_id, borrow, due, returned, extended, initial, fine in loans:
+                f.write(LOAN_STRUCT.pack(loan_id.to_bytes(16, "big"), user_id, book_id.bytes,
+                                         borrow, due, returned, extended, initial, fine, -1))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        for old_segment in list_segments(self.directory):
+            if old_segment < segment:
+                os.remove(os.path.join(self.directory, f"journal.{old_segment}.bin"))
+
+    def _snapshot_loop(self, interval: float):
+        while not self._stop_snapshots.wait(interval):
+            try:
+                self.snapshot()
+            except OSError as e:
+                print(f"Snapshot gagal: {e}")
+
+    # --- Operasi yang dicatat ke journal ---
+    # Hook dipanggil MemoryStore di dalam lock buku, sehingga urutan record untuk satu
+    # buku sama dengan urutan perubahannya. Menunggu fsync dilakukan setelah lock dilepas.
+    def _log(self, payload: bytes):
+        self._pending.seq = self.journal.append(payload)
+
+    def _wait_durable(self):
+        seq = getattr(self._pending, "seq", 0)
+        self._pending.seq = 0
+        if seq:
+            self.journal.wait(seq)
+
+    def _on_change(self, event: StoreEvent):
+        if event.kind in (BOOK_ADDED, BOOK_UPDATED):
+            self._log(bytes([OP_BOOK_PUT]) + encode_book(event.book))
+        elif event.kind == BOOK_DELETED:
+            self._log(bytes([OP_BOOK_DELETE]) + BOOK_ID.pack(event.book_id.bytes))
+        else:
+            book = self.books.get(event.book_id)
+            op = OP_LOAN_DELETE if event.kind == LOAN_REMOVED else OP_LOAN_PUT
+            self._log(bytes([op]) + encode_loan(event.loan, book.stock if book else -1))
+        super()._on_change(event)
+
+    @contextmanager
+    def atomic(self, book_ids: Iterable[uuid.UUID] = ()) -> Iterator[None]:
+        try:
+            with super().atomic(book_ids):
+                yield
+        finally:
+            # Record pembatalan (jika ada) juga harus sudah aman di disk
+            self._wait_durable()
+
+    def add_book(self, book_data: BookCreate) -> Book:
+        book = super().add_book(book_data)
+        self._wait_durable()
+        return book
+
+    def add_books(self, books_data: List[BookCreate]) -> List[Book]:
+        # Journal ditulis berurutan, jadi cukup menunggu record terakhir di-fsync
+        books = super().add_books(books_data)
+        self._wait_durable()
+        return books
+
+    def update_book(self, book_id: uuid.UUID, changes: dict) -> Book:
+        book = super().update_book(book_id, changes)
+        self._wait_durable()
+        return book
+
+    def delete_book(self, book_id: uuid.UUID):
+        super().delete_book(book_id)
+        self._wait_durable()
+
+    def borrow(self, user_id: int, book_id: uuid.UUID, borrow_date: date, due_date: date) -> LoanRecord:
+        loan = super().borrow(user_id, book_id, borrow_date, due_date)
+        self._wait_durable()
+        return loan
+
+    def return_loan(self, loan_id: uuid.UUID, return_date: date,
+                    compute_fine: Callable[[LoanRecord], int]) -> LoanRecord:
+        loan = super().return_loan(loan_id, return_date, compute_fine)
+        self._wait_durable()
+        return loan
+
+    def extend_loan(self, loan_id: uuid.UUID, new_due_date: date) -> LoanRecord:
+        loan = super().extend_loan(loan_id, new_due_date)
+        self._wait_durable()
+        return loan
+
+    def close(self):
+        self._stop_snapshots.set()
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+        self.journal.close()
@@ -0,0 +1,240 @@
+from contextlib import contextmanager
+from datetime import date
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+import threading
+import uuid
+
+from .. import data_store
+from ..data_store import BookCatalog, LoanRepository
+from ..fines import LoanColumns
+from ..inventory import Inventory, DEFAULT_STRIPES
+from ..loan_history import LoanHistoryQuery, HistoryCursor
+from ..metrics import metrics, LOAN_LOOKUP_LATENCY
+from ..schemas import Book, BookCreate, LoanRecord
+from .base import (
+    StoreEvent, BOOK_ADDED, BOOK_UPDATED, BOOK_DELETED,
+    LOAN_BORROWED, LOAN_RETURNED, LOAN_EXTENDED, LOAN_REVERTED, LOAN_REMOVED,
+    LibraryStore, BookNotFoundError, OutOfStockError, DuplicateLoanError,
+    LoanNotFoundError, LoanAlreadyReturnedError, LoanAlreadyExtendedError,
+)
+
+
+class MemoryStore(LibraryStore):
+    """
+    Storage in-memory yang memakai `books_db` dan `loans_db` dari `data_store`.
+    Cepat, tetapi semua data hilang saat aplikasi di-restart.
+    Perubahan yang menyangkut satu buku (stok, pinjaman buku tersebut) dikunci
+    dengan lock bergaris milik buku itu lewat `Inventory`.
+    """
+
+    def __init__(self, books: Optional[BookCatalog] = None, loans: Optional[LoanRepository] = None,
+                 lock_stripes: int = DEFAULT_STRIPES):
+        self.books = data_store.books_db if books is None else books
+        self.loans = data_store.loans_db if loans is None else loans
+        self.inventory = Inventory(self.books, lock_stripes)
+        # Daftar aksi pembatalan milik transaksi `atomic` yang sedang berjalan di thread ini
+        self._undo = threading.local()
+
+    # --- Hook perubahan ---
+    # Dipanggil di dalam lock buku setelah data berubah, sehingga urutan event untuk
+    # satu buku sama dengan urutan perubahannya. Subclass (misalnya storage dengan
+    # journal) bisa meng-override hook ini.
+    def _on_change(self, event: StoreEvent):
+        self._emit(event)
+
+    # --- Transaksi ---
+    @contextmanager
+    def atomic(self, book_ids: Iterable[uuid.UUID] = ()) -> Iterator[None]:
+        if getattr(self._undo, "log", None) is not None:
+            # Transaksi bertingkat ikut transaksi terluar
+            yield
+            return
+        with self.inventory.lock_many(book_ids):
+            self._undo.log = []
+            try:
+                yield
+            except BaseException:
+                log, self._undo.log = self._undo.log, None
+                for undo in reversed(log):
+                    undo()
+                raise
+            self._undo.log = None
+
+    def on_rollback(self, undo: Callable[[], None]):
+        self._push_undo(undo)
+
+    def _push_undo(self, undo: Callable[[], None]):
+        log = getattr(self._undo, "log", None)
+        if log is not None:
+            log.append(undo)
+
+    def _undo_borrow(self, loan: LoanRecord):
+        with self.inventory.lock(loan.book_id):
+            self.loans.remove(loan.id)
+            self.inventory.release(loan.book_id)
+            self._on_change(StoreEvent(LOAN_REMOVED, loan.book_id, loan=loan))
+
+    def _undo_return(self, loan: LoanRecord):
+        with self.inventory.lock(loan.book_id):
+            restored = self.loans.unmark_returned(loan.id)
+            if loan.book_id in self.books:
+                self.books.adjust_stock(loan.book_id, -1)
+            self._on_change(StoreEvent(LOAN_REVERTED, loan.book_id, loan=restored, previous=loan))
+
+    def _undo_extend(self, loan: LoanRecord, previous_due_date: date):
+        with self.inventory.lock(loan.book_id):
+            restored = self.loans.unmark_extended(loan.id, previous_due_date)
+            self._on_change(StoreEvent(LOAN_REVERTED, loan.book_id, loan=restored, previous=loan))
+
+    def _undo_update(self, book_id: uuid.UUID, previous: dict):
+        with self.inventory.lock(book_id):
+            book = self.books.get(book_id)
+            if book is None:
+                return
+            for key, value in previous.items():
+                setattr(book, key, value)
+            self.books[book_id] = book
+            self._on_change(StoreEvent(BOOK_UPDATED, book_id, book=book))
+
+    # --- Buku ---
+    def get_book(self, book_id: uuid.UUID) -> Optional[Book]:
+        return self.books.get(book_id)
+
+    def list_books(self, after: Optional[uuid.UUID] = None, limit: Optional[int] = None,
+                   available_only: bool = False) -> List[Book]:
+        return self.books.page(after=after, limit=limit, available_only=available_only)
+
+    def search_books(self, query: str, limit: int, offset: int = 0) -> Tuple[int, List[Book]]:
+        total, ranked = self.books.search_index.search(query, limit=limit, offset=offset)
+        books = [self.books.get(book_id) for book_id, _ in ranked]
+        return total, [book for book in books if book is not None]
+
+    def count_books(self) -> int:
+        return len(self.books)
+
+    def add_book(self, book_data: BookCreate) -> Book:
+        new_id = uuid.uuid4()
+        # Pastikan tidak ada duplikat ID, meskipun kemungkinannya sangat kecil
+        while new_id in self.books:
+            new_id = uuid.uuid4()
+
+        new_book = Book(id=new_id, title=book_data.title, author=book_data.author, stock=book_data.stock)
+        with self.inventory.lock(new_id):
+            self.books[new_id] = new_book
+            self._on_change(StoreEvent(BOOK_ADDED, new_id, book=new_book))
+        return new_book
+
+    def add_books(self, books_data: List[BookCreate]) -> List[Book]:
+        # Buku baru belum bisa diakses request lain, jadi tidak perlu lock per buku
+        new_books = [
+            Book(id=uuid.uuid4(), title=book_data.title, author=book_data.author, stock=book_data.stock)
+            for book_data in books_data
+        ]
+        self.books.add_new(new_books)
+        for book in new_books:
+            self._on_change(StoreEvent(BOOK_ADDED, book.id, book=book))
+        return new_books
+
+    def update_book(self, book_id: uuid.UUID, changes: dict) -> Book:
+        with self.inventory.lock(book_id):
+            book = self.books.get(book_id)
+            if not book:
+                raise BookNotFoundError(book_id)
+            previous = {key: getattr(book, key) for key in changes}
+            for key, value in changes.items():
+                setattr(book, key, value)
+            # Simpan ulang agar indeks stok dan pencarian ikut diperbarui
+            self.books[book_id] = book
+            self._on_change(StoreEvent(BOOK_UPDATED, book_id, book=book))
+        self._push_undo(lambda: self._undo_update(book_id, previous))
+        return book
+
+    def delete_book(self, book_id: uuid.UUID):
+        with self.inventory.lock(book_id):
+            if book_id not in self.books:
+                raise BookNotFoundError(book_id)
+            del self.books[book_id]
+            self._on_change(StoreEvent(BOOK_DELETED, book_id))
+
+    # --- Peminjaman ---
+    @metrics.timed(LOAN_LOOKUP_LATENCY, "get_loan")
+    def get_loan(self, loan_id: uuid.UUID) -> Optional[LoanRecord]:
+        return self.loans.get(loan_id)
+
+    def borrow(self, user_id: int, book_id: uuid.UUID, borrow_date: date, due_date: date) -> LoanRecord:
+        # Cek pinjaman ganda dan pengurangan stok harus atomik untuk buku yang sama
+        with self.inventory.lock(book_id):
+            book = self.books.get(book_id)
+            if not book:
+                raise BookNotFoundError(book_id)
+            if book.stock <= 0:
+                raise OutOfStockError(book_id)
+            if self.loans.find_active(user_id, book_id):
+                raise DuplicateLoanError(book_id)
+            self.inventory.reserve(book_id)
+
+            new_loan = LoanRecord(
+                id=uuid.uuid4(),
+                user_id=user_id,
+                book_id=book_id,
+                borrow_date=borrow_date,
+                due_date=due_date,
+                initial_borrow_date=borrow_date,  # Set tanggal pinjam awal
+            )
+            self.loans.append(new_loan)
+            self._on_change(StoreEvent(LOAN_BORROWED, book_id, loan=new_loan))
+        self._push_undo(lambda: self._undo_borrow(new_loan))
+        return new_loan
+
+    def return_loan(self, loan_id: uuid.UUID, return_date: date,
+                    compute_fine: Callable[[LoanRecord], int]) -> LoanRecord:
+        loan = self.loans.get(loan_id)
+        if not loan:
+            raise LoanNotFoundError(loan_id)
+
+        with self.inventory.lock(loan.book_id):
+            # Dibaca ulang di dalam lock agar pengembalian ganda tidak menambah stok dua kali
+            loan = self.loans.get(loan_id)
+            if loan.return_date is not None:
+                raise LoanAlreadyReturnedError(loan_id)
+            loan = self.loans.mark_returned(loan_id, return_date, compute_fine(loan))
+            self.inventory.release(loan.book_id)
+            self._on_change(StoreEvent(LOAN_RETURNED, loan.book_id, loan=loan))
+        self._push_undo(lambda: self._undo_return(loan))
+        return loan
+
+    def extend_loan(self, loan_id: uuid.UUID, new_due_date: date) -> LoanRecord:
+        loan = self.loans.get(loan_id)
+        if not loan:
+            raise LoanNotFoundError(loan_id)
+
+        with self.inventory.lock(loan.book_id):
+            loan = self.loans.get(loan_id)
+            if loan.return_date is not None:
+                raise LoanAlreadyReturnedError(loan_id)
+            if loan.extended:
+                raise LoanAlreadyExtendedError(loan_id)
+            previous_due_date = loan.due_date
+            loan = self.loans.mark_extended(loan_id, new_due_date)
+            self._on_change(StoreEvent(LOAN_EXTENDED, loan.book_id, loan=loan))
+        self._push_undo(lambda: self._undo_extend(loan, previous_due_date))
+        return loan
+
+    @metrics.timed(LOAN_LOOKUP_LATENCY, "active_loans_for_user")
+    def active_loans_for_user(self, user_id: int) -> List[LoanRecord]:
+        return self.loans.active_for_user(user_id)
+
+    @metrics.timed(LOAN_LOOKUP_LATENCY, "list_active_loans")
+    def list_active_loans(self, after: Optional[uuid.UUID] = None, limit: Optional[int] = None) -> List[LoanRecord]:
+        return self.loans.active_page(after=after, limit=limit)
+
+    @metrics.timed(LOAN_LOOKUP_LATENCY, "loan_history")
+    def loan_history(self, query: LoanHistoryQuery, after: Optional[HistoryCursor] = None,
+                     limit: Optional[int] = None) -> List[LoanRecord]:
+        return self.loans.history(query, after, limit)
+
+    def loan_counts(self) -> Tuple[int, int]:
+        return len(self.loans), self.loans.active_count()
+
+    def active_loan_columns(self) -> LoanColumns:
+        return self.loans.active_columns()
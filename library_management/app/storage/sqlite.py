@@ -0,0 +1,538 @@
+from contextlib import contextmanager
+from datetime import date
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+import os
+import sqlite3
+import threading
+import uuid
+
+from ..fines import LoanColumns
+from ..loan_history import LoanHistoryQuery, HistoryCursor, BORROW_DATE, RETURN_DATE, STATUS_ACTIVE, STATUS_RETURNED
+from ..metrics import metrics, LOAN_LOOKUP_LATENCY
+from ..schemas import Book, BookCreate, LoanRecord
+from ..search import tokenize
+from ..shared_state import SharedCounter
+from .base import (
+    StoreEvent, StoredChanges, ENTITY_BOOK, ENTITY_LOAN, OP_UPSERT, OP_DELETE, BOOK_ADDED, BOOK_UPDATED, BOOK_DELETED,
+    LOAN_BORROWED, LOAN_RETURNED, LOAN_EXTENDED, EXTERNAL_CHANGE,
+    LibraryStore, BookNotFoundError, OutOfStockError, DuplicateLoanError,
+    LoanNotFoundError, LoanAlreadyReturnedError, LoanAlreadyExtendedError,
+)
+
+# ==================================
+#         SKEMA DATABASE
+# ==================================
+# UUID disimpan sebagai TEXT kanonik (huruf kecil, dengan tanda hubung) sehingga urutan
+# string sama dengan urutan UUID; cursor pagination bisa langsung memakai `id > ?`.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    stock INTEGER NOT NULL CHECK (stock >= 0),
+    title_tokens TEXT NOT NULL,
+    author_tokens TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_books_in_stock ON books (id) WHERE stock > 0;
+
+CREATE TABLE IF NOT EXISTS loans (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    book_id TEXT NOT NULL,
+    borrow_date TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    return_date TEXT,
+    extended INTEGER NOT NULL DEFAULT 0,
+    initial_borrow_date TEXT NOT NULL,
+    fine INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_loans_user_status ON loans (user_id, return_date);
+CREATE INDEX IF NOT EXISTS idx_loans_book_status ON loans (book_id, return_date);
+CREATE INDEX IF NOT EXISTS idx_loans_active ON loans (id) WHERE return_date IS NULL;
+-- Satu user hanya boleh punya satu pinjaman aktif untuk buku yang sama
+CREATE UNIQUE INDEX IF NOT EXISTS idx_loans_active_pair ON loans (user_id, book_id) WHERE return_date IS NULL;
+-- Riwayat berdasarkan tanggal; urutan indeks (tanggal, rowid) dipakai langsung untuk ORDER BY.
+-- Riwayat per user/buku berdasarkan tanggal kembali memakai idx_loans_*_status.
+CREATE INDEX IF NOT EXISTS idx_loans_borrow_date ON loans (borrow_date);
+CREATE INDEX IF NOT EXISTS idx_loans_return_date ON loans (return_date) WHERE return_date IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_loans_active_borrow_date ON loans (borrow_date) WHERE return_date IS NULL;
+CREATE INDEX IF NOT EXISTS idx_loans_user_borrow_date ON loans (user_id, borrow_date);
+CREATE INDEX IF NOT EXISTS idx_loans_book_borrow_date ON loans (book_id, borrow_date);
+"""
+
+# Feed perubahan untuk mode multi-worker: trigger mencatat setiap baris buku/pinjaman yang
+# berubah di tabel `changes`, di dalam transaksi yang sama dengan perubahannya. Nomor urut
+# (AUTOINCREMENT) dipakai bersama semua worker, tanpa celah karena penulis diserialkan SQLite
+# dan transaksi yang di-rollback tidak memakai nomor. Baris lama dipangkas setiap 1024 perubahan
+# sehingga yang tersimpan kira-kira `change_log_size` terakhir. Epoch dibuat sekali per database.
+CHANGE_FEED_TABLES = [("books", ENTITY_BOOK), ("loans", ENTITY_LOAN)]
+CHANGE_FEED_PRUNE_EVERY = 1024
+
+
+def _change_feed_schema(size: int) -> str:
+    script = [
+        "BEGIN IMMEDIATE;",
+        "CREATE TABLE IF NOT EXISTS changes ("
+        " seq INTEGER PRIMARY KEY AUTOINCREMENT, entity TEXT NOT NULL, op TEXT NOT NULL, id TEXT NOT NULL);",
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);",
+        f"INSERT OR IGNORE INTO meta (key, value) VALUES ('change_feed_epoch', '{os.urandom(4).hex()}');",
+    ]
+    for table, entity in CHANGE_FEED_TABLES:
+        for action, op, row in (("INSERT", OP_UPSERT, "NEW"), ("UPDATE", OP_UPSERT, "NEW"), ("DELETE", OP_DELETE, "OLD")):
+            script.append(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_{action.lower()}_feed AFTER {action} ON {table} BEGIN"
+                f" INSERT INTO changes (entity, op, id) VALUES ('{entity}', '{op}', {row}.id); END;"
+            )
+    # Dibuat ulang agar ukuran mengikuti konfigurasi terbaru
+    script += [
+        "DROP TRIGGER IF EXISTS changes_prune;",
+        f"CREATE TRIGGER changes_prune AFTER INSERT ON changes WHEN NEW.seq % {CHANGE_FEED_PRUNE_EVERY} = 0 BEGIN"
+        f" DELETE FROM changes WHERE seq <= NEW.seq - {size}; END;",
+        "COMMIT;",
+    ]
+    return "\n".join(script)
+
+
+def _drop_change_feed_triggers() -> str:
+    # Tanpa mode multi-worker feed dicatat di memori proses; trigger hanya menambah biaya tulis
+    return "\n".join(
+        f"DROP TRIGGER IF EXISTS {table}_{action}_feed;"
+        for table, _ in CHANGE_FEED_TABLES for action in ("insert", "update", "delete")
+    )
+
+
+BOOK_COLUMNS = "id, title, author, stock"
+LOAN_COLUMNS = "id, user_id, book_id, borrow_date, due_date, return_date, extended, initial_borrow_date, fine"
+
+# Jumlah prepared statement yang di-cache per koneksi oleh modul sqlite3
+STATEMENT_CACHE_SIZE = 128
+
+
+def _token_text(text: str) -> str:
+    # Diapit spasi agar token bisa dicocokkan utuh dengan LIKE '% token %'
+    return " " + " ".join(tokenize(text)) + " "
+
+
+def _row_to_book(row) -> Book:
+    return Book(id=uuid.UUID(row[0]), title=row[1], author=row[2], stock=row[3])
+
+
+def _row_to_loan(row) -> LoanRecord:
+    return LoanRecord(
+        id=uuid.UUID(row[0]),
+        user_id=row[1],
+        book_id=uuid.UUID(row[2]),
+        borrow_date=date.fromisoformat(row[3]),
+        due_date=date.fromisoformat(row[4]),
+        return_date=date.fromisoformat(row[5]) if row[5] else None,
+        extended=bool(row[6]),
+        initial_borrow_date=date.fromisoformat(row[7]),
+        fine=row[8],
+    )
+
+
+class SQLiteStore(LibraryStore):
+    """
+    Storage berbasis SQLite (mode WAL) sehingga data tetap ada setelah restart.
+    Setiap thread memakai koneksinya sendiri (pool per-thread), dan borrow/return
+    dijalankan dalam satu transaksi `BEGIN IMMEDIATE`.
+
+    Jika `shared` true (mode multi-worker), setiap transaksi tulis menaikkan penghitung
+    generasi di file `<path>-generation` yang di-mmap semua worker, sehingga worker lain
+    bisa mendeteksi perubahan lewat `poll_changes` tanpa query ke database. Feed perubahan
+    juga dicatat di database (`change_feed`) agar nomor urutnya sama di semua worker.
+    """
+
+    def __init__(self, path: str, shared: bool = False, change_log_size: int = 10000):
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        self._change_epoch: Optional[str] = None
+        if shared:
+            conn.executescript(_change_feed_schema(change_log_size))
+            self._change_epoch = conn.execute("SELECT value FROM meta WHERE key = 'change_feed_epoch'").fetchone()[0]
+        else:
+            conn.executescript(_drop_change_feed_triggers())
+        self._generation = SharedCounter(f"{path}-generation") if shared else None
+        # Generasi terakhir yang sudah diketahui proses ini (tulisan sendiri atau sudah di-poll)
+        self._seen_generation = self._generation.value if shared else 0
+        self._generation_lock = threading.Lock()
+
+    # --- Koneksi & transaksi ---
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                isolation_level=None,  # transaksi diatur manual
+                check_same_thread=False,
+                cached_statements=STATEMENT_CACHE_SIZE,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        if conn.in_transaction:
+            # Sudah di dalam `atomic`: commit/rollback diatur transaksi terluar
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.events = []
+        self._local.undo = []
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            self._local.events = []
+            undo, self._local.undo = self._local.undo, None
+            for action in reversed(undo):
+                action()
+            raise
+        conn.execute("COMMIT")
+        self._local.undo = None
+        if self._generation is not None and self._local.events:
+            # Dinaikkan setelah commit: worker lain yang melihat generasi baru pasti membaca
+            # data yang sudah di-commit, bukan snapshot sebelumnya
+            self._bump_generation()
+        # Event baru dikirim setelah commit, jadi perubahan yang di-rollback tidak pernah terlihat listener
+        events, self._local.events = self._local.events, []
+        for event in events:
+            self._emit(event)
+
+    def _bump_generation(self):
+        value = self._generation.increment()
+        with self._generation_lock:
+            if value == self._seen_generation + 1:
+                # Tidak ada tulisan proses lain di antaranya
+                self._seen_generation = value
+
+    def poll_changes(self) -> bool:
+        if self._generation is None or self._generation.value == self._seen_generation:
+            return False
+        with self._generation_lock:
+            value = self._generation.value
+            if value == self._seen_generation:
+                return False
+            self._seen_generation = value
+        self._emit(StoreEvent(EXTERNAL_CHANGE, None))
+        return True
+
+    def change_feed(self, after: int, limit: int) -> Optional[StoredChanges]:
+        if self._change_epoch is None:
+            return None
+        conn = self._connection()
+        # Satu transaksi baca: batas feed dan isinya berasal dari snapshot yang sama
+        own_transaction = not conn.in_transaction
+        if own_transaction:
+            conn.execute("BEGIN")
+        try:
+            first, last = conn.execute(
+                "SELECT (SELECT MIN(seq) FROM changes),"
+                " COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'changes'), 0)"
+            ).fetchone()
+            rows = conn.execute(
+                f"SELECT c.seq, c.entity, c.op, c.id, {', '.join('b.' + c for c in BOOK_COLUMNS.split(', '))},"
+                f" {', '.join('l.' + c for c in LOAN_COLUMNS.split(', '))}"
+                " FROM changes c"
+                " LEFT JOIN books b ON c.entity = 'book' AND b.id = c.id"
+                " LEFT JOIN loans l ON c.entity = 'loan' AND l.id = c.id"
+                " WHERE c.seq > ? ORDER BY c.seq LIMIT ?",
+                (after, limit),
+            ).fetchall()
+        finally:
+            if own_transaction:
+                conn.execute("COMMIT")
+        changes = []
+        for row in rows:
+            seq, entity, op, row_id = row[:4]
+            data = None
+            if op == OP_UPSERT:
+                # Data adalah state terbaru; jika barisnya sudah dihapus, perubahan "delete" menyusul
+                book_row, loan_row = row[4:8], row[8:]
+                if entity == ENTITY_BOOK and book_row[0] is not None:
+                    data = _row_to_book(book_row)
+                elif entity == ENTITY_LOAN and loan_row[0] is not None:
+                    data = _row_to_loan(loan_row)
+                else:
+                    continue
+            changes.append((seq, entity, op, uuid.UUID(row_id), data))
+        return StoredChanges(
+            epoch=self._change_epoch,
+            first=last + 1 if first is None else first,
+            last=last,
+            changes=changes,
+            next=rows[-1][0] if rows else after,
+        )
+
+    def on_rollback(self, undo: Callable[[], None]):
+        log = getattr(self._local, "undo", None)
+        if log is not None:
+            log.append(undo)
+
+    def _queue_event(self, event: StoreEvent):
+        self._local.events.append(event)
+
+    @contextmanager
+    def atomic(self, book_ids: Iterable[uuid.UUID] = ()) -> Iterator[None]:
+        # Satu transaksi SQLite sudah mengunci database untuk penulis lain
+        with self._transaction():
+            yield
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+        if self._generation is not None:
+            self._generation.close()
+            self._generation = None
+
+    # --- Buku ---
+    def get_book(self, book_id: uuid.UUID) -> Optional[Book]:
+        row = self._connection().execute(
+            f"SELECT {BOOK_COLUMNS} FROM books WHERE id = ?", (str(book_id),)
+        ).fetchone()
+        return _row_to_book(row) if row else None
+
+    def list_books(self, after: Optional[uuid.UUID] = None, limit: Optional[int] = None,
+                   available_only: bool = False) -> List[Book]:
+        sql = f"SELECT {BOOK_COLUMNS} FROM books WHERE id > ?"
+        if available_only:
+            sql += " AND stock > 0"
+        sql += " ORDER BY id LIMIT ?"
+        rows = self._connection().execute(
+            sql, ("" if after is None else str(after), -1 if limit is None else limit)
+        ).fetchall()
+        return [_row_to_book(row) for row in rows]
+
+    def search_books(self, query: str, limit: int, offset: int = 0) -> Tuple[int, List[Book]]:
+        tokens = tokenize(query)
+        if not tokens:
+            return 0, []
+
+        # Semua token harus cocok utuh, kecuali token terakhir yang boleh berupa prefix
+        patterns = [f"% {token} %" for token in tokens[:-1]] + [f"% {tokens[-1]}%"]
+        where = " AND ".join("(title_tokens LIKE ? OR author_tokens LIKE ?)" for _ in patterns)
+        score = " + ".join("(title_tokens LIKE ?) * 2 + (author_tokens LIKE ?)" for _ in patterns)
+        pair_params = [p for pattern in patterns for p in (pattern, pattern)]
+
+        conn = self._connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM books WHERE {where}", pair_params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {BOOK_COLUMNS} FROM books WHERE {where} "
+            f"ORDER BY ({score}) DESC, lower(title), id LIMIT ? OFFSET ?",
+            pair_params + pair_params + [limit, offset],
+        ).fetchall()
+        return total, [_row_to_book(row) for row in rows]
+
+    def count_books(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+    def add_book(self, book_data: BookCreate) -> Book:
+        new_book = Book(id=uuid.uuid4(), **book_data.model_dump())
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO books (id, title, author, stock, title_tokens, author_tokens) VALUES (?, ?, ?, ?, ?, ?)",
+                (str(new_book.id), new_book.title, new_book.author, new_book.stock,
+                 _token_text(new_book.title), _token_text(new_book.author)),
+            )
+            self._queue_event(StoreEvent(BOOK_ADDED, new_book.id, book=new_book))
+        return new_book
+
+    def add_books(self, books_data: List[BookCreate]) -> List[Book]:
+        new_books = [Book(id=uuid.uuid4(), **book_data.model_dump()) for book_data in books_data]
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO books (id, title, author, stock, title_tokens, author_tokens) VALUES (?, ?, ?, ?, ?, ?)",
+                [(str(book.id), book.title, book.author, book.stock, _token_text(book.title), _token_text(book.author))
+                 for book in new_books],
+            )
+            for book in new_books:
+                self._queue_event(StoreEvent(BOOK_ADDED, book.id, book=book))
+        return new_books
+
+    def update_book(self, book_id: uuid.UUID, changes: dict) -> Book:
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT {BOOK_COLUMNS} FROM books WHERE id = ?", (str(book_id),)).fetchone()
+            if not row:
+                raise BookNotFoundError(book_id)
+            book = _row_to_book(row)
+            for key, value in changes.items():
+                setattr(book, key, value)
+            conn.execute(
+                "UPDATE books SET title = ?, author = ?, stock = ?, title_tokens = ?, author_tokens = ? WHERE id = ?",
+                (book.title, book.author, book.stock, _token_text(book.title), _token_text(book.author), str(book_id)),
+            )
+            self._queue_event(StoreEvent(BOOK_UPDATED, book_id, book=book))
+        return book
+
+    def delete_book(self, book_id: uuid.UUID):
+        with self._transaction() as conn:
+            if conn.execute("DELETE FROM books WHERE id = ?", (str(book_id),)).rowcount == 0:
+                raise BookNotFoundError(book_id)
+            self._queue_event(StoreEvent(BOOK_DELETED, book_id))
+
+    # --- Peminjaman ---
+    @metrics.timed(LOAN_LOOKUP_LATENCY, "get_loan")
+    def get_loan(self, loan_id: uuid.UUID) -> Optional[LoanRecord]:
+        row = self._connection().execute(
+            f"SELECT {LOAN_COLUMNS} FROM loans WHERE id = ?", (str(loan_id),)
+        ).fetchone()
+        return _row_to_loan(row) if row else None
+
+    def borrow(self, user_id: int, book_id: uuid.UUID, borrow_date: date, due_date: date) -> LoanRecord:
+        new_loan = LoanRecord(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            book_id=book_id,
+            borrow_date=borrow_date,
+            due_date=due_date,
+            initial_borrow_date=borrow_date,
+        )
+        with self._transaction() as conn:
+            row = conn.execute("SELECT stock FROM books WHERE id = ?", (str(book_id),)).fetchone()
+            if not row:
+                raise BookNotFoundError(book_id)
+            if row[0] <= 0:
+                raise OutOfStockError(book_id)
+            duplicate = conn.execute(
+                "SELECT 1 FROM loans WHERE user_id = ? AND book_id = ? AND return_date IS NULL",
+                (user_id, str(book_id)),
+            ).fetchone()
+            if duplicate:
+                raise DuplicateLoanError(book_id)
+
+            conn.execute("UPDATE books SET stock = stock - 1 WHERE id = ?", (str(book_id),))
+            conn.execute(
+                f"INSERT INTO loans ({LOAN_COLUMNS}) VALUES (?, ?, ?, ?, ?, NULL, 0, ?, 0)",
+                (str(new_loan.id), user_id, str(book_id), borrow_date.isoformat(),
+                 due_date.isoformat(), borrow_date.isoformat()),
+            )
+            self._queue_event(StoreEvent(LOAN_BORROWED, book_id, loan=new_loan))
+        return new_loan
+
+    def return_loan(self, loan_id: uuid.UUID, return_date: date,
+                    compute_fine: Callable[[LoanRecord], int]) -> LoanRecord:
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT {LOAN_COLUMNS} FROM loans WHERE id = ?", (str(loan_id),)).fetchone()
+            if not row:
+                raise LoanNotFoundError(loan_id)
+            loan = _row_to_loan(row)
+            if loan.return_date is not None:
+                raise LoanAlreadyReturnedError(loan_id)
+
+            loan.return_date = return_date
+            loan.fine = compute_fine(loan)
+            conn.execute(
+                "UPDATE loans SET return_date = ?, fine = ? WHERE id = ?",
+                (return_date.isoformat(), loan.fine, str(loan_id)),
+            )
+            conn.execute("UPDATE books SET stock = stock + 1 WHERE id = ?", (str(loan.book_id),))
+            self._queue_event(StoreEvent(LOAN_RETURNED, loan.book_id, loan=loan))
+        return loan
+
+    def extend_loan(self, loan_id: uuid.UUID, new_due_date: date) -> LoanRecord:
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT {LOAN_COLUMNS} FROM loans WHERE id = ?", (str(loan_id),)).fetchone()
+            if not row:
+                raise LoanNotFoundError(loan_id)
+            loan = _row_to_loan(row)
+            if loan.return_date is not None:
+                raise LoanAlreadyReturnedError(loan_id)
+            if loan.extended:
+                raise LoanAlreadyExtendedError(loan_id)
+
+            loan.due_date = new_due_date
+            loan.extended = True
+            conn.execute(
+                "UPDATE loans SET due_date = ?, extended = 1 WHERE id = ?",
+                (new_due_date.isoformat(), str(loan_id)),
+            )
+            self._queue_event(StoreEvent(LOAN_EXTENDED, loan.book_id, loan=loan))
+        return loan
+
+    @metrics.timed(LOAN_LOOKUP_LATENCY, "active_loans_for_user")
+    def active_loans_for_user(self, user_id: int) -> List[LoanRecord]:
+        rows = self._connection().execute(
+            f"SELECT {LOAN_COLUMNS} FROM loans WHERE user_id = ? AND return_date IS NULL ORDER BY borrow_date, rowid",
+            (user_id,),
+        ).fetchall()
+        return [_row_to_loan(row) for row in rows]
+
+    @metrics.timed(LOAN_LOOKUP_LATENCY, "list_active_loans")
+    def list_active_loans(self, after: Optional[uuid.UUID] = None, limit: Optional[int] = None) -> List[LoanRecord]:
+        rows = self._connection().execute(
+            f"SELECT {LOAN_COLUMNS} FROM loans WHERE return_date IS NULL AND id > ? ORDER BY id LIMIT ?",
+            ("" if after is None else str(after), -1 if limit is None else limit),
+        ).fetchall()
+        return [_row_to_loan(row) for row in rows]
+
+    @metrics.timed(LOAN_LOOKUP_LATENCY, "loan_history")
+    def loan_history(self, query: LoanHistoryQuery, after: Optional[HistoryCursor] = None,
+                     limit: Optional[int] = None) -> List[LoanRecord]:
+        # Pinjaman dengan tanggal yang sama diurutkan berdasarkan rowid (urutan indeks tanggal)
+        field = RETURN_DATE if query.sort_by == RETURN_DATE else BORROW_DATE
+        conditions, params = [], []
+        if field == RETURN_DATE:
+            if query.status == STATUS_ACTIVE:
+                return []
+            conditions.append("return_date IS NOT NULL")
+        elif query.status == STATUS_ACTIVE:
+            conditions.append("return_date IS NULL")
+        elif query.status == STATUS_RETURNED:
+            conditions.append("return_date IS NOT NULL")
+        if query.user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(query.user_id)
+        if query.book_id is not None:
+            conditions.append("book_id = ?")
+            params.append(str(query.book_id))
+        if query.start is not None:
+            conditions.append(f"{field} >= ?")
+            params.append(query.start.isoformat())
+        if query.end is not None:
+            conditions.append(f"{field} <= ?")
+            params.append(query.end.isoformat())
+        if after is not None:
+            # Jika pinjaman cursor sudah tidak ada, mulai dari awal tanggalnya (seperti MemoryStore)
+            conditions.append(
+                f"({field}, rowid) > (?, COALESCE((SELECT rowid FROM loans WHERE id = ? AND {field} = ?), 0))"
+            )
+            day = after.date.isoformat()
+            params.extend((day, str(after.loan_id), day))
+        where = " AND ".join(conditions) or "1"
+        rows = self._connection().execute(
+            f"SELECT {LOAN_COLUMNS} FROM loans WHERE {where} ORDER BY {field}, rowid LIMIT ?",
+            params + [-1 if limit is None else limit],
+        ).fetchall()
+        return [_row_to_loan(row) for row in rows]
+
+    def loan_counts(self) -> Tuple[int, int]:
+        total, active = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(return_date IS NULL), 0) FROM loans"
+        ).fetchone()
+        return total, active
+
+    def active_loan_columns(self) -> LoanColumns:
+        # Tanggal langsung diubah menjadi ordinal hari oleh SQLite (julianday - 1721424.5)
+        rows = self._connection().execute(
+            "SELECT id, user_id, book_id,"
+            " CAST(julianday(due_date) - 1721424.5 AS INTEGER),"
+            " CAST(julianday(initial_borrow_date) - 1721424.5 AS INTEGER), extended"
+            " FROM loans WHERE return_date IS NULL"
+        ).fetchall()
+        return LoanColumns.from_rows(
+            (uuid.UUID(loan_id).int, user_id, uuid.UUID(book_id), due, initial, bool(extended))
+            for loan_id, user_id, book_id, due, initial, extended in rows
+        )
@@ -0,0 +1,32 @@
+"""
+Client HTTP in-process untuk benchmark: httpx memanggil aplikasi ASGI secara langsung,
+tanpa socket, jadi yang terukur hanya biaya aplikasi (routing, validasi, handler, serialisasi).
+"""
+import time
+
+import httpx
+
+from app.main import app
+
+BASE_URL = "http://bench"
+
+
+def asgi_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=BASE_URL)
+
+
+def auth(user_id: int) -> dict:
+    return {"X-User-ID": str(user_id)}
+
+
+async def timed_request(client: httpx.AsyncClient, method: str, url: str, expect: int = 200, **kwargs):
+    """
+    Mengirim satu request dan mengembalikan (respons, latensi dalam ms).
+    Melempar RuntimeError jika status respons tidak sesuai `expect`.
+    """
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    elapsed = (time.perf_counter() - start) * 1000
+    if response.status_code != expect:
+        raise RuntimeError(f"{method} {url}: status {response.status_code}, diharapkan {expect}: {response.text[:200]}")
+    return response, elapsed
@@ -0,0 +1,61 @@
+"""
+Benchmark mesin denda: waktu mengambil kolom pinjaman aktif dari LoanRepository dan
+menghitung laporan (total, halaman pinjaman terlambat, denda per user).
+
+Jalankan dari direktori `library_management`:
+    python -m benchmarks.fines_engine --loans 1000000
+"""
+from datetime import date
+import argparse
+import random
+import time
+import uuid
+
+from app.data_store import LoanRepository
+from app.fines import FineReport
+
+START = date(2024, 1, 1)
+
+
+def build_repository(count: int, users: int = 50000, books: int = 20000) -> LoanRepository:
+    rng = random.Random(42)
+    book_ids = [uuid.UUID(int=rng.getrandbits(128)) for _ in range(books)]
+    base = START.toordinal()
+    repository = LoanRepository()
+    rows = []
+    for _ in range(count):
+        borrowed = base + rng.randrange(60)
+        rows.append((rng.getrandbits(128), rng.randrange(users), rng.choice(book_ids),
+                     borrowed, borrowed + 14, 0, False, borrowed, 0))
+    repository.load_fields(rows)
+    return repository
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    repository = build_repository(args.loans)
+    as_of = date(2024, 3, 1)
+    columns = repository.active_columns()
+
+    print(f"Pinjaman aktif: {args.loans} (waktu terbaik dari {args.repeat} kali, ms)")
+    print(f"  ambil kolom        : {timed(repository.active_columns, args.repeat):7.1f}")
+    print(f"  /fines/summary     : {timed(lambda: FineReport(columns, as_of).totals(), args.repeat):7.1f}")
+    print(f"  /fines/overdue     : {timed(lambda: FineReport(columns, as_of).overdue(50), args.repeat):7.1f}")
+    print(f"  /fines/users       : {timed(lambda: FineReport(columns, as_of).per_user(50), args.repeat):7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Driver beban async: sejumlah worker mengirim request campuran (baca katalog, pinjam,
+kembali) secara bersamaan ke aplikasi ASGI, lalu melaporkan throughput dan latensi
+p50/p95/p99 per jenis operasi.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List
+import asyncio
+import random
+import time
+
+from .asgi import auth, timed_request
+from .datagen import Dataset
+
+# Bobot default beban campuran
+DEFAULT_MIX = {"read": 0.8, "borrow": 0.1, "return": 0.1}
+
+
+@dataclass
+class LoadResult:
+    duration_s: float
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    # Pinjam yang ditolak secara wajar (stok habis / sudah dipinjam); bukan error
+    rejected: int = 0
+
+    @property
+    def requests(self) -> int:
+        return sum(len(samples) for samples in self.latencies.values())
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.duration_s if self.duration_s else 0.0
+
+
+class _Driver:
+    def __init__(self, client, ds: Dataset, mix: Dict[str, float], seed: int):
+        self.client = client
+        self.ds = ds
+        self.rng = random.Random(seed)
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        # Pinjaman aktif yang dibuat selama uji beban: (user_id, loan_id)
+        self.open_loans: List[tuple] = []
+        self.latencies: Dict[str, List[float]] = {}
+        self.rejected = 0
+
+    async def read(self):
+        rng, ds = self.rng, self.ds
+        choice = rng.random()
+        if choice < 0.4:
+            await timed_request(self.client, "GET", f"/books/{rng.choice(ds.book_ids)}")
+        elif choice < 0.7:
+            params = {"limit": 50, "after": str(rng.choice(ds.book_ids))}
+            await timed_request(self.client, "GET", "/books/", params=params)
+        elif choice < 0.9:
+            params = {"q": f"seri {rng.randrange(100)}", "limit": 20}
+            await timed_request(self.client, "GET", "/books/search", params=params)
+        else:
+            await timed_request(self.client, "GET", "/loans/my-loans", headers=auth(rng.choice(ds.student_ids)))
+
+    async def borrow(self):
+        user_id = self.rng.choice(self.ds.student_ids)
+        book_id = self.rng.choice(self.ds.book_ids)
+        response = await self.client.post(f"/borrow/{book_id}", headers=auth(user_id))
+        if response.status_code == 400:
+            self.rejected += 1
+        elif response.status_code != 201:
+            raise RuntimeError(f"POST /borrow: status {response.status_code}: {response.text[:200]}")
+        else:
+            self.open_loans.append((user_id, response.json()["id"]))
+
+    async def return_(self):
+        if not self.open_loans:
+            return await self.borrow()
+        index = self.rng.randrange(len(self.open_loans))
+        self.open_loans[index], self.open_loans[-1] = self.open_loans[-1], self.open_loans[index]
+        user_id, loan_id = self.open_loans.pop()
+        await timed_request(self.client, "POST", f"/return/{loan_id}", headers=auth(user_id))
+
+    async def worker(self, count: int):
+        for _ in range(count):
+            op = self.rng.choices(self.ops, self.weights)[0]
+            start = time.perf_counter()
+            if op == "read":
+                await self.read()
+            elif op == "borrow":
+                await self.borrow()
+            else:
+                await self.return_()
+            self.latencies.setdefault(op, []).append((time.perf_counter() - start) * 1000)
+
+
+async def run_load(client, ds: Dataset, requests: int, concurrency: int,
+                   mix: Dict[str, float] = None, seed: int = 11) -> LoadResult:
+    """
+    Menjalankan `requests` request dengan `concurrency` worker bersamaan.
+    Pinjaman yang masih terbuka di akhir uji dikembalikan agar data tetap bersih.
+    """
+    driver = _Driver(client, ds, mix or DEFAULT_MIX, seed)
+    per_worker, extra = divmod(requests, concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(driver.worker(per_worker + (i < extra)) for i in range(concurrency)))
+    duration = time.perf_counter() - start
+    for user_id, loan_id in driver.open_loans:
+        await client.post(f"/return/{loan_id}", headers=auth(user_id))
+    return LoadResult(duration, driver.latencies, driver.rejected)
@@ -0,0 +1,177 @@
+"""
+Micro-benchmark per endpoint: setiap route dipanggil berulang kali secara berurutan
+(satu request dalam satu waktu) dan latensinya dicatat. Persiapan yang dibutuhkan
+(misalnya meminjam buku sebelum mengukur /return) tidak ikut diukur.
+"""
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Tuple
+import random
+import uuid
+
+from app import data_store
+
+from .asgi import auth, timed_request
+from .datagen import Dataset
+
+CASES: List[Tuple[str, Callable]] = []
+
+
+def case(name: str):
+    def register(fn):
+        CASES.append((name, fn))
+        return fn
+    return register
+
+
+def _free_book(ds: Dataset, rng: random.Random, user_id: int) -> uuid.UUID:
+    # Buku yang bisa dipinjam user: stok ada dan user belum meminjam buku itu
+    while True:
+        book_id = rng.choice(ds.book_ids)
+        if data_store.books_db[book_id].stock > 0 and data_store.loans_db.find_active(user_id, book_id) is None:
+            return book_id
+
+
+def _free_pair(ds: Dataset, rng: random.Random) -> Tuple[int, uuid.UUID]:
+    user_id = rng.choice(ds.student_ids)
+    return user_id, _free_book(ds, rng, user_id)
+
+
+async def _borrow(client, user_id, book_id) -> str:
+    response, _ = await timed_request(client, "POST", f"/borrow/{book_id}", 201, headers=auth(user_id))
+    return response.json()["id"]
+
+
+# --- Katalog (publik) ---
+@case("GET /books (cache)")
+async def books_cached(client, ds, rng):
+    return (await timed_request(client, "GET", "/books/"))[1]
+
+@case("GET /books (304)")
+async def books_not_modified(client, ds, rng):
+    response, _ = await timed_request(client, "GET", "/books/")
+    return (await timed_request(client, "GET", "/books/", 304, headers={"If-None-Match": response.headers["ETag"]}))[1]
+
+@case("GET /books?limit=50")
+async def books_page(client, ds, rng):
+    params = {"limit": 50, "after": str(rng.choice(ds.book_ids))}
+    return (await timed_request(client, "GET", "/books/", params=params))[1]
+
+@case("GET /books/{id}")
+async def book_detail(client, ds, rng):
+    return (await timed_request(client, "GET", f"/books/{rng.choice(ds.book_ids)}"))[1]
+
+@case("GET /books/search")
+async def book_search(client, ds, rng):
+    params = {"q": f"seri {rng.randrange(100)}", "limit": 20}
+    return (await timed_request(client, "GET", "/books/search", params=params))[1]
+
+# --- Manajemen buku (admin) ---
+@case("POST /books")
+async def book_create(client, ds, rng):
+    body = {"title": "Buku Benchmark", "author": "Penulis Benchmark", "stock": 3}
+    response, elapsed = await timed_request(client, "POST", "/books/", 201, json=body, headers=auth(ds.admin_id))
+    await timed_request(client, "DELETE", f"/books/{response.json()['id']}", 204, headers=auth(ds.admin_id))
+    return elapsed
+
+@case("PUT /books/{id}")
+async def book_update(client, ds, rng):
+    book_id = rng.choice(ds.book_ids)
+    body = {"title": data_store.books_db[book_id].title}
+    return (await timed_request(client, "PUT", f"/books/{book_id}", json=body, headers=auth(ds.admin_id)))[1]
+
+@case("DELETE /books/{id}")
+async def book_delete(client, ds, rng):
+    body = {"title": "Buku Benchmark", "author": "Penulis Benchmark", "stock": 3}
+    response, _ = await timed_request(client, "POST", "/books/", 201, json=body, headers=auth(ds.admin_id))
+    return (await timed_request(client, "DELETE", f"/books/{response.json()['id']}", 204, headers=auth(ds.admin_id)))[1]
+
+# --- Transaksi ---
+@case("POST /borrow")
+async def borrow(client, ds, rng):
+    user_id, book_id = _free_pair(ds, rng)
+    response, elapsed = await timed_request(client, "POST", f"/borrow/{book_id}", 201, headers=auth(user_id))
+    await timed_request(client, "POST", f"/return/{response.json()['id']}", headers=auth(user_id))
+    return elapsed
+
+@case("POST /return")
+async def return_loan(client, ds, rng):
+    user_id, book_id = _free_pair(ds, rng)
+    loan_id = await _borrow(client, user_id, book_id)
+    return (await timed_request(client, "POST", f"/return/{loan_id}", headers=auth(user_id)))[1]
+
+@case("POST /extend")
+async def extend(client, ds, rng):
+    user_id, book_id = _free_pair(ds, rng)
+    loan_id = await _borrow(client, user_id, book_id)
+    _, elapsed = await timed_request(client, "POST", f"/extend/{loan_id}", headers=auth(user_id))
+    await timed_request(client, "POST", f"/return/{loan_id}", headers=auth(user_id))
+    return elapsed
+
+@case("POST /transactions/batch")
+async def batch(client, ds, rng):
+    user_id = rng.choice(ds.student_ids)
+    books = set()
+    while len(books) < 5:
+        books.add(_free_book(ds, rng, user_id))
+    body = {"operations": [{"action": "borrow", "book_id": str(b)} for b in books], "atomic": True}
+    response, elapsed = await timed_request(client, "POST", "/transactions/batch", json=body, headers=auth(user_id))
+    operations = [{"action": "return", "loan_id": r["loan"]["id"]} for r in response.json()["results"] if r["loan"]]
+    await timed_request(client, "POST", "/transactions/batch", json={"operations": operations}, headers=auth(user_id))
+    return elapsed
+
+@case("GET /loans/my-loans")
+async def my_loans(client, ds, rng):
+    return (await timed_request(client, "GET", "/loans/my-loans", headers=auth(rng.choice(ds.student_ids))))[1]
+
+@case("GET /loans/active-all?limit=100")
+async def active_loans(client, ds, rng):
+    params = {"limit": 100}
+    return (await timed_request(client, "GET", "/loans/active-all", params=params, headers=auth(ds.admin_id)))[1]
+
+@case("GET /loans/history (user)")
+async def history_user(client, ds, rng):
+    return (await timed_request(client, "GET", "/loans/history", headers=auth(rng.choice(ds.student_ids))))[1]
+
+@case("GET /loans/history?start_date&limit=100")
+async def history_range(client, ds, rng):
+    start = date.today() - timedelta(days=rng.randrange(700))
+    params = {"start_date": start.isoformat(), "sort_by": rng.choice(["borrow_date", "return_date"]), "limit": 100}
+    return (await timed_request(client, "GET", "/loans/history", params=params, headers=auth(ds.admin_id)))[1]
+
+# --- Laporan (admin) ---
+@case("GET /fines/summary")
+async def fines_summary(client, ds, rng):
+    return (await timed_request(client, "GET", "/fines/summary", headers=auth(ds.admin_id)))[1]
+
+@case("GET /fines/overdue")
+async def fines_overdue(client, ds, rng):
+    return (await timed_request(client, "GET", "/fines/overdue", headers=auth(ds.admin_id)))[1]
+
+@case("GET /fines/users")
+async def fines_users(client, ds, rng):
+    return (await timed_request(client, "GET", "/fines/users", headers=auth(ds.admin_id)))[1]
+
+@case("GET /stats/top-books")
+async def stats_top_books(client, ds, rng):
+    return (await timed_request(client, "GET", "/stats/top-books", headers=auth(ds.admin_id)))[1]
+
+@case("GET /stats/daily")
+async def stats_daily(client, ds, rng):
+    return (await timed_request(client, "GET", "/stats/daily", params={"days": 30}, headers=auth(ds.admin_id)))[1]
+
+
+async def run_micro(client, ds: Dataset, iterations: int, warmup: int = 3,
+                    seed: int = 7, only: str = "") -> Dict[str, List[float]]:
+    """
+    Menjalankan semua case (atau yang namanya mengandung `only`).
+    Mengembalikan latensi (ms) per case.
+    """
+    rng = random.Random(seed)
+    samples = {}
+    for name, fn in CASES:
+        if only and only not in name:
+            continue
+        for _ in range(warmup):
+            await fn(client, ds, rng)
+        samples[name] = [await fn(client, ds, rng) for _ in range(iterations)]
+    return samples
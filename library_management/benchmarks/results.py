@@ -0,0 +1,90 @@
+"""
+Hasil benchmark dalam JSON dan pembandingan dengan hasil sebelumnya (baseline).
+
+Format file:
+    {"meta": {...}, "metrics": {"<nama>": {"value": 1.23, "unit": "ms", "better": "lower"}}}
+"""
+from dataclasses import dataclass
+from typing import Dict, List
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+LOWER = "lower"    # Latensi: makin kecil makin baik
+HIGHER = "higher"  # Throughput: makin besar makin baik
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    if not samples_ms:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    p50, p95, p99 = np.percentile(np.asarray(samples_ms), [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+class BenchmarkResults:
+    def __init__(self, meta: dict = None):
+        self.meta = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            **(meta or {}),
+        }
+        self.metrics: Dict[str, dict] = {}
+
+    def add(self, name: str, value: float, unit: str, better: str = LOWER):
+        self.metrics[name] = {"value": round(float(value), 4), "unit": unit, "better": better}
+
+    def add_latencies(self, prefix: str, samples_ms: List[float]):
+        for key, value in percentiles(samples_ms).items():
+            self.add(f"{prefix}.{key}_ms", value, "ms")
+
+    def to_dict(self) -> dict:
+        return {"meta": self.meta, "metrics": self.metrics}
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+
+    @classmethod
+    def load(cls, path: str) -> "BenchmarkResults":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        results = cls(data.get("meta"))
+        results.metrics = data["metrics"]
+        return results
+
+
+@dataclass
+class Regression:
+    name: str
+    baseline: float
+    current: float
+    change: float  # Perubahan relatif ke arah yang lebih buruk (0.25 = 25% lebih buruk)
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.baseline:g} -> {self.current:g} ({self.change:+.0%})"
+
+
+def compare(current: BenchmarkResults, baseline: BenchmarkResults, threshold: float,
+            min_value: float = 0.05) -> List[Regression]:
+    """
+    Metrik yang memburuk lebih dari `threshold` (relatif) dibanding baseline.
+    Metrik yang hanya ada di salah satu hasil diabaikan. Nilai baseline di bawah
+    `min_value` juga diabaikan karena selisih kecil di sana hanya noise.
+    """
+    regressions = []
+    for name, metric in current.metrics.items():
+        old = baseline.metrics.get(name)
+        if old is None or abs(old["value"]) < min_value:
+            continue
+        before, after = old["value"], metric["value"]
+        if metric.get("better", LOWER) == LOWER:
+            change = (after - before) / before
+        else:
+            change = (before - after) / before
+        if change > threshold:
+            regressions.append(Regression(name, before, after, change))
+    return regressions
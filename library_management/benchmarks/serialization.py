@@ -0,0 +1,124 @@
+"""
+Benchmark serialisasi respons: biaya per item jalur `response_model` FastAPI dibanding
+mode respons cepat (`TypeAdapter.dump_json`, LIBRARY_FAST_RESPONSES).
+
+Dua pengukuran:
+- serializer: hanya langkah serialisasi (validasi ulang + jsonable_encoder + json.dumps
+  dibanding dump_json) untuk satu halaman item.
+- endpoint: request penuh lewat ASGI ke GET /books/, GET /loans/active-all, dan
+  GET /loans/my-loans (user dengan pinjaman aktif terbanyak; mode cepat memakai dict
+  `ActiveLoanRow`, bukan model per pinjaman).
+
+Jalankan dari direktori `library_management`:
+    python -m benchmarks.serialization --items 1000 --repeat 20
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app import config
+from app.main import app
+from app.routes.transactions import get_my_active_loans
+from app.schemas import ActiveLoanRow, User
+from app.serialization import adapter_for
+from app.storage import get_store
+
+from .asgi import asgi_client, auth, timed_request
+from .datagen import populate
+
+ROUTES = {
+    "books": "/books/",
+    "active_loans": "/loans/active-all",
+    "my_loans": "/loans/my-loans",
+}
+# Tipe yang diserialisasi mode cepat jika berbeda dari response_model route
+FAST_TYPES = {
+    "my_loans": List[ActiveLoanRow],
+}
+
+
+def _route(path: str) -> APIRoute:
+    return next(r for r in app.routes if isinstance(r, APIRoute) and r.path == path and "GET" in r.methods)
+
+
+async def bench_serializer(items, route: APIRoute, repeat: int, fast_type=None):
+    """
+    Mengembalikan (mikrodetik per item jalur response_model, mikrodetik per item dump_json).
+    """
+    adapter = adapter_for(fast_type or route.response_model)
+
+    async def model_path():
+        content = await serialize_response(field=route.secure_cloned_response_field, response_content=items)
+        return JSONResponse(content).body
+
+    def fast_path():
+        return adapter.dump_json(items)
+
+    assert adapter.validate_json(fast_path()) == adapter.validate_json(await model_path())
+    model_best = fast_best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await model_path()
+        model_best = min(model_best, time.perf_counter() - start)
+        start = time.perf_counter()
+        fast_path()
+        fast_best = min(fast_best, time.perf_counter() - start)
+    return model_best * 1e6 / len(items), fast_best * 1e6 / len(items)
+
+
+async def bench_endpoint(client, url: str, items: int, headers: dict, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        _, elapsed = await timed_request(client, "GET", url, params={"limit": items}, headers=headers)
+        best = min(best, elapsed)
+    return best * 1000 / items
+
+
+async def run(args):
+    ds = populate(args.books, args.users, args.loans, seed=args.seed)
+    store = get_store()
+    borrower = max(ds.active_loans, key=lambda user_id: len(ds.active_loans[user_id]))
+    headers = {"books": auth(ds.admin_id), "active_loans": auth(ds.admin_id), "my_loans": auth(borrower)}
+    pages = {
+        "books": store.list_books(limit=args.items),
+        "active_loans": store.list_active_loans(limit=args.items),
+        # Mode biasa: route mengembalikan dict yang sama dengan yang diserialisasi mode cepat
+        "my_loans": get_my_active_loans(User(id=borrower, role="mahasiswa"), store),
+    }
+
+    print(f"{'':<26}{'response_model':>16}{'dump_json':>12}{'speedup':>10}")
+    for name, url in ROUTES.items():
+        items = pages[name]
+        model_us, fast_us = await bench_serializer(items, _route(url), args.repeat, FAST_TYPES.get(name))
+        print(f"serializer {name:<15}{model_us:>13.2f} us{fast_us:>9.2f} us{model_us / fast_us:>9.1f}x")
+
+    async with asgi_client() as client:
+        for name, url in ROUTES.items():
+            count = len(pages[name])
+            results = []
+            for fast in (False, True):
+                config.FAST_RESPONSES = fast
+                await bench_endpoint(client, url, count, headers[name], 2)  # Pemanasan
+                results.append(await bench_endpoint(client, url, count, headers[name], args.repeat))
+            config.FAST_RESPONSES = False
+            print(f"endpoint   {name:<15}{results[0]:>13.2f} us{results[1]:>9.2f} us{results[0] / results[1]:>9.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000, help="Jumlah item per halaman (maks. 1000)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--loans", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Suite benchmark API pada ukuran data realistis: data sintetis dimuat ke `data_store`,
+lalu dijalankan micro-benchmark per endpoint dan uji beban campuran. Hasil ditulis
+ke JSON; jika `--baseline` diberikan, proses keluar dengan kode 1 bila ada metrik yang
+memburuk lebih dari `--threshold`.
+
+Jalankan dari direktori `library_management`:
+    python -m benchmarks.suite --books 100000 --users 20000 --loans 1000000 --output bench.json
+    python -m benchmarks.suite --output new.json --baseline bench.json --threshold 0.25
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from .asgi import asgi_client
+from .datagen import populate
+from .load import run_load
+from .micro import run_micro
+from .results import BenchmarkResults, HIGHER, compare
+
+
+async def run_suite(args) -> BenchmarkResults:
+    start = time.perf_counter()
+    ds = populate(args.books, args.users, args.loans, seed=args.seed)
+    print(f"Data: {args.books} buku, {args.users} user, {args.loans} pinjaman "
+          f"({time.perf_counter() - start:.1f} dtk)")
+
+    results = BenchmarkResults({
+        "books": args.books, "users": args.users, "loans": args.loans,
+        "iterations": args.iterations, "requests": args.requests, "concurrency": args.concurrency,
+    })
+    async with asgi_client() as client:
+        if args.iterations:
+            samples = await run_micro(client, ds, args.iterations, only=args.only)
+            for name, latencies in samples.items():
+                results.add_latencies(f"micro.{name}", latencies)
+        if args.requests:
+            load = await run_load(client, ds, args.requests, args.concurrency)
+            results.add("load.throughput_rps", load.throughput, "req/s", better=HIGHER)
+            results.add_latencies("load.all", [ms for samples in load.latencies.values() for ms in samples])
+            for op, latencies in load.latencies.items():
+                results.add_latencies(f"load.{op}", latencies)
+            results.meta["load_rejected_borrows"] = load.rejected
+    return results
+
+
+def print_results(results: BenchmarkResults):
+    width = max(len(name) for name in results.metrics) if results.metrics else 0
+    for name, metric in sorted(results.metrics.items()):
+        print(f"  {name:<{width}} {metric['value']:>10.3f} {metric['unit']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=50_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--loans", type=int, default=500_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=50, help="Request per endpoint (0 = lewati micro-benchmark)")
+    parser.add_argument("--only", default="", help="Hanya endpoint yang namanya mengandung teks ini")
+    parser.add_argument("--requests", type=int, default=5000, help="Total request uji beban (0 = lewati)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--output", help="File JSON hasil")
+    parser.add_argument("--baseline", help="File JSON hasil sebelumnya untuk dibandingkan")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Batas pemburukan relatif (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_suite(args))
+    print_results(results)
+    if args.output:
+        results.save(args.output)
+        print(f"Hasil ditulis ke {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, BenchmarkResults.load(args.baseline), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metrik memburuk lebih dari {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"Tidak ada metrik yang memburuk lebih dari {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+import random
+
+import pytest
+
+from app.analytics import CirculationStats, CountRanking
+from app.clock import ManualClock
+from app.data_store import BookCatalog, LoanRepository
+from app.schemas import BookCreate
+from app.storage import MemoryStore
+
+TODAY = date(2024, 1, 1)
+DUE = TODAY + timedelta(days=14)
+
+
+@pytest.fixture
+def store():
+    return MemoryStore(books=BookCatalog(), loans=LoanRepository())
+
+
+def test_count_ranking_matches_sorted_counts():
+    ranking = CountRanking()
+    counts = {}
+    rng = random.Random(7)
+    for _ in range(5000):
+        key = rng.randrange(50)
+        delta = rng.choice((1, 1, 1, -1, 3, -2))
+        ranking.add(key, delta)
+        counts[key] = max(counts.get(key, 0) + delta, 0)
+        if counts[key] == 0:
+            del counts[key]
+    assert len(ranking) == len(counts)
+    assert sorted(ranking.top(100)) == sorted(counts.items())
+    top = [count for _, count in ranking.top(10)]
+    assert top == sorted(counts.values(), reverse=True)[:10]
+
+
+def test_sliding_window_drops_expired_days(store):
+    clock = ManualClock(TODAY)
+    stats = CirculationStats(clock, window_days=7, retention_days=30)
+    stats.bind(store)
+    popular = store.add_book(BookCreate(title="Populer", author="A", stock=5))
+    other = store.add_book(BookCreate(title="Lain", author="B", stock=5))
+
+    for user_id in (101, 102, 103):
+        store.borrow(user_id, popular.id, TODAY, DUE)
+    clock.advance(3)
+    for user_id in (101, 102):
+        store.borrow(user_id, other.id, clock.today(), DUE)
+
+    assert [(book_id, count) for book_id, _, _, count in stats.top_books(2)] == [(popular.id, 3), (other.id, 2)]
+    assert stats.top_authors(1) == [("A", 3)]
+
+    # Peminjaman hari pertama keluar dari jendela 7 hari, tapi tetap ada di hitungan total
+    clock.advance(4)
+    assert stats.top_books(5)[0][0] == other.id
+    assert stats.top_authors(5) == [("B", 2)]
+    assert stats.top_authors(5, window=False) == [("A", 3), ("B", 2)]
+
+    # Judul dibaca dari storage saat ranking diminta, jadi perubahan buku langsung terlihat
+    store.update_book(popular.id, {"title": "Populer Edisi 2"})
+    assert stats.top_books(1, window=False)[0][1:3] == ("Populer Edisi 2", "A")
+
+
+def test_daily_counts_follow_returns_and_rollback(store):
+    clock = ManualClock(TODAY)
+    stats = CirculationStats(clock)
+    stats.bind(store)
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=5))
+    loan = store.borrow(101, book.id, TODAY, DUE)
+    clock.advance(1)
+    store.return_loan(loan.id, clock.today(), lambda l: 0)
+
+    with pytest.raises(RuntimeError):
+        with store.atomic([book.id]):
+            second = store.borrow(102, book.id, clock.today(), DUE)
+            store.return_loan(second.id, clock.today(), lambda l: 0)
+            raise RuntimeError("batal")
+
+    assert stats.daily(2) == [(TODAY, 1, 0), (clock.today(), 0, 1)]
+    assert stats.top_books(5) == [(book.id, "Buku", "Penulis", 1)]
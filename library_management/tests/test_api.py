@@ -1,11 +1,21 @@
 import pytest
 from fastapi.testclient import TestClient
 from datetime import date, timedelta
+import asyncio
+import json
 import uuid
 
 # Penting: import data_store secara langsung untuk memanipulasi data saat testing
-from app import data_store
+from app import config, data_store
+from app.cache import response_cache
+from app.analytics import circulation_stats
+from app.holds import hold_queue
+from app.changes import change_log
+from app.admission import admission_controller
+from app.idempotency import idempotency_cache
+from app.storage import get_store
 from app.main import app
+from app.routes import holds as holds_routes
 
 # Inisialisasi TestClient
 client = TestClient(app)
@@ -25,6 +35,13 @@ def setup_and_teardown():
     # Bersihkan data sebelum tes
     data_store.books_db.clear()
     data_store.loans_db.clear()
+    response_cache.clear()
+    circulation_stats.bind(get_store())
+    circulation_stats.clear()
+    hold_queue.clear()
+    change_log.bind(get_store())
+    admission_controller.reset()
+    idempotency_cache.clear()
     
     # Isi dengan data konsisten untuk testing
     test_book_id = uuid.UUID("12345678-1234-5678-1234-567812345678")
@@ -161,3 +178,629 @@ def test_cannot_extend_beyond_30_days():
     response = client.post(f"/extend/{loan.id}", headers=STUDENT_HEADERS)
     assert response.status_code == 400
     assert "Total durasi pinjam tidak boleh melebihi 30 hari" in response.json()["detail"]
+
+
+# ==================================
+#       TES DAFTAR PINJAMAN AKTIF
+# ==================================
+def test_my_loans_only_shows_active_loans():
+    book_id = list(data_store.books_db.keys())[0]
+    loan_id = client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS).json()["id"]
+
+    response = client.get("/loans/my-loans", headers=STUDENT_HEADERS)
+    assert response.status_code == 200
+    assert [loan["loan_id"] for loan in response.json()] == [loan_id]
+
+    client.post(f"/return/{loan_id}", headers=STUDENT_HEADERS)
+    response = client.get("/loans/my-loans", headers=STUDENT_HEADERS)
+    assert response.json() == []
+
+def test_admin_sees_all_active_loans():
+    book_id = list(data_store.books_db.keys())[0]
+    loan_id = client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS).json()["id"]
+
+    response = client.get("/loans/active-all", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert [loan["id"] for loan in response.json()] == [loan_id]
+
+    client.post(f"/return/{loan_id}", headers=STUDENT_HEADERS)
+    assert client.get("/loans/active-all", headers=ADMIN_HEADERS).json() == []
+
+def test_can_borrow_same_book_again_after_return():
+    book_id = list(data_store.books_db.keys())[0]
+    loan_id = client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS).json()["id"]
+    client.post(f"/return/{loan_id}", headers=STUDENT_HEADERS)
+
+    response = client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS)
+    assert response.status_code == 201
+    assert len(data_store.loans_db) == 2
+
+
+# ==================================
+#       TES REGISTRI PENGGUNA
+# ==================================
+def test_invalid_user_is_rejected():
+    response = client.get("/loans/my-loans", headers=INVALID_HEADERS)
+    assert response.status_code == 401
+
+def test_user_registry_loads_csv_and_reloads(tmp_path):
+    users_file = tmp_path / "users.csv"
+    users_file.write_text("id,role\n1,admin\n101,mahasiswa\n102,mahasiswa\n999,mahasiswa\n")
+    original_users = list(data_store.users_db)
+    try:
+        assert data_store.users_db.load_file(str(users_file)) == 4
+        assert client.get("/loans/my-loans", headers=INVALID_HEADERS).status_code == 200
+
+        users_file.write_text("id,role\n1,admin\n101,mahasiswa\n")
+        response = client.post("/users/reload", headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        assert response.json()["total_users"] == 2
+        assert client.get("/loans/my-loans", headers=INVALID_HEADERS).status_code == 401
+    finally:
+        data_store.users_db.replace_all(original_users)
+        data_store.users_db.source_path = None
+
+def test_user_registry_reload_rejects_invalid_rows(tmp_path):
+    users_file = tmp_path / "users.json"
+    users_file.write_text('[{"id": 1, "role": "admin"}, {"id": 101, "role": "mahasiswa"}]')
+    original_users = list(data_store.users_db)
+    try:
+        assert data_store.users_db.load_file(str(users_file)) == 2
+        for content in ('[{"id": 1, "role": null}]', '[{"id": 1, "role": 5}]', '{"id": 1, "role": "admin"}'):
+            users_file.write_text(content)
+            response = client.post("/users/reload", headers=ADMIN_HEADERS)
+            assert response.status_code == 400
+            assert len(data_store.users_db) == 2
+            assert data_store.users_db.get(101).role == "mahasiswa"
+    finally:
+        data_store.users_db.replace_all(original_users)
+        data_store.users_db.source_path = None
+
+def test_user_registry_loads_json(tmp_path):
+    users_file = tmp_path / "users.json"
+    users_file.write_text('[{"id": 5, "role": "admin"}, {"id": 6, "role": "mahasiswa"}]')
+    registry = data_store.UserRegistry()
+    assert registry.load_file(str(users_file)) == 2
+    assert registry.get(5).role == "admin"
+    assert registry.get(7) is None
+
+
+# ==================================
+#       TES PAGINATION & STREAMING
+# ==================================
+def _add_books(count, stock=1):
+    book_ids = []
+    for i in range(count):
+        book_id = uuid.uuid4()
+        data_store.books_db[book_id] = data_store.Book(id=book_id, title=f"Buku {i}", author="Penulis", stock=stock)
+        book_ids.append(book_id)
+    return book_ids
+
+def test_get_books_cursor_pagination_covers_all_books_in_order():
+    _add_books(6)
+    seen = []
+    after = None
+    while True:
+        params = {"limit": 3}
+        if after:
+            params["after"] = after
+        response = client.get("/books/", params=params)
+        assert response.status_code == 200
+        seen.extend(book["id"] for book in response.json())
+        after = response.headers.get("X-Next-Cursor")
+        if not after:
+            break
+    assert len(seen) == 7
+    assert seen == sorted(seen, key=uuid.UUID)
+
+def test_get_available_books_uses_stock_index():
+    test_book_id = list(data_store.books_db.keys())[0]
+    empty_ids = _add_books(2, stock=0)
+    response = client.get("/books/", params={"available_only": True})
+    assert [book["id"] for book in response.json()] == [str(test_book_id)]
+
+    # Setelah dipinjam stok habis, setelah dikembalikan tersedia lagi
+    loan_id = client.post(f"/borrow/{test_book_id}", headers=STUDENT_HEADERS).json()["id"]
+    assert client.get("/books/", params={"available_only": True}).json() == []
+    client.post(f"/return/{loan_id}", headers=STUDENT_HEADERS)
+    assert len(client.get("/books/", params={"available_only": True}).json()) == 1
+
+    # Update stok lewat admin juga memperbarui indeks
+    client.put(f"/books/{empty_ids[0]}", headers=ADMIN_HEADERS, json={"stock": 2})
+    assert len(client.get("/books/", params={"available_only": True}).json()) == 2
+
+def test_get_books_stream_ndjson():
+    _add_books(4)
+    response = client.get("/books/", params={"stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [line for line in response.text.splitlines() if line]
+    assert len(lines) == 5
+
+def test_active_loans_pagination():
+    for book_id in _add_books(3):
+        client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS)
+    first = client.get("/loans/active-all", headers=ADMIN_HEADERS, params={"limit": 2})
+    assert len(first.json()) == 2
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/loans/active-all", headers=ADMIN_HEADERS, params={"limit": 2, "after": cursor})
+    assert len(second.json()) == 1
+    assert "X-Next-Cursor" not in second.headers
+
+
+# ==================================
+#       TES RIWAYAT PINJAMAN
+# ==================================
+def test_loan_history_filters_paginates_and_exports():
+    first, second = _add_books(2)
+    returned_id = client.post(f"/borrow/{first}", headers=STUDENT_HEADERS).json()["id"]
+    client.post(f"/return/{returned_id}", headers=STUDENT_HEADERS)
+    active_id = client.post(f"/borrow/{second}", headers=STUDENT_HEADERS).json()["id"]
+    other_id = client.post(f"/borrow/{first}", headers={"X-User-ID": "102"}).json()["id"]
+
+    own = client.get("/loans/history", headers=STUDENT_HEADERS)
+    assert [loan["id"] for loan in own.json()] == [returned_id, active_id]
+    assert client.get("/loans/history", headers=STUDENT_HEADERS, params={"user_id": 102}).status_code == 403
+    returned = client.get("/loans/history", headers=STUDENT_HEADERS, params={"status": "returned", "sort_by": "return_date"})
+    assert [loan["id"] for loan in returned.json()] == [returned_id]
+
+    page = client.get("/loans/history", headers=ADMIN_HEADERS, params={"limit": 2, "start_date": date.today().isoformat()})
+    assert [loan["id"] for loan in page.json()] == [returned_id, active_id]
+    rest = client.get("/loans/history", headers=ADMIN_HEADERS, params={"limit": 2, "after": page.headers["X-Next-Cursor"]})
+    assert [loan["id"] for loan in rest.json()] == [other_id] and "X-Next-Cursor" not in rest.headers
+    assert client.get("/loans/history", headers=ADMIN_HEADERS, params={"after": "bukan-cursor"}).status_code == 400
+    assert client.get("/loans/history", headers=ADMIN_HEADERS, params={"end_date": "2000-01-01"}).json() == []
+
+    export = client.get("/loans/history", headers=ADMIN_HEADERS, params={"stream": True, "book_id": str(first)})
+    assert export.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["id"] for line in export.text.splitlines()] == [returned_id, other_id]
+
+
+# ==================================
+#       TES PENCARIAN BUKU
+# ==================================
+def test_search_books_by_title_prefix_and_author():
+    client.post("/books/", headers=ADMIN_HEADERS, json={"title": "Project Hail Mary", "author": "Andy Weir", "stock": 3})
+    client.post("/books/", headers=ADMIN_HEADERS, json={"title": "The Martian", "author": "Andy Weir", "stock": 1})
+
+    response = client.get("/books/search", params={"q": "proj"})
+    assert response.status_code == 200
+    assert [book["title"] for book in response.json()] == ["Project Hail Mary"]
+
+    response = client.get("/books/search", params={"q": "andy weir"})
+    assert response.headers["X-Total-Count"] == "2"
+
+    # Judul yang cocok diberi peringkat lebih tinggi daripada penulis
+    response = client.get("/books/search", params={"q": "weir martian"})
+    assert [book["title"] for book in response.json()] == ["The Martian"]
+
+def test_search_index_follows_update_and_delete():
+    book_id = list(data_store.books_db.keys())[0]
+    assert len(client.get("/books/search", params={"q": "testing"}).json()) == 1
+
+    client.put(f"/books/{book_id}", headers=ADMIN_HEADERS, json={"title": "Judul Baru"})
+    assert client.get("/books/search", params={"q": "testing"}).json() == []
+    assert len(client.get("/books/search", params={"q": "judul"}).json()) == 1
+
+    client.delete(f"/books/{book_id}", headers=ADMIN_HEADERS)
+    assert client.get("/books/search", params={"q": "judul"}).json() == []
+
+def test_search_normalizes_accents_and_case():
+    client.post("/books/", headers=ADMIN_HEADERS, json={"title": "Café Société", "author": "Zoë", "stock": 1})
+    assert len(client.get("/books/search", params={"q": "CAFE soc"}).json()) == 1
+
+
+# ==================================
+#       TES IMPOR BUKU MASSAL
+# ==================================
+def test_bulk_import_csv_reports_row_errors():
+    body = "title,author,stock\nBuku A,Penulis A,3\n,Tanpa Judul,1\nBuku B,Penulis B,-1\nBuku C,Penulis C,2\n"
+    response = client.post(
+        "/books/bulk",
+        headers={**ADMIN_HEADERS, "Content-Type": "text/csv"},
+        content=body,
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["total_rows"] == 4
+    assert result["imported"] == 2
+    assert [error["line"] for error in result["errors"]] == [3, 4]
+    assert len(data_store.books_db) == 3
+
+def test_bulk_import_reports_invalid_utf8_row():
+    body = b"title,author,stock\nBuku A,Penulis A,1\nBuku \xff\xfe,Penulis B,1\nBuku C,Penulis C,1\n"
+    response = client.post(
+        "/books/bulk",
+        headers={**ADMIN_HEADERS, "Content-Type": "text/csv"},
+        content=body,
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["total_rows"] == 3
+    assert result["imported"] == 2
+    assert [error["line"] for error in result["errors"]] == [3]
+    assert "utf-8" in result["errors"][0]["detail"]
+
+def test_bulk_import_ndjson_dry_run_does_not_save():
+    body = '{"title": "Buku A", "author": "A", "stock": 1}\n{"title": "Buku B", "author": "B", "stock": 2}\nbukan json\n'
+    response = client.post(
+        "/books/bulk",
+        headers={**ADMIN_HEADERS, "Content-Type": "application/x-ndjson"},
+        params={"dry_run": True},
+        content=body,
+    )
+    result = response.json()
+    assert result["imported"] == 2
+    assert result["failed"] == 1
+    assert result["dry_run"] is True
+    assert len(data_store.books_db) == 1
+
+def test_bulk_import_requires_admin_and_known_format():
+    response = client.post("/books/bulk", headers={**STUDENT_HEADERS, "Content-Type": "text/csv"}, content="title\n")
+    assert response.status_code == 403
+    response = client.post("/books/bulk", headers={**ADMIN_HEADERS, "Content-Type": "text/plain"}, content="x")
+    assert response.status_code == 415
+
+
+# ==================================
+#       TES TRANSAKSI BATCH
+# ==================================
+def test_batch_runs_each_operation_independently():
+    book_id = list(data_store.books_db.keys())[0]
+    other_id = _add_books(1)[0]
+    loan_id = client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS).json()["id"]
+
+    response = client.post("/transactions/batch", headers=STUDENT_HEADERS, json={"operations": [
+        {"action": "return", "loan_id": loan_id},
+        {"action": "borrow", "book_id": str(other_id)},
+        {"action": "borrow", "book_id": str(uuid.uuid4())},
+    ]})
+    assert response.status_code == 200
+    result = response.json()
+    assert [item["status"] for item in result["results"]] == ["ok", "ok", "error"]
+    assert result["results"][2]["status_code"] == 404
+    assert result["succeeded"] == 2 and result["failed"] == 1
+    assert data_store.books_db[book_id].stock == 1
+    assert data_store.books_db[other_id].stock == 0
+
+def test_atomic_batch_rolls_back_on_failure():
+    book_id = list(data_store.books_db.keys())[0]
+    other_id = _add_books(1)[0]
+    loan_id = client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS).json()["id"]
+
+    response = client.post("/transactions/batch", headers=STUDENT_HEADERS, json={"atomic": True, "operations": [
+        {"action": "extend", "loan_id": loan_id},
+        {"action": "return", "loan_id": loan_id},
+        {"action": "borrow", "book_id": str(other_id)},
+        {"action": "borrow", "book_id": str(other_id)},  # Gagal: pinjaman ganda
+        {"action": "borrow", "book_id": str(book_id)},
+    ]})
+    result = response.json()
+    assert result["rolled_back"] is True
+    assert [item["status"] for item in result["results"]] == ["rolled_back", "rolled_back", "rolled_back", "error", "skipped"]
+
+    # Semua perubahan dibatalkan
+    assert data_store.books_db[book_id].stock == 0
+    assert data_store.books_db[other_id].stock == 1
+    loan = data_store.loans_db.get(uuid.UUID(loan_id))
+    assert loan.return_date is None and loan.extended is False
+    assert len(data_store.loans_db) == 1
+    assert [l["loan_id"] for l in client.get("/loans/my-loans", headers=STUDENT_HEADERS).json()] == [loan_id]
+
+def test_batch_validates_operation_targets():
+    response = client.post("/transactions/batch", headers=STUDENT_HEADERS, json={"operations": [{"action": "return"}]})
+    assert response.status_code == 422
+
+
+# ==================================
+#       TES CACHE RESPONS (ETAG)
+# ==================================
+def test_book_detail_etag_and_not_modified():
+    book_id = list(data_store.books_db.keys())[0]
+    first = client.get(f"/books/{book_id}")
+    assert first.status_code == 200
+    assert first.json()["title"] == "Buku untuk Testing"
+    etag = first.headers["ETag"]
+
+    second = client.get(f"/books/{book_id}", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+
+    # Buku yang tidak ada tetap 404 dan tidak disimpan di cache
+    assert client.get(f"/books/{uuid.uuid4()}").status_code == 404
+
+def test_catalog_cache_invalidated_by_changes():
+    book_id = list(data_store.books_db.keys())[0]
+    listing = client.get("/books/", params={"available_only": True})
+    detail = client.get(f"/books/{book_id}")
+    list_etag, detail_etag = listing.headers["ETag"], detail.headers["ETag"]
+
+    # Peminjaman mengubah stok: ETag lama tidak cocok lagi
+    loan_id = client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS).json()["id"]
+    listing = client.get("/books/", params={"available_only": True}, headers={"If-None-Match": list_etag})
+    assert listing.status_code == 200 and listing.json() == []
+    detail = client.get(f"/books/{book_id}", headers={"If-None-Match": detail_etag})
+    assert detail.status_code == 200 and detail.json()["stock"] == 0
+
+    client.post(f"/return/{loan_id}", headers=STUDENT_HEADERS)
+    assert client.get(f"/books/{book_id}").json()["stock"] == 1
+
+    client.put(f"/books/{book_id}", headers=ADMIN_HEADERS, json={"title": "Judul Baru"})
+    assert client.get("/books/").json()[0]["title"] == "Judul Baru"
+
+    client.post("/books/", headers=ADMIN_HEADERS, json={"title": "Buku Lain", "author": "Admin", "stock": 1})
+    assert len(client.get("/books/").json()) == 2
+
+    client.delete(f"/books/{book_id}", headers=ADMIN_HEADERS)
+    assert client.get(f"/books/{book_id}").status_code == 404
+    assert len(client.get("/books/").json()) == 1
+
+def test_response_cache_evicts_least_recently_used():
+    from app.cache import ResponseCache
+    cache = ResponseCache(max_bytes=10, max_entries=2, enabled=True)
+    version = cache.version
+    cache.put("a", version, b"1234")
+    cache.put("b", version, b"1234")
+    cache.get("a")
+    cache.put("c", version, b"1234")
+    assert cache.get("b") is None and cache.get("a") is not None
+    cache.put("d", version, b"12345678")
+    assert len(cache) == 1 and cache.size_bytes == 8
+
+
+# ==================================
+#       TES LAPORAN DENDA
+# ==================================
+def test_fine_report_endpoints():
+    book_id = list(data_store.books_db.keys())[0]
+    other_id = _add_books(1)[0]
+    client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS)
+    client.post(f"/borrow/{other_id}", headers={"X-User-ID": "102"})
+    # Pinjaman user 101 dibuat terlambat 5 hari
+    data_store.loans_db[0].due_date = date.today() - timedelta(days=5)
+
+    summary = client.get("/fines/summary", headers=ADMIN_HEADERS).json()
+    assert summary["active_loans"] == 2
+    assert summary["overdue_loans"] == 1
+    assert summary["outstanding_fine"] == 5000
+
+    response = client.get("/fines/overdue", headers=ADMIN_HEADERS)
+    assert response.headers["X-Total-Count"] == "1"
+    assert response.json()[0]["days_overdue"] == 5
+    assert response.json()[0]["user_id"] == 101
+
+    # Tanggal laporan bisa dimajukan untuk melihat denda di masa depan
+    later = (date.today() + timedelta(days=16)).isoformat()  # 2 hari setelah jatuh tempo
+    users = client.get("/fines/users", headers=ADMIN_HEADERS, params={"as_of": later}).json()
+    assert [u["user_id"] for u in users] == [101, 102]
+    assert client.get("/fines/users/102", headers=ADMIN_HEADERS, params={"as_of": later}).json()["outstanding_fine"] == 2000
+
+    assert client.get("/fines/summary", headers=STUDENT_HEADERS).status_code == 403
+
+
+# ==================================
+#       TES STATISTIK SIRKULASI
+# ==================================
+def test_circulation_stats_endpoints():
+    book_id = client.post("/books/", headers=ADMIN_HEADERS,
+                          json={"title": "Laris", "author": "Populer", "stock": 3}).json()["id"]
+    for user_id in ("101", "102"):
+        client.post(f"/borrow/{book_id}", headers={"X-User-ID": user_id})
+    loan_id = client.get("/loans/my-loans", headers=STUDENT_HEADERS).json()[0]["loan_id"]
+    client.post(f"/return/{loan_id}", headers=STUDENT_HEADERS)
+
+    top = client.get("/stats/top-books", headers=ADMIN_HEADERS, params={"limit": 1}).json()
+    assert top == [{"book_id": book_id, "title": "Laris", "author": "Populer", "borrows": 2}]
+    authors = client.get("/stats/top-authors", headers=ADMIN_HEADERS, params={"window": "all"}).json()
+    assert authors == [{"author": "Populer", "borrows": 2}]
+
+    daily = client.get("/stats/daily", headers=ADMIN_HEADERS, params={"days": 3}).json()
+    assert len(daily) == 3
+    assert daily[-1] == {"day": date.today().isoformat(), "borrows": 2, "returns": 1}
+
+    assert client.get("/stats/top-books", headers=STUDENT_HEADERS).status_code == 403
+
+
+def test_circulation_stats_are_disabled_with_multiple_workers(monkeypatch):
+    monkeypatch.setattr(config, "WORKERS", 2)
+    assert client.get("/stats/top-books", headers=ADMIN_HEADERS).status_code == 501
+    assert client.get("/stats/daily", headers=ADMIN_HEADERS).status_code == 501
+
+
+# ==================================
+#     TES ANTREAN RESERVASI (HOLD)
+# ==================================
+def test_hold_queue_hands_returned_copy_to_next_student():
+    book_id = "12345678-1234-5678-1234-567812345678"
+    other_headers = {"X-User-ID": "102"}
+    loan_id = client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS).json()["id"]
+
+    assert client.post(f"/holds/{book_id}", headers=STUDENT_HEADERS).status_code == 400
+    response = client.post(f"/holds/{book_id}", headers=other_headers)
+    assert response.status_code == 201
+    assert response.json()["status"] == "waiting" and response.json()["position"] == 1
+    # Long-poll tanpa perubahan kembali setelah timeout dengan status yang sama
+    assert client.get(f"/holds/{book_id}/wait", headers=other_headers, params={"timeout": 0}).json()["status"] == "waiting"
+
+    client.post(f"/return/{loan_id}", headers=STUDENT_HEADERS)
+    # Salinan disimpan untuk 102: tetap dihitung di stok katalog, tetapi user lain
+    # (juga lewat batch) tidak bisa meminjamnya
+    assert client.get(f"/books/{book_id}").json()["stock"] == 1
+    assert client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS).status_code == 400
+    batch = client.post("/transactions/batch", headers=STUDENT_HEADERS,
+                        json={"operations": [{"action": "borrow", "book_id": book_id}]}).json()
+    assert batch["results"][0]["status_code"] == 400
+    hold = client.get(f"/holds/{book_id}/wait", headers=other_headers).json()
+    assert hold["status"] == "ready" and hold["expires_at"] is not None
+
+    assert client.post(f"/borrow/{book_id}", headers=other_headers).status_code == 201
+    assert client.get("/holds/my-holds", headers=other_headers).json() == []
+    assert client.delete(f"/holds/{book_id}", headers=other_headers).status_code == 404
+
+
+def test_holds_are_disabled_with_multiple_workers(monkeypatch):
+    monkeypatch.setattr(config, "WORKERS", 2)
+    book_id = "12345678-1234-5678-1234-567812345678"
+    assert client.post(f"/holds/{book_id}", headers=STUDENT_HEADERS).status_code == 501
+    assert client.get("/holds/my-holds", headers=STUDENT_HEADERS).status_code == 501
+
+
+def test_hold_events_stream_pushes_status_changes():
+    book_id = uuid.UUID("12345678-1234-5678-1234-567812345678")
+    loan_id = client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS).json()["id"]
+    client.post(f"/holds/{book_id}", headers={"X-User-ID": "102"})
+
+    async def read_events():
+        # Stream SSE tidak pernah selesai selama hold berjalan, jadi dibaca langsung dari endpoint
+        response = await holds_routes.stream_hold_events(book_id, data_store.users_db.get(102))
+        events = response.body_iterator
+        first = await events.__anext__()
+        await asyncio.to_thread(client.post, f"/return/{loan_id}", headers=STUDENT_HEADERS)
+        second = await events.__anext__()
+        await asyncio.to_thread(client.delete, f"/holds/{book_id}", headers={"X-User-ID": "102"})
+        third = await events.__anext__()
+        rest = [event async for event in events]
+        return first, second, third, rest
+
+    first, second, third, rest = asyncio.run(read_events())
+    assert first.startswith("event: hold") and '"status":"waiting"' in first
+    assert '"status":"ready"' in second
+    assert '"status":"cancelled"' in third
+    assert rest == []
+    # Salinan yang dilepas kembali ke stok
+    assert client.get(f"/books/{book_id}").json()["stock"] == 1
+
+
+# ==================================
+#        TES CHANGE FEED
+# ==================================
+def test_change_feed_returns_deltas_since_cursor():
+    book_id = "12345678-1234-5678-1234-567812345678"
+    first = client.get("/changes").json()
+    assert first["resync_required"] is True and first["changes"] == []
+    cursor, epoch = first["next"], first["epoch"]
+
+    client.put(f"/books/{book_id}", headers=ADMIN_HEADERS, json={"stock": 2})
+    client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS)
+
+    public = client.get("/changes", params={"since": cursor, "epoch": epoch}).json()
+    assert public["resync_required"] is False and public["has_more"] is False
+    assert [(c["entity"], c["book"]["stock"]) for c in public["changes"]] == [("book", 2), ("book", 1)]
+    admin = client.get("/changes", headers=ADMIN_HEADERS, params={"since": cursor, "epoch": epoch}).json()
+    assert [c["entity"] for c in admin["changes"]] == ["book", "loan", "book"]
+    assert admin["changes"][1]["loan"]["user_id"] == 101
+
+    page = client.get("/changes", params={"since": cursor, "limit": 1}).json()
+    assert page["next"] == cursor + 1 and page["has_more"] is True
+    assert client.get("/changes", params={"since": public["next"], "epoch": "lama"}).json()["resync_required"] is True
+
+
+# ==================================
+#       TES IDEMPOTENCY-KEY
+# ==================================
+def test_idempotency_key_replays_first_response():
+    book_id = "12345678-1234-5678-1234-567812345678"
+    headers = {**STUDENT_HEADERS, "Idempotency-Key": "pinjam-1"}
+    first = client.post(f"/borrow/{book_id}", headers=headers)
+    retry = client.post(f"/borrow/{book_id}", headers=headers)
+    assert first.status_code == retry.status_code == 201
+    assert retry.content == first.content and retry.headers["Idempotent-Replayed"] == "true"
+    # Tanpa key, request ulang diproses lagi dan ditolak
+    assert client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS).status_code == 400
+    # Key yang sama untuk request lain ditolak
+    assert client.post(f"/return/{first.json()['id']}", headers=headers).status_code == 422
+
+    admin_headers = {**ADMIN_HEADERS, "Idempotency-Key": "buku-1"}
+    body = {"title": "Buku Idempoten", "author": "Admin", "stock": 1}
+    assert client.post("/books/", headers=admin_headers, json=body).json() == \
+        client.post("/books/", headers=admin_headers, json=body).json()
+    assert sum(1 for book in client.get("/books/").json() if book["title"] == "Buku Idempoten") == 1
+
+
+# ==================================
+#       TES MODE RESPONS CEPAT
+# ==================================
+def test_fast_responses_match_normal_mode(monkeypatch):
+    book_id = "12345678-1234-5678-1234-567812345678"
+    client.post("/books/", headers=ADMIN_HEADERS, json={"title": "Buku Kedua", "author": "Tester", "stock": 3})
+    loan = client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS).json()
+    reads = [
+        ("/books/", {"limit": 1}, {}),
+        ("/books/search", {"q": "buku"}, {}),
+        ("/loans/my-loans", {}, STUDENT_HEADERS),
+        ("/loans/active-all", {"limit": 10}, ADMIN_HEADERS),
+    ]
+    normal = [client.get(path, params=params, headers=headers) for path, params, headers in reads]
+    schema = client.get("/openapi.json").json()
+
+    monkeypatch.setattr(config, "FAST_RESPONSES", True)
+    for (path, params, headers), expected in zip(reads, normal):
+        fast = client.get(path, params=params, headers=headers)
+        assert fast.status_code == expected.status_code and fast.json() == expected.json()
+        for name in ("X-Next-Cursor", "X-Total-Count"):
+            assert fast.headers.get(name) == expected.headers.get(name)
+    assert client.get("/openapi.json").json() == schema
+
+    extended = client.post(f"/extend/{loan['id']}", headers=STUDENT_HEADERS)
+    assert extended.status_code == 200 and extended.json()["extended"] is True
+    returned = client.post(f"/return/{loan['id']}", headers=STUDENT_HEADERS)
+    assert returned.json() == {"message": "Buku berhasil dikembalikan.", "loan_id": loan["id"], "fine_charged": 0}
+    borrowed = client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS)
+    assert borrowed.status_code == 201 and set(borrowed.json()) == set(loan)
+
+
+# ==================================
+#       TES METRIK (/metrics)
+# ==================================
+def test_metrics_endpoint_reports_routes_and_store_gauges():
+    book_id = list(data_store.books_db.keys())[0]
+    client.get(f"/books/{book_id}")
+    client.post(f"/borrow/{book_id}", headers=STUDENT_HEADERS)
+    client.get("/loans/my-loans", headers=STUDENT_HEADERS)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    # Route dicatat sebagai template path, bukan URL asli
+    assert 'library_http_requests_total{method="GET",route="/books/{book_id}",status="200"}' in text
+    assert 'library_http_request_duration_seconds_bucket{method="POST",route="/borrow/{book_id}",le="+Inf"}' in text
+    assert "library_books 1" in text
+    assert "library_loans_active 1" in text
+    assert 'library_store_loan_lookup_duration_seconds_count{operation="active_loans_for_user"}' in text
+    assert "library_threadpool_queue_depth" in text
+
+
+# ==================================
+#       TES PROFILING REQUEST
+# ==================================
+def test_admin_can_profile_single_request(tmp_path):
+    import pstats
+    from app.profiling import ProfilingMiddleware, request_profiler
+
+    request_profiler.directory = str(tmp_path)
+    book_id = list(data_store.books_db.keys())[0]
+    # Profiling nonaktif (default): middleware tidak dipasang, header diabaikan
+    client.get(f"/books/{book_id}", headers={**ADMIN_HEADERS, "X-Profile": "1"})
+    assert all(trace.path != f"/books/{book_id}" for trace in request_profiler.slowest(100))
+
+    # Seperti aplikasi dengan LIBRARY_PROFILING_ENABLED=1
+    profiled = TestClient(ProfilingMiddleware(app, request_profiler))
+    # Header dari non-admin diabaikan
+    profiled.get(f"/books/{book_id}", headers={**STUDENT_HEADERS, "X-Profile": "1"})
+    assert all(trace.path != f"/books/{book_id}" for trace in request_profiler.slowest(100))
+
+    profiled.get(f"/books/{book_id}", headers={**ADMIN_HEADERS, "X-Profile": "1"})
+    traces = client.get("/profiles/slowest", headers=ADMIN_HEADERS).json()
+    trace = next(t for t in traces if t["path"] == f"/books/{book_id}")
+    assert trace["reasons"] == ["header"] and "pstats" in trace["files"]
+
+    response = client.get(f"/profiles/{trace['id']}/pstats", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    path = tmp_path / "downloaded.pstats"
+    path.write_bytes(response.content)
+    # cProfile mencatat kode di thread event loop, misalnya middleware aplikasi
+    functions = {(func[0].rsplit("/", 1)[-1], func[2]) for func in pstats.Stats(str(path)).stats}
+    assert ("idempotency.py", "__call__") in functions
+
+    assert client.get("/profiles/slowest", headers=STUDENT_HEADERS).status_code == 403
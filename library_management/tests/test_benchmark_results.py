@@ -0,0 +1,25 @@
+from benchmarks.results import BenchmarkResults, HIGHER, compare, percentiles
+
+
+def _results(latency, throughput):
+    results = BenchmarkResults()
+    results.add("micro.GET /books.p50_ms", latency, "ms")
+    results.add("load.throughput_rps", throughput, "req/s", better=HIGHER)
+    return results
+
+
+def test_compare_flags_regressions_beyond_threshold(tmp_path):
+    path = tmp_path / "baseline.json"
+    _results(1.0, 1000).save(str(path))
+    baseline = BenchmarkResults.load(str(path))
+
+    assert compare(_results(1.1, 950), baseline, threshold=0.2) == []
+    regressions = compare(_results(1.5, 700), baseline, threshold=0.2)
+    assert sorted(r.name for r in regressions) == ["load.throughput_rps", "micro.GET /books.p50_ms"]
+    # Metrik yang membaik tidak pernah dianggap regresi
+    assert compare(_results(0.2, 5000), baseline, threshold=0.0) == []
+
+
+def test_percentiles():
+    values = percentiles([float(i) for i in range(1, 101)])
+    assert values["p50"] == 50.5 and values["p99"] > values["p95"] > values["p50"]
@@ -0,0 +1,94 @@
+from datetime import date, timedelta
+
+from app.changes import ChangeLog, ENTITY_BOOK, ENTITY_LOAN, OP_UPSERT, OP_DELETE
+from app.data_store import BookCatalog, LoanRepository
+from app.schemas import BookCreate
+from app.storage import MemoryStore, SQLiteStore
+from app.storage.base import StoreEvent, EXTERNAL_CHANGE
+
+TODAY = date(2024, 1, 1)
+DUE = TODAY + timedelta(days=14)
+
+
+def _store():
+    return MemoryStore(books=BookCatalog(), loans=LoanRepository())
+
+
+def test_changes_are_numbered_and_include_stock_updates():
+    store, log = _store(), ChangeLog(size=100)
+    log.bind(store)
+    start = log.seq
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=1))
+    loan = store.borrow(101, book.id, TODAY, DUE)
+    store.delete_book(book.id)
+
+    resync, changes, cursor = log.since(start, 100)
+    assert not resync and cursor == log.seq
+    assert [(c.entity, c.op) for c in changes] == [
+        (ENTITY_BOOK, OP_UPSERT), (ENTITY_LOAN, OP_UPSERT), (ENTITY_BOOK, OP_UPSERT), (ENTITY_BOOK, OP_DELETE),
+    ]
+    assert [c.seq for c in changes] == list(range(start + 1, start + 5))
+    assert changes[1].data.id == loan.id
+    # Salinan data saat perubahan terjadi, bukan objek yang terus berubah
+    assert (changes[0].data.stock, changes[2].data.stock) == (1, 0)
+
+    # Membaca sebagian lalu melanjutkan dari cursor
+    _, first, cursor = log.since(start, 2)
+    _, rest, _ = log.since(cursor, 100)
+    assert [c.seq for c in first + rest] == [c.seq for c in changes]
+
+
+def test_cursor_outside_buffer_requires_resync():
+    store, log = _store(), ChangeLog(size=4)
+    log.bind(store)
+    start = log.seq
+    for i in range(6):
+        store.add_book(BookCreate(title=f"Buku {i}", author="Penulis", stock=1))
+
+    assert log.since(start, 10)[0] is True
+    assert log.since(log.seq - 4, 10)[0] is False
+    assert log.since(log.seq + 1, 10)[0] is True  # Cursor dari proses sebelum restart
+
+    cursor = log.seq
+    log.on_store_event(StoreEvent(EXTERNAL_CHANGE, None))
+    resync, changes, next_cursor = log.since(cursor, 10)
+    assert resync and changes == [] and next_cursor == log.seq
+    assert log.since(next_cursor, 10) == (False, [], next_cursor)
+
+
+def test_shared_feed_is_the_same_for_every_worker(tmp_path):
+    # Dua SQLiteStore pada file yang sama mensimulasikan dua worker, masing-masing dengan ChangeLog sendiri
+    path = str(tmp_path / "library.db")
+    worker_a, worker_b = (SQLiteStore(path, shared=True, change_log_size=1024) for _ in range(2))
+    log_a, log_b = ChangeLog(), ChangeLog()
+    log_a.bind(worker_a)
+    log_b.bind(worker_b)
+    try:
+        start = log_a.read(0, None, 1)
+        book = worker_a.add_book(BookCreate(title="Buku", author="Penulis", stock=1))
+        loan = worker_b.borrow(101, book.id, TODAY, DUE)
+        worker_a.delete_book(book.id)
+
+        # Cursor dan epoch dari worker A tetap berlaku di worker B
+        page = log_b.read(start.next, start.epoch, 100)
+        assert not page.resync_required and page.epoch == start.epoch
+        assert [(c.entity, c.op) for c in page.changes] == [(ENTITY_LOAN, OP_UPSERT), (ENTITY_BOOK, OP_DELETE)]
+        assert page.changes[0].data.id == loan.id
+        # Membaca per satu nomor urut lalu melanjutkan dari cursor menghasilkan perubahan yang sama
+        cursor, paged = start.next, []
+        while True:
+            part = (log_a, log_b)[cursor % 2].read(cursor, page.epoch, 1)
+            paged += part.changes
+            cursor = part.next
+            if not part.has_more:
+                break
+        assert paged == page.changes and cursor == page.next
+        assert log_a.read(page.next, page.epoch, 100) == (page.epoch, False, [], page.next, False)
+
+        # Epoch lain atau cursor yang sudah dipangkas memerlukan resync
+        assert log_a.read(page.next, "lain", 100).resync_required
+        worker_a.add_books([BookCreate(title=f"Buku {i}", author="Penulis", stock=1) for i in range(3000)])
+        assert log_b.read(page.next, page.epoch, 100).resync_required
+    finally:
+        worker_a.close()
+        worker_b.close()
@@ -0,0 +1,162 @@
+from datetime import date, timedelta
+import asyncio
+
+import pytest
+
+from app.clock import ManualClock
+from app.data_store import BookCatalog, LoanRepository
+from app.holds import HoldQueue, BookAvailableError, AlreadyQueuedError, WAITING, READY, EXPIRED, FULFILLED
+from app.schemas import BookCreate
+from app.storage import MemoryStore, SQLiteStore, OutOfStockError, DuplicateLoanError
+
+TODAY = date(2024, 1, 1)
+DUE = TODAY + timedelta(days=14)
+
+
+@pytest.fixture
+def store():
+    return MemoryStore(books=BookCatalog(), loans=LoanRepository())
+
+
+def _return(store, holds, loan):
+    with store.atomic([loan.book_id]):
+        store.return_loan(loan.id, TODAY, lambda l: 0)
+        return holds.hand_off(store, loan.book_id)
+
+
+def test_returned_copy_goes_to_queue_in_order_and_expires(store):
+    book = store.add_book(BookCreate(title="Klara and the Sun", author="Kazuo Ishiguro", stock=1))
+    clock = ManualClock(TODAY)
+    holds = HoldQueue(clock=clock, window_hours=24)
+    loan = store.borrow(101, book.id, TODAY, DUE)
+
+    holds.join(store, book.id, 102)
+    holds.join(store, book.id, 103)
+    with pytest.raises(AlreadyQueuedError):
+        holds.join(store, book.id, 102)
+    assert [holds.position(book.id, user) for user in (102, 103)] == [1, 2]
+
+    # Salinan yang dikembalikan disimpan untuk 102: tetap dihitung di stok storage,
+    # tetapi tercatat sebagai salinan yang disimpan
+    assert _return(store, holds, loan).user_id == 102
+    assert store.get_book(book.id).stock == 1
+    assert holds.held(book.id) == 1
+    assert holds.get(book.id, 102).status == READY
+    assert holds.position(book.id, 103) == 1
+
+    # 103 belum mendapat giliran
+    with pytest.raises(OutOfStockError):
+        with holds.claim(store, book.id, 103):
+            store.borrow(103, book.id, TODAY, DUE)
+    assert holds.get(book.id, 103).status == WAITING
+
+    # Hold 102 kedaluwarsa dan salinannya pindah ke 103
+    clock.advance(0, hours=25)
+    assert holds.expire(store) == 1
+    assert holds.get(book.id, 102) is None
+    assert holds.get(book.id, 103).status == READY
+
+    with holds.claim(store, book.id, 103) as hold:
+        assert hold.status == READY
+        store.borrow(103, book.id, TODAY, DUE)
+    assert holds.get(book.id, 103) is None
+    assert store.get_book(book.id).stock == 0
+    assert holds.held(book.id) == 0
+    assert len(holds) == 0
+
+
+def test_cancelled_ready_hold_returns_copy_to_stock(store):
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=1))
+    holds = HoldQueue(clock=ManualClock(TODAY))
+    loan = store.borrow(101, book.id, TODAY, DUE)
+    holds.join(store, book.id, 102)
+    _return(store, holds, loan)
+
+    holds.leave(store, book.id, 102)
+    assert store.get_book(book.id).stock == 1
+    assert holds.held(book.id) == 0
+    with pytest.raises(BookAvailableError):
+        holds.join(store, book.id, 103)
+
+
+def test_failed_claim_keeps_copy_reserved(store):
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=2))
+    holds = HoldQueue(clock=ManualClock(TODAY))
+    first = store.borrow(101, book.id, TODAY, DUE)
+    store.borrow(102, book.id, TODAY, DUE)
+    holds.join(store, book.id, 102)  # Pinjaman ganda hanya ditolak router, bukan antrean
+    _return(store, holds, first)
+
+    with pytest.raises(DuplicateLoanError):
+        with holds.claim(store, book.id, 102):
+            store.borrow(102, book.id, TODAY, DUE)
+    assert store.get_book(book.id).stock == 1
+    assert holds.held(book.id) == 1
+    assert holds.get(book.id, 102).status == READY
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_rolled_back_transaction_restores_holds(backend, tmp_path):
+    # Seperti batch atomik: claim/hand-off di dalam transaksi yang kemudian gagal
+    if backend == "memory":
+        store = MemoryStore(books=BookCatalog(), loans=LoanRepository())
+    else:
+        store = SQLiteStore(str(tmp_path / "library.db"))
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=1))
+    holds = HoldQueue(clock=ManualClock(TODAY))
+    loan = store.borrow(101, book.id, TODAY, DUE)
+    holds.join(store, book.id, 102)
+    holds.join(store, book.id, 103)
+
+    with pytest.raises(RuntimeError):
+        with store.atomic([book.id]):
+            _return(store, holds, loan)
+            raise RuntimeError("operasi berikutnya gagal")
+    assert holds.held(book.id) == 0
+    assert holds.get(book.id, 102).status == WAITING
+    assert holds.position(book.id, 102) == 1
+
+    _return(store, holds, loan)
+    with pytest.raises(RuntimeError):
+        with store.atomic([book.id]):
+            with holds.claim(store, book.id, 102):
+                store.borrow(102, book.id, TODAY, DUE)
+            with holds.claim(store, book.id, 103):
+                pass
+            raise RuntimeError("operasi berikutnya gagal")
+    assert store.get_book(book.id).stock == 1
+    assert holds.held(book.id) == 1
+    assert holds.get(book.id, 102).status == READY
+    assert holds.position(book.id, 103) == 1
+    with pytest.raises(OutOfStockError):
+        with holds.claim(store, book.id, 101):
+            store.borrow(101, book.id, TODAY, DUE)
+    store.close()
+
+
+def test_held_copy_is_not_lost_when_queue_state_is_lost(store):
+    # Antrean hanya ada di memori; setelah restart (antrean baru) salinan langsung tersedia
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=1))
+    holds = HoldQueue(clock=ManualClock(TODAY))
+    loan = store.borrow(101, book.id, TODAY, DUE)
+    holds.join(store, book.id, 102)
+    _return(store, holds, loan)
+
+    restarted = HoldQueue(clock=ManualClock(TODAY))
+    with restarted.claim(store, book.id, 103):
+        store.borrow(103, book.id, TODAY, DUE)
+    assert store.get_book(book.id).stock == 0
+
+
+def test_watchers_are_notified_from_other_threads(store):
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=1))
+    holds = HoldQueue(clock=ManualClock(TODAY))
+    loan = store.borrow(101, book.id, TODAY, DUE)
+    holds.join(store, book.id, 102)
+
+    async def wait_for_copy():
+        with holds.watch(book.id, 102) as updates:
+            await asyncio.to_thread(_return, store, holds, loan)
+            return await asyncio.wait_for(updates.get(), 1)
+
+    assert asyncio.run(wait_for_copy()).status == READY
@@ -0,0 +1,108 @@
+import asyncio
+import itertools
+
+from app.idempotency import IdempotencyCache, IdempotencyMiddleware, SharedIdempotencyStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _handler(calls, delay=0.0, status=200):
+    counter = itertools.count(1)
+
+    async def app(scope, receive, send):
+        await receive()
+        calls.append(scope["path"])
+        if delay:
+            await asyncio.sleep(delay)
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": str(next(counter)).encode()})
+    return app
+
+
+async def _call(app, key="k", body=b"{}", user=b"101", path="/borrow/1"):
+    scope = {"type": "http", "method": "POST", "path": path, "query_string": b"",
+             "headers": [(b"x-user-id", user), (b"idempotency-key", key.encode())]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]["status"], dict(messages[0]["headers"]), messages[1]["body"]
+
+
+def test_concurrent_duplicates_wait_for_in_flight_request():
+    calls = []
+    app = IdempotencyMiddleware(_handler(calls, delay=0.01), cache=IdempotencyCache(), paths=("/borrow",))
+
+    async def scenario():
+        return await asyncio.gather(*(_call(app) for _ in range(5)), _call(app, user=b"102"))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 2  # Satu untuk user 101, satu untuk user 102
+    assert {body for _, _, body in results[:5]} == {b"1"}
+    assert sum(1 for _, headers, _ in results if b"idempotent-replayed" in headers) == 4
+
+
+def test_entries_expire_and_server_errors_are_not_stored():
+    calls, clock = [], FakeClock()
+    cache = IdempotencyCache(ttl_seconds=60, clock=clock)
+    app = IdempotencyMiddleware(_handler(calls), cache=cache, paths=("/borrow",))
+    asyncio.run(_call(app))
+    asyncio.run(_call(app))
+    assert len(calls) == 1
+    clock.now = 61
+    asyncio.run(_call(app))
+    assert len(calls) == 2
+    assert asyncio.run(_call(app, body=b'{"lain": 1}'))[0] == 422
+
+    failing = IdempotencyMiddleware(_handler(calls, status=500), cache=IdempotencyCache(), paths=("/borrow",))
+    asyncio.run(_call(failing))
+    asyncio.run(_call(failing))
+    assert len(calls) == 4
+
+
+def test_workers_share_stored_responses(tmp_path):
+    # Dua middleware dengan store masing-masing mensimulasikan dua worker
+    calls, clock = [], FakeClock()
+    stores = [SharedIdempotencyStore(str(tmp_path / "idempotency.db"), ttl_seconds=60, clock=clock) for _ in range(2)]
+    workers = [IdempotencyMiddleware(_handler(calls, delay=0.01), paths=("/borrow",), shared=store) for store in stores]
+
+    async def scenario():
+        return await asyncio.gather(*(_call(workers[i % 2]) for i in range(4)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert {body for _, _, body in results} == {b"1"}
+    assert sum(1 for _, headers, _ in results if b"idempotent-replayed" in headers) == 3
+    assert asyncio.run(_call(workers[1], body=b'{"lain": 1}'))[0] == 422
+
+    clock.now = 61
+    asyncio.run(_call(workers[1]))
+    assert len(calls) == 2
+
+    failing = IdempotencyMiddleware(_handler(calls, status=500), paths=("/borrow",), shared=stores[0])
+    asyncio.run(_call(failing, key="gagal"))
+    asyncio.run(_call(workers[1], key="gagal"))
+    assert len(calls) == 4
+    for store in stores:
+        store.close()
+
+
+def test_excluded_paths_are_streamed_without_caching():
+    calls = []
+    app = IdempotencyMiddleware(_handler(calls), cache=IdempotencyCache(), paths=("/borrow", "/books"),
+                                excluded_paths=("/books/bulk",))
+    for _ in range(2):
+        status, headers, _ = asyncio.run(_call(app, path="/books/bulk"))
+        assert status == 200 and b"idempotent-replayed" not in headers
+    assert len(calls) == 2
@@ -0,0 +1,124 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import random
+import sys
+import threading
+
+import pytest
+
+from app.data_store import BookCatalog, LoanRepository
+from app.schemas import BookCreate
+from app.storage import MemoryStore, StoreError
+
+TODAY = date(2024, 1, 1)
+DUE = TODAY + timedelta(days=14)
+THREADS = 32
+
+
+@pytest.fixture(autouse=True)
+def frequent_thread_switches():
+    """
+    Memperkecil interval pergantian thread agar race condition lebih mudah muncul.
+    """
+    original = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(original)
+
+
+def _run_concurrently(fn, args_list):
+    """
+    Menjalankan `fn` untuk setiap argumen secara bersamaan dan mengembalikan hasil yang berhasil.
+    """
+    barrier = threading.Barrier(len(args_list))
+
+    def task(args):
+        barrier.wait()
+        try:
+            return fn(*args)
+        except StoreError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=len(args_list)) as pool:
+        results = list(pool.map(task, args_list))
+    return [r for r in results if r is not None]
+
+
+def test_concurrent_borrows_never_oversell_stock():
+    store = MemoryStore(books=BookCatalog(), loans=LoanRepository())
+    book = store.add_book(BookCreate(title="Populer", author="Penulis", stock=10))
+
+    loans = _run_concurrently(store.borrow, [(user_id, book.id, TODAY, DUE) for user_id in range(1000, 1000 + 4 * THREADS)])
+
+    assert len(loans) == 10
+    assert store.get_book(book.id).stock == 0
+    assert len(store.list_active_loans()) == 10
+
+
+def test_concurrent_duplicate_borrows_create_one_loan():
+    store = MemoryStore(books=BookCatalog(), loans=LoanRepository())
+    book = store.add_book(BookCreate(title="Populer", author="Penulis", stock=THREADS))
+
+    loans = _run_concurrently(store.borrow, [(101, book.id, TODAY, DUE)] * THREADS)
+
+    assert len(loans) == 1
+    assert store.get_book(book.id).stock == THREADS - 1
+
+
+def test_stock_does_not_drift_under_mixed_borrow_and_return():
+    store = MemoryStore(books=BookCatalog(), loans=LoanRepository(), lock_stripes=4)
+    books = [store.add_book(BookCreate(title=f"Buku {i}", author="Penulis", stock=3)) for i in range(8)]
+    rng = random.Random(42)
+
+    def worker(seed):
+        local_rng = random.Random(seed)
+        for _ in range(200):
+            user_id = local_rng.randrange(20)
+            book = local_rng.choice(books)
+            try:
+                loan = store.borrow(user_id, book.id, TODAY, DUE)
+            except StoreError:
+                continue
+            assert store.get_book(book.id).stock >= 0
+            try:
+                # Return kedua harus ditolak tanpa menambah stok lagi
+                store.return_loan(loan.id, DUE, lambda l: 0)
+                store.return_loan(loan.id, DUE, lambda l: 0)
+            except StoreError:
+                pass
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        list(pool.map(worker, [rng.random() for _ in range(THREADS)]))
+
+    for book in books:
+        assert store.get_book(book.id).stock == 3
+    assert store.list_active_loans() == []
+
+
+def test_concurrent_adds_and_searches_keep_search_index_consistent():
+    store = MemoryStore(books=BookCatalog(), loans=LoanRepository())
+    errors = []
+
+    def add(i):
+        # Semua buku memperkenalkan token baru yang sama ("langka") pada saat bersamaan
+        store.add_book(BookCreate(title=f"Judul langka {i}", author=f"Penulis{i % 4}", stock=1))
+
+    def search():
+        try:
+            for _ in range(50):
+                store.search_books("langka", limit=10)
+                store.search_books("penulis", limit=10)
+        except RuntimeError as e:
+            errors.append(e)
+
+    _run_concurrently(add, [(i,) for i in range(4 * THREADS)])
+    searchers = [threading.Thread(target=search) for _ in range(4)]
+    for t in searchers:
+        t.start()
+    _run_concurrently(add, [(i,) for i in range(4 * THREADS, 8 * THREADS)])
+    for t in searchers:
+        t.join()
+
+    assert errors == []
+    total, _ = store.books.search_index.search("langka")
+    assert total == 8 * THREADS
@@ -0,0 +1,105 @@
+from datetime import date, timedelta
+import uuid
+
+from app.data_store import LoanRepository
+from app.loan_archive import LoanArchive
+from app.loan_history import LoanHistoryQuery
+from app.schemas import LoanRecord
+
+TODAY = date(2024, 1, 1)
+DUE = TODAY + timedelta(days=14)
+BOOK_ID = uuid.uuid4()
+
+
+def _loan(user_id=101, book_id=BOOK_ID, **fields):
+    return LoanRecord(id=uuid.uuid4(), user_id=user_id, book_id=book_id, borrow_date=TODAY,
+                      due_date=DUE, initial_borrow_date=TODAY, **fields)
+
+
+def test_returned_loan_moves_to_archive(tmp_path):
+    loans = LoanRepository(str(tmp_path))
+    loan = _loan()
+    loans.append(loan)
+    assert loans.find_active(101, BOOK_ID) == loan
+
+    returned = loans.mark_returned(loan.id, DUE, fine=3000)
+    assert len(loans) == 1 and len(loans.archive) == 1
+    assert loans.find_active(101, BOOK_ID) is None
+    assert loans.active_for_user(101) == []
+    assert loans.get(loan.id) == returned
+    assert returned.return_date == DUE and returned.fine == 3000
+
+    # Rollback pengembalian mengeluarkan pinjaman dari arsip
+    restored = loans.unmark_returned(loan.id)
+    assert restored == loan
+    assert len(loans.archive) == 0
+    assert loans.active_for_user(101) == [loan]
+    loans.close()
+
+
+def test_archive_lookup_after_index_merge(tmp_path):
+    loans = LoanRepository(str(tmp_path))
+    records = [_loan(user_id=i % 7) for i in range(5000)]
+    loans.extend(records)
+    for loan in records:
+        loans.mark_returned(loan.id, DUE)
+
+    assert len(loans.archive) == 5000
+    for loan in records[::97]:
+        assert loans.get(loan.id).return_date == DUE
+    assert loans.get(uuid.uuid4()) is None
+    assert [l.id for l in loans.loans_for_user(3)] == [l.id for l in records if l.user_id == 3]
+    assert {fields[0] for fields in loans.dump_fields()} == {loan.id.int for loan in records}
+
+    # Data tetap bisa dibaca setelah dihapus dari indeks lalu ditambahkan lagi
+    loans.remove(records[0].id)
+    assert loans.get(records[0].id) is None
+    loans.restore(records[0])
+    assert loans.get(records[0].id) == records[0]
+    loans.close()
+
+
+def test_date_index_follows_loan_changes(tmp_path):
+    loans = LoanRepository(str(tmp_path))
+    # Muat massal dengan urutan tanggal acak; indeks diurutkan saat pertama dibaca
+    records = [_loan(user_id=i % 3).model_copy(update={"borrow_date": TODAY + timedelta(days=(i * 7) % 11)})
+               for i in range(30)]
+    loans.extend(records)
+    expected = sorted(records, key=lambda loan: loan.borrow_date)
+    assert [l.id for l in loans.history(LoanHistoryQuery())] == [l.id for l in expected]
+
+    loan = records[0]
+    loans.mark_returned(loan.id, DUE)
+    returned = LoanHistoryQuery(sort_by="return_date")
+    assert [l.id for l in loans.history(returned)] == [loan.id]
+    assert loan.id not in [l.id for l in loans.history(LoanHistoryQuery(status="active"))]
+
+    loans.unmark_returned(loan.id)
+    assert loans.history(returned) == []
+    loans[0].borrow_date = TODAY - timedelta(days=30)
+    assert loans.history(LoanHistoryQuery(user_id=0), limit=1)[0].id == loan.id
+    loans.remove(loan.id)
+    assert loan.id not in [l.id for l in loans.history(LoanHistoryQuery())]
+    loans.close()
+
+
+def test_loan_ref_writes_through_to_columns(tmp_path):
+    loans = LoanRepository(str(tmp_path))
+    loan = _loan()
+    loans.append(loan)
+    ref = loans[0]
+    ref.due_date = TODAY
+    ref.extended = True
+    stored = loans.get(loan.id)
+    assert stored.due_date == TODAY and stored.extended is True
+    assert ref.user_id == 101
+    loans.close()
+
+
+def test_archive_grows_memory_map(tmp_path):
+    archive = LoanArchive(str(tmp_path))
+    for i in range(10000):
+        archive.append((uuid.uuid4().int, i, 0, 1, 2, 3, 4, 5, i, 0))
+    assert len(archive) == 10000
+    assert sum(1 for _ in archive) == 10000
+    archive.close()
@@ -0,0 +1,56 @@
+import threading
+
+from app.metrics import MetricsRegistry, COUNTER, HISTOGRAM
+
+
+def test_counters_from_many_threads_are_summed():
+    registry = MetricsRegistry()
+    registry.describe("jobs_total", COUNTER, "Jumlah job.", ("kind",))
+
+    def work():
+        for _ in range(1000):
+            registry.inc("jobs_total", ("a",))
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    counters, _ = registry.snapshot()
+    assert counters[("jobs_total", ("a",))] == 8000
+    assert 'jobs_total{kind="a"} 8000' in registry.render()
+
+
+def test_histogram_rendering_is_cumulative():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.describe("latency_seconds", HISTOGRAM, "Latensi.", ("route",))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        registry.observe("latency_seconds", ('/a"b',), value)
+
+    text = registry.render({"books": 3})
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{route="/a\\"b",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a\\"b",le="1"} 3' in text
+    assert 'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{route="/a\\"b"} 4' in text
+    assert 'latency_seconds_sum{route="/a\\"b"} 3.65' in text
+    assert "books 3" in text
+
+
+def test_timed_decorator_records_even_on_error():
+    registry = MetricsRegistry()
+
+    @registry.timed("lookup_seconds", "get")
+    def lookup(fail):
+        if fail:
+            raise KeyError
+        return 1
+
+    lookup(False)
+    try:
+        lookup(True)
+    except KeyError:
+        pass
+    _, histograms = registry.snapshot()
+    assert sum(histograms[("lookup_seconds", ("get",))][:-1]) == 2
@@ -0,0 +1,59 @@
+import threading
+import time
+
+from app.profiling import RequestProfiler, REASON_SLOW
+
+
+def _busy_handler(duration):
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        pass
+    return "ok"
+
+
+def _scope(path):
+    return {"type": "http", "method": "GET", "path": path, "endpoint": _busy_handler}
+
+
+def _in_thread(duration):
+    # Seperti endpoint sinkron yang dijalankan di thread pool
+    thread = threading.Thread(target=_busy_handler, args=(duration,))
+    thread.start()
+    thread.join()
+
+
+def test_slow_request_is_saved_as_collapsed_stacks(tmp_path):
+    profiler = RequestProfiler(enabled=True, sample_rate=0, slow_ms=20, interval_ms=1, directory=str(tmp_path))
+    try:
+        trace = profiler.begin(_scope("/lambat"), profile_header=False)
+        _in_thread(0.06)
+        profiler.finish(trace, 200, 60.0)
+
+        fast = profiler.begin(_scope("/cepat"), profile_header=False)
+        _in_thread(0.0)
+        profiler.finish(fast, 200, 1.0)
+    finally:
+        profiler.stop()
+
+    # Hanya request lambat yang disimpan
+    assert [t.path for t in profiler.slowest(10)] == ["/lambat"]
+    assert trace.reasons == [REASON_SLOW]
+    with open(trace.files["collapsed"]) as f:
+        stacks = f.read()
+    assert "test_profiling.py:_busy_handler" in stacks
+
+
+def test_old_trace_files_are_removed(tmp_path):
+    profiler = RequestProfiler(enabled=True, sample_rate=1.0, slow_ms=0, directory=str(tmp_path), keep=2)
+    traces = []
+    try:
+        for i in range(3):
+            trace = profiler.begin(_scope(f"/{i}"), profile_header=False)
+            _busy_handler(0.0)
+            profiler.finish(trace, 200, float(i))
+            traces.append(trace)
+    finally:
+        profiler.stop()
+
+    assert [t.path for t in profiler.slowest(10)] == ["/2", "/1"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(f"{t.id}.pstats" for t in traces[1:])
@@ -0,0 +1,107 @@
+from datetime import date, timedelta
+import json
+
+import pytest
+
+from app.data_store import BookCatalog, LoanRepository
+from app.scheduler import DueDateScheduler, ManualClock, QueueSink, FileSink, DUE_SOON, OVERDUE
+from app.schemas import BookCreate
+from app.storage import MemoryStore, SQLiteStore
+
+TODAY = date(2024, 1, 1)
+DUE = TODAY + timedelta(days=14)
+
+
+@pytest.fixture
+def store():
+    return MemoryStore(books=BookCatalog(), loans=LoanRepository())
+
+
+def _drain(sink):
+    events = []
+    while not sink.queue.empty():
+        events.append(sink.queue.get_nowait())
+    return [(event.kind, event.loan_id) for event in events]
+
+
+def test_borrow_emits_due_soon_then_overdue(store):
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=2))
+    clock, sink = ManualClock(TODAY), QueueSink()
+    scheduler = DueDateScheduler([sink], clock=clock, reminder_days=2)
+    scheduler.attach(store)
+    loan = store.borrow(101, book.id, TODAY, DUE)
+
+    clock.advance(11)
+    assert scheduler.run_due() == []
+    clock.advance(1)  # 2 hari sebelum jatuh tempo
+    scheduler.run_due()
+    assert _drain(sink) == [(DUE_SOON, loan.id)]
+
+    clock.advance(2)  # hari jatuh tempo: belum terlambat
+    assert scheduler.run_due() == []
+    clock.advance(1)
+    scheduler.run_due()
+    assert _drain(sink) == [(OVERDUE, loan.id)]
+    # Event overdue hanya dikirim sekali
+    clock.advance(5)
+    assert scheduler.run_due() == []
+    assert len(scheduler) == 0
+
+
+def test_extend_reschedules_and_return_cancels(store):
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=2))
+    clock, sink = ManualClock(TODAY), QueueSink()
+    scheduler = DueDateScheduler([sink], clock=clock, reminder_days=0)
+    scheduler.attach(store)
+    extended = store.borrow(101, book.id, TODAY, DUE)
+    returned = store.borrow(102, book.id, TODAY, DUE)
+    store.extend_loan(extended.id, DUE + timedelta(days=14))
+    store.return_loan(returned.id, TODAY, lambda loan: 0)
+
+    clock.current = DUE + timedelta(days=1)
+    assert scheduler.run_due() == []
+    clock.current = DUE + timedelta(days=15)
+    scheduler.run_due()
+    assert _drain(sink) == [(OVERDUE, extended.id)]
+
+
+def test_attach_loads_existing_loans_and_catches_up(store, tmp_path):
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=2))
+    loan = store.borrow(101, book.id, TODAY, DUE)
+    path = tmp_path / "events.ndjson"
+    scheduler = DueDateScheduler([FileSink(str(path))], clock=ManualClock(DUE + timedelta(days=3)))
+    scheduler.attach(store)
+
+    # Pengingat yang sudah lewat tidak dikirim, langsung event overdue
+    events = scheduler.run_due()
+    assert [(event.kind, event.loan_id) for event in events] == [(OVERDUE, loan.id)]
+    assert json.loads(path.read_text())["loan_id"] == str(loan.id)
+
+    scheduler.detach()
+    store.borrow(102, book.id, TODAY, DUE)
+    assert len(scheduler) == 0
+
+
+def test_resyncs_after_changes_from_another_worker(tmp_path):
+    path = str(tmp_path / "library.db")
+    leader, other = SQLiteStore(path, shared=True), SQLiteStore(path, shared=True)
+    try:
+        book = other.add_book(BookCreate(title="Buku", author="Penulis", stock=3))
+        clock, sink = ManualClock(TODAY), QueueSink()
+        scheduler = DueDateScheduler([sink], clock=clock, reminder_days=0)
+        scheduler.attach(leader)
+        kept = other.borrow(101, book.id, TODAY, DUE)
+        returned = other.borrow(102, book.id, TODAY, DUE)
+        other.return_loan(returned.id, TODAY, lambda l: 0)
+
+        clock.advance(15)
+        scheduler.run_due()
+        assert _drain(sink) == [(OVERDUE, kept.id)]
+        # Perubahan lain dari worker lain tidak membuat event overdue dikirim ulang
+        other.borrow(103, book.id, TODAY + timedelta(days=15), TODAY + timedelta(days=29))
+        scheduler.run_due()
+        assert _drain(sink) == []
+        assert len(scheduler) == 1
+    finally:
+        leader.close()
+        other.close()
@@ -0,0 +1,241 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import date, timedelta
+import uuid
+
+from app.data_store import BookCatalog, LoanRepository
+from app.cache import ResponseCache, book_key
+from app.loan_history import LoanHistoryQuery, HistoryCursor
+from app.main import app
+from app.schemas import BookCreate
+from app.shared_state import try_acquire_leader
+from app.storage import (
+    MemoryStore, SQLiteStore, set_store,
+    OutOfStockError, DuplicateLoanError, LoanAlreadyReturnedError, BookNotFoundError,
+)
+from app.storage.base import EXTERNAL_CHANGE
+
+TODAY = date(2024, 1, 1)
+DUE = TODAY + timedelta(days=14)
+
+# === STORAGE YANG DIUJI ===
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = MemoryStore(books=BookCatalog(), loans=LoanRepository())
+    else:
+        store = SQLiteStore(str(tmp_path / "library.db"))
+    yield store
+    store.close()
+
+
+def test_borrow_and_return_keep_stock_and_loans_in_sync(store):
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=1))
+    loan = store.borrow(101, book.id, TODAY, DUE)
+    assert store.get_book(book.id).stock == 0
+    assert [l.id for l in store.active_loans_for_user(101)] == [loan.id]
+
+    with pytest.raises(OutOfStockError):
+        store.borrow(102, book.id, TODAY, DUE)
+
+    returned = store.return_loan(loan.id, DUE + timedelta(days=2), lambda l: 2000)
+    assert returned.fine == 2000
+    assert store.get_book(book.id).stock == 1
+    assert store.list_active_loans() == []
+
+    with pytest.raises(LoanAlreadyReturnedError):
+        store.return_loan(loan.id, DUE, lambda l: 0)
+    # Stok tidak berubah karena transaksi gagal
+    assert store.get_book(book.id).stock == 1
+
+
+def test_duplicate_active_loan_is_rejected(store):
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=2))
+    store.borrow(101, book.id, TODAY, DUE)
+    with pytest.raises(DuplicateLoanError):
+        store.borrow(101, book.id, TODAY, DUE)
+    assert store.get_book(book.id).stock == 1
+
+
+def test_list_search_update_and_delete_books(store):
+    first = store.add_book(BookCreate(title="Project Hail Mary", author="Andy Weir", stock=0))
+    second = store.add_book(BookCreate(title="The Martian", author="Andy Weir", stock=2))
+
+    assert [b.id for b in store.list_books()] == sorted([first.id, second.id])
+    assert [b.id for b in store.list_books(available_only=True)] == [second.id]
+
+    total, books = store.search_books("weir mart", limit=10)
+    assert total == 1 and books[0].id == second.id
+
+    store.update_book(first.id, {"stock": 4})
+    assert store.get_book(first.id).stock == 4
+    assert len(store.list_books(available_only=True)) == 2
+
+    store.delete_book(first.id)
+    assert store.get_book(first.id) is None
+    with pytest.raises(BookNotFoundError):
+        store.delete_book(first.id)
+
+
+def test_prefix_search_returns_every_match(store):
+    # Lebih banyak token berawalan "1" daripada batas ekspansi prefix
+    store.add_books([BookCreate(title=f"Buku {i}", author=f"Penulis {i % 7}", stock=1) for i in range(1000, 1100)])
+    store.add_book(BookCreate(title="Buku 2000", author="Penulis 1", stock=1))
+    store.add_book(BookCreate(title="Majalah 1001", author="Penulis 1", stock=1))
+
+    assert store.search_books("buku 1", limit=10)[0] == 101  # Termasuk "Penulis 1"
+    assert store.search_books("buku 10", limit=10)[0] == 100
+    assert store.search_books("1", limit=10)[0] == 102
+    total, books = store.search_books("penulis 3 buku 10", limit=100)
+    assert total == len(books) == len([i for i in range(1000, 1100) if i % 7 == 3])
+
+
+def test_sqlite_store_persists_across_reopen(tmp_path):
+    path = str(tmp_path / "library.db")
+    store = SQLiteStore(path)
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=1))
+    loan = store.borrow(101, book.id, TODAY, DUE)
+    store.close()
+
+    reopened = SQLiteStore(path)
+    assert reopened.get_book(book.id).stock == 0
+    assert reopened.get_loan(loan.id).user_id == 101
+    reopened.close()
+
+
+def test_api_runs_on_sqlite_backend(tmp_path):
+    store = SQLiteStore(str(tmp_path / "library.db"))
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=1))
+    set_store(store)
+    try:
+        client = TestClient(app)
+        headers = {"X-User-ID": "101"}
+        loan_id = client.post(f"/borrow/{book.id}", headers=headers).json()["id"]
+        assert client.get(f"/books/{book.id}").json()["stock"] == 0
+        assert client.post(f"/return/{loan_id}", headers=headers).status_code == 200
+        assert client.get(f"/books/{book.id}").json()["stock"] == 1
+    finally:
+        set_store(None)
+        store.close()
+
+
+def test_atomic_block_rolls_back_all_changes(store):
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=2))
+    kept = store.borrow(101, book.id, TODAY, DUE)
+
+    with pytest.raises(DuplicateLoanError):
+        with store.atomic([book.id]):
+            store.return_loan(kept.id, DUE, lambda l: 0)
+            store.borrow(102, book.id, TODAY, DUE)
+            store.borrow(102, book.id, TODAY, DUE)
+
+    assert store.get_book(book.id).stock == 1
+    assert store.get_loan(kept.id).return_date is None
+    assert [l.id for l in store.list_active_loans()] == [kept.id]
+    assert store.active_loans_for_user(102) == []
+
+
+def test_atomic_block_rolls_back_book_updates(store):
+    book = store.add_book(BookCreate(title="Buku", author="Penulis", stock=1))
+    with pytest.raises(OutOfStockError):
+        with store.atomic([book.id]):
+            store.update_book(book.id, {"stock": 0, "title": "Judul Baru"})
+            store.borrow(101, book.id, TODAY, DUE)
+    restored = store.get_book(book.id)
+    assert (restored.stock, restored.title) == (1, "Buku")
+
+
+def test_loan_history_uses_date_filters_and_cursor(store):
+    first = store.add_book(BookCreate(title="Buku A", author="Penulis", stock=5))
+    second = store.add_book(BookCreate(title="Buku B", author="Penulis", stock=5))
+    day = lambda n: TODAY + timedelta(days=n)
+    a = store.borrow(101, first.id, day(3), DUE)
+    b = store.borrow(102, first.id, day(1), DUE)
+    c = store.borrow(101, second.id, day(2), DUE)
+    d = store.borrow(102, second.id, day(2), DUE)
+    store.return_loan(b.id, day(10), lambda l: 0)
+    store.return_loan(c.id, day(4), lambda l: 0)
+
+    def ids(query=LoanHistoryQuery(), **kwargs):
+        return [loan.id for loan in store.loan_history(query, **kwargs)]
+
+    assert ids() == [b.id, c.id, d.id, a.id]
+    assert ids(LoanHistoryQuery(user_id=101)) == [c.id, a.id]
+    assert ids(LoanHistoryQuery(book_id=first.id, status="active")) == [a.id]
+    assert ids(LoanHistoryQuery(status="active")) == [d.id, a.id]
+    assert ids(LoanHistoryQuery(sort_by="return_date")) == [c.id, b.id]
+    assert ids(LoanHistoryQuery(sort_by="return_date", start=day(5), end=day(10))) == [b.id]
+    assert ids(LoanHistoryQuery(sort_by="return_date", status="active")) == []
+    assert ids(LoanHistoryQuery(start=day(2), end=day(2))) == [c.id, d.id]
+    assert ids(LoanHistoryQuery(user_id=999)) == [] and ids(LoanHistoryQuery(book_id=uuid.uuid4())) == []
+
+    query = LoanHistoryQuery()
+    page = store.loan_history(query, limit=2)
+    assert [loan.id for loan in page] == [b.id, c.id]
+    assert ids(query, after=query.cursor(page[-1]), limit=2) == [d.id, a.id]
+    # Cursor dengan pinjaman yang tidak dikenal mulai dari awal tanggalnya
+    assert ids(query, after=HistoryCursor(day(2), uuid.uuid4())) == [c.id, d.id, a.id]
+
+
+# === MODE MULTI-WORKER ===
+# Dua SQLiteStore pada file yang sama mensimulasikan dua proses worker
+def test_shared_sqlite_stores_see_each_others_writes(tmp_path):
+    path = str(tmp_path / "library.db")
+    worker_a, worker_b = SQLiteStore(path, shared=True), SQLiteStore(path, shared=True)
+    cache = ResponseCache(enabled=True)
+    cache.bind(worker_b)
+    events = []
+    worker_b.add_listener(lambda event: events.append(event.kind))
+    try:
+        book = worker_a.add_book(BookCreate(title="Buku", author="Penulis", stock=1))
+        assert worker_b.poll_changes()
+        assert events == [EXTERNAL_CHANGE]
+        assert not worker_b.poll_changes()
+
+        cache.put(book_key(book.id), cache.version, b"{}")
+        worker_a.borrow(101, book.id, TODAY, DUE)
+        # Stok dikurangi atomik lintas worker
+        with pytest.raises(OutOfStockError):
+            worker_b.borrow(102, book.id, TODAY, DUE)
+        # Tulisan sendiri tidak dianggap perubahan dari luar
+        assert not worker_a.poll_changes()
+        assert worker_b.poll_changes()
+        assert len(cache) == 0
+        assert worker_b.get_book(book.id).stock == 0
+    finally:
+        worker_a.close()
+        worker_b.close()
+
+
+def test_generation_is_bumped_after_commit(tmp_path):
+    path = str(tmp_path / "library.db")
+    worker_a, worker_b = SQLiteStore(path, shared=True), SQLiteStore(path, shared=True)
+    try:
+        book = worker_a.add_book(BookCreate(title="Buku", author="Penulis", stock=1))
+        worker_b.poll_changes()
+        seen = []
+        increment = worker_a._generation.increment
+
+        def increment_and_poll():
+            # Worker B melihat generasi baru tepat saat dinaikkan dan langsung membaca ulang
+            value = increment()
+            seen.append((worker_b.poll_changes(), worker_b.get_book(book.id).stock))
+            return value
+
+        worker_a._generation.increment = increment_and_poll
+        worker_a.borrow(101, book.id, TODAY, DUE)
+        assert seen == [(True, 0)]
+    finally:
+        worker_a.close()
+        worker_b.close()
+
+
+def test_leader_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "scheduler.lock")
+    leader = try_acquire_leader(path)
+    assert leader is not None
+    assert try_acquire_leader(path) is None
+    leader.close()
+    follower = try_acquire_leader(path)
+    assert follower is not None
+    follower.close()